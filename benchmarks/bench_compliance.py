@@ -0,0 +1,104 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Measures the compliance check of a fleet against a firmware catalogue.
+
+The report of boseapi.compliance is compared with a check written by hand:
+for each device the index entries are searched for its product name and
+both version strings are split and compared. The devices are built in
+memory, so only the join and the comparison are measured.
+
+Usage: python benchmarks/bench_compliance.py [devices]
+"""
+import sys
+import time
+
+from samples import firmware_index
+
+from boseapi import compliance
+from boseapi.common.device import BoseDevice, BoseDeviceComponent
+from boseapi.firmware import FirmwareCatalogue, load_index
+from boseapi.common import xmlparser
+
+VERSIONS = ['27.0.6.46330.5043500', '27.0.5.45102.4997131', '26.1.0.41213.4577801', None]
+
+
+def fleet(devices: int) -> list:
+    return [
+        BoseDevice('10.0.%d.%d' % (i // 250, i % 250), device_type='SoundTouch %d' % (i % 70),
+                   components=[
+                       BoseDeviceComponent('SCM', VERSIONS[i % 4] and VERSIONS[i % 4] + ' epdbuild.trunk'),
+                       BoseDeviceComponent('PackagedProduct', VERSIONS[i % 4], '069')
+                   ])
+        for i in range(devices)
+    ]
+
+
+def by_hand(devices: list, firmware: list) -> dict:
+    counts = {}
+    for device in devices:
+        state = 'unknown'
+        target = next((f for f in firmware if f.product_name == device.device_type), None)
+        version = next((c.software_version for c in device.components
+                        if c.category == 'PackagedProduct'), None)
+        if target is not None and version:
+            installed = [int(x) for x in version.split()[0].split('.')]
+            release = [int(x) for x in target.release.revision.split('.')]
+            state = 'outdated' if installed < release else 'current'
+        model = counts.setdefault(device.device_type, dict.fromkeys(compliance.STATES, 0))
+        model[state] += 1
+    return counts
+
+
+def best(function, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3, result
+
+
+def main(devices: int = 10000):
+    data = firmware_index()
+    firmware = load_index(xmlparser.fromstring(data))
+    catalogue = FirmwareCatalogue()
+    catalogue.load_index(data)
+    devices = fleet(devices)
+
+    manual, expected = best(lambda: by_hand(devices, firmware))
+    print('devices: %d, products: %d' % (len(devices), len(catalogue)))
+    print('  by hand: %9.2f ms' % manual)
+    for use_numpy in (True, False):
+        if use_numpy and compliance.numpy is None:
+            continue
+        elapsed, counts = best(lambda: compliance.check_compliance(
+            devices, catalogue, use_numpy=use_numpy
+        ).counts())
+        assert counts == expected
+        print('  report (%s): %6.2f ms (%.1fx)' % (
+            'numpy' if use_numpy else 'array', elapsed, manual / elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
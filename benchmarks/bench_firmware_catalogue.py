@@ -0,0 +1,105 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Compares loading a large synthetic index.xml with load_index() (complete
+ElementTree) and the streaming iter_index()/FirmwareCatalogue.
+
+For each size the time and the peak memory (tracemalloc) are measured for:
+    - tree: fromstring() of the file + load_index(),
+    - stream: iter_index() without keeping the objects (parser memory only),
+    - catalogue: FirmwareCatalogue.load_index() (keeps all objects).
+Afterwards 1000 lookups by device id are timed on the list and the catalogue.
+
+Usage: python benchmarks/bench_firmware_catalogue.py [devices ...]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import xml.etree.ElementTree as xmltree
+
+from samples import firmware_index
+
+from boseapi import firmware
+
+SIZES = (1000, 10000, 50000)
+
+
+def measure(function) -> tuple:
+    # (result, seconds, peak bytes)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def tree(path: str) -> list:
+    with open(path, 'rb') as fp:
+        return firmware.load_index(xmltree.fromstring(fp.read()))
+
+
+def stream(path: str) -> int:
+    count = 0
+    for _ in firmware.iter_index(path):
+        count += 1
+    return count
+
+
+def catalogue(path: str) -> firmware.FirmwareCatalogue:
+    result = firmware.FirmwareCatalogue()
+    result.load_index(path)
+    return result
+
+
+def main(sizes=SIZES):
+    print('%-9s %-10s %10s %10s %12s' % ('devices', 'loader', 'size', 'time [ms]', 'peak [KiB]'))
+    for devices in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.xml', delete=False) as fp:
+            fp.write(firmware_index(devices))
+        try:
+            size = os.path.getsize(fp.name)
+            results = {}
+            for name, loader in (('tree', tree), ('stream', stream), ('catalogue', catalogue)):
+                results[name], elapsed, peak = measure(lambda: loader(fp.name))
+                print('%-9s %-10s %9.1fK %10.1f %12.1f' % (
+                    devices if name == 'tree' else '', name, size / 1024, elapsed * 1e3, peak / 1024
+                ))
+        finally:
+            os.unlink(fp.name)
+
+        ids = [0x4000 + i for i in range(0, devices, max(1, devices // 1000))]
+        listed, indexed = results['tree'], results['catalogue']
+        scan = timeit.timeit(lambda: [next(x for x in listed if x.device_id == i) for i in ids], number=1)
+        probe = timeit.timeit(lambda: [indexed.get_firmware(i) for i in ids], number=1)
+        print('%-9s %d lookups: list scan %.2f ms, catalogue %.3f ms' % ('', len(ids), scan * 1e3, probe * 1e3))
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or SIZES)
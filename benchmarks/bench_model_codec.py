@@ -0,0 +1,90 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Compares the serialization of model objects (see boseapi.codec) with the
+XML path, i.e. storing the raw response and parsing it again.
+
+For each payload the size and the time to restore the model object are
+measured for the XML response, to_dict() + JSON and boseapi.codec in every
+available format (msgpack is skipped if it is not installed).
+
+Usage: python benchmarks/bench_model_codec.py [repeat]
+"""
+import json
+import sys
+import timeit
+
+from xml.etree.ElementTree import fromstring
+
+from samples import RESPONSES
+
+from boseapi import codec, model
+
+PAYLOADS = [
+    ('volume', model.Volume),
+    ('nowPlaying', model.Status),
+    ('getZone', model.Zone),
+    ('capabilities', model.Capabilities),
+    ('netStats', model.NetworkStats),
+    ('presets', model.PresetList),
+    ('sources', model.SourceItemList),
+]
+
+
+def best(function, repeat: int) -> float:
+    # the best of `repeat` rounds, in microseconds per call
+    number = 500
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def paths(data: bytes, cls) -> list:
+    # (name, encoded bytes, encode function, decode function)
+    obj = cls(fromstring(data))
+    result = [
+        ('xml', data, None, lambda x: cls(fromstring(x))),
+        ('dict+json', json.dumps(obj.to_dict()).encode(),
+         lambda: json.dumps(obj.to_dict()).encode(),
+         lambda x: cls.from_dict(json.loads(x))),
+    ]
+    formats = [codec.JSON] + ([codec.MSGPACK] if codec.msgpack is not None else [])
+    for fmt in formats:
+        result.append(('codec/%s' % fmt, codec.encode(obj, fmt),
+                       lambda fmt=fmt: codec.encode(obj, fmt), codec.decode))
+    return result
+
+
+def main(repeat: int = 7):
+    print('%-14s %-14s %8s %12s %12s' % ('payload', 'path', 'bytes', 'encode [us]', 'decode [us]'))
+    for node, cls in PAYLOADS:
+        for index, (name, encoded, encode, decode) in enumerate(paths(RESPONSES[node], cls)):
+            assert decode(encoded) == cls(fromstring(RESPONSES[node]))
+            print('%-14s %-14s %8d %12s %12.2f' % (
+                node if index == 0 else '', name, len(encoded),
+                '-' if encode is None else '%.2f' % best(encode, repeat),
+                best(lambda: decode(encoded), repeat)
+            ))
+    if codec.msgpack is None:
+        print('msgpack is not installed, only the JSON format was measured')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,113 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Measures the memory retained by per-device snapshots of the model classes.
+
+Each snapshot contains the objects of the nowPlaying, volume, getZone,
+capabilities, netStats, networkInfo, presets, sources and bass nodes. The
+same snapshots are built a second time with copies of the model classes that
+store their attributes in a per-instance __dict__ (the layout before the
+classes were slotted).
+
+Usage: python benchmarks/bench_model_memory.py [devices]
+"""
+import gc
+import sys
+import tracemalloc
+
+from contextlib import contextmanager
+from xml.etree.ElementTree import fromstring
+
+from samples import RESPONSES
+
+from boseapi import model
+
+SNAPSHOT = {
+    'nowPlaying': 'Status',
+    'volume': 'Volume',
+    'getZone': 'Zone',
+    'capabilities': 'Capabilities',
+    'netStats': 'NetworkStats',
+    'networkInfo': 'NetworkInfo',
+    'presets': 'PresetList',
+    'sources': 'SourceItemList',
+    'bass': 'Bass',
+}
+
+
+def _unslotted(cls) -> type:
+    namespace = {
+        key: value for key, value in vars(cls).items()
+        if key != '__slots__' and key not in cls.__slots__
+    }
+    # the bases define empty __slots__, so instances still get a __dict__
+    return type(cls.__name__, cls.__bases__, namespace)
+
+
+@contextmanager
+def dict_models():
+    """Temporarily replaces all slotted model classes with __dict__ based copies."""
+    original = {
+        name: cls for name, cls in vars(model).items()
+        if isinstance(cls, type) and '__slots__' in vars(cls)
+    }
+    try:
+        for name, cls in original.items():
+            setattr(model, name, _unslotted(cls))
+        yield
+    finally:
+        for name, cls in original.items():
+            setattr(model, name, cls)
+
+
+def build(devices: int) -> list:
+    roots = {node: fromstring(body) for node, body in RESPONSES.items()}
+    return [
+        tuple(getattr(model, name)(roots[node]) for node, name in SNAPSHOT.items())
+        for _ in range(devices)
+    ]
+
+
+def measure(devices: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    snapshots = build(devices)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del snapshots
+    return size
+
+
+def main(devices: int = 500):
+    slotted = measure(devices)
+    with dict_models():
+        unslotted = measure(devices)
+
+    print('devices: %d' % devices)
+    print('  __dict__: %8.1f KiB (%6d bytes/device)' % (unslotted / 1024, unslotted // devices))
+    print('  __slots__: %7.1f KiB (%6d bytes/device)' % (slotted / 1024, slotted // devices))
+    print('  saved: %.1f%%' % (100 * (1 - slotted / unslotted)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,81 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Compares the installed XML backends (see boseapi.common.xmlparser).
+
+For each payload the time to parse the bytes and the time to parse and
+convert them into model objects is measured. Backends that are not
+installed are skipped.
+
+Usage: python benchmarks/bench_xml_backends.py [repeat]
+"""
+import sys
+import timeit
+
+from samples import RESPONSES, firmware_index
+
+from boseapi import firmware, model
+from boseapi.common import xmlparser
+
+PAYLOADS = [
+    ('nowPlaying', RESPONSES['nowPlaying'], model.Status),
+    ('sources', RESPONSES['sources'], model.SourceItemList),
+    ('presets', RESPONSES['presets'], model.PresetList),
+    ('index.xml', firmware_index(), firmware.load_index),
+]
+
+
+def best(function, repeat: int) -> float:
+    # the best of `repeat` rounds, in microseconds per call
+    number = 200
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(repeat: int = 15):
+    backends = xmlparser.available_backends()
+    results = {}
+    for name in backends:
+        xmlparser.use_backend(name)
+        parse = xmlparser.fromstring
+        for payload, data, convert in PAYLOADS:
+            results[name, payload] = (
+                best(lambda: parse(data), repeat),
+                best(lambda: convert(parse(data)), repeat)
+            )
+
+    print('%-20s %-8s %12s %14s' % ('payload', 'backend', 'parse [us]', '+ model [us]'))
+    for payload, data, _ in PAYLOADS:
+        base = results['stdlib', payload]
+        for name in backends:
+            parse, total = results[name, payload]
+            gain = '' if name == 'stdlib' else '  (%.2fx / %.2fx)' % (base[0] / parse, base[1] / total)
+            print('%-20s %-8s %12.2f %14.2f%s' % (
+                '%s (%dB)' % (payload, len(data)) if name == backends[0] else '',
+                name, parse, total, gain
+            ))
+    if len(backends) == 1:
+        print('lxml is not installed, only the standard library was measured')
+    xmlparser.use_backend()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
@@ -0,0 +1,117 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Measures building the POST bodies of zones and ContentItems (see
+boseapi.xmlbody) against the previous, unescaped string concatenation.
+
+Zones with an increasing number of members are converted with to_xml(). For
+a preset library, each preset's body is built once (first access) and then
+read again from the cache (xml_bytes), as done when presets are selected in
+bursts.
+
+Usage: python benchmarks/bench_xml_bodies.py [repeat]
+"""
+import sys
+import timeit
+
+from xml.etree.ElementTree import fromstring
+
+from boseapi import model
+
+ZONE_SIZES = (8, 64, 512, 4096)
+PRESETS = 1000
+
+
+def concat_zone(zone: model.Zone) -> str:
+    # the previous Zone.to_xml()
+    xmlstr = '<zone master="%s" senderIPAddress="%s">' % (zone.master_id, zone.master_ip)
+    for slave in zone:
+        xmlstr = '%s<member ipaddress="%s">%s</member>' % (xmlstr, slave.ipaddress, slave.deviceid)
+    return '%s</zone>' % xmlstr
+
+
+def concat_item(item) -> str:
+    # the previous ContentItem.xml_str, rebuilt on every access
+    xml = '<ContentItem '
+    if item.source: xml = '%ssource="%s" ' % (xml, item.source)
+    if item.source_account: xml = '%ssourceAccount="%s" ' % (xml, item.source_account)
+    if item.location: xml = '%slocation="%s" ' % (xml, item.location)
+    if item.itemtype: xml = '%stype="%s" ' % (xml, item.itemtype)
+    if not item.name:
+        return '%s/>' % xml
+    return '%s><itemName>%s</itemName></ContentItem>' % (xml, item.name)
+
+
+def zone(size: int) -> model.Zone:
+    return model.Zone(device_id='A0B1C2D3E4F5', ip='10.0.0.1', slaves=[
+        model.ZoneSlave(ip_address='10.0.%d.%d' % (i // 250, i % 250 + 2),
+                        device_id='A0B1C2%06X' % i)
+        for i in range(size)
+    ])
+
+
+def preset_library(size: int) -> list:
+    xml = b''.join(
+        b'<preset id="%d"><ContentItem source="INTERNET_RADIO" type="stationurl" '
+        b'location="/v1/playback/station/s%d" sourceAccount="" isPresetable="true">'
+        b'<itemName>Station %d</itemName></ContentItem></preset>' % (i, i, i)
+        for i in range(size)
+    )
+    return list(model.PresetList(fromstring(b'<presets>%s</presets>' % xml)))
+
+
+def best(function, number: int, repeat: int) -> float:
+    # the best of `repeat` rounds, in microseconds per call
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(repeat: int = 5):
+    print('%-22s %14s %14s %8s' % ('zone members', 'concat [us]', 'to_xml [us]', 'speedup'))
+    for size in ZONE_SIZES:
+        obj = zone(size)
+        assert obj.to_xml() == concat_zone(obj)
+        number = max(1, 20000 // size)
+        old = best(lambda: concat_zone(obj), number, repeat)
+        new = best(obj.to_xml, number, repeat)
+        print('%-22d %14.1f %14.1f %7.1fx' % (size, old, new, old / new))
+
+    presets = preset_library(PRESETS)
+
+    def first_access():
+        for preset in presets:
+            preset._xml = None
+            preset.xml_bytes
+
+    def cached():
+        for preset in presets:
+            preset.xml_bytes
+
+    old = best(lambda: [concat_item(p).encode('utf-8') for p in presets], 20, repeat)
+    print()
+    print('%d presets, bodies as bytes:' % PRESETS)
+    print('  concat on every access: %10.1f us' % old)
+    print('  escaped, first access:  %10.1f us' % best(first_access, 20, repeat))
+    print('  escaped, cached:        %10.1f us' % best(cached, 20, repeat))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,139 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Sample responses of a SoundTouch 30 used by the benchmark scripts.
+"""
+
+RESPONSES = {
+    'info': (
+        b'<?xml version="1.0" encoding="UTF-8" ?><info deviceID="A0B1C2D3E4F5">'
+        b'<name>Kitchen</name><type>SoundTouch 30</type>'
+        b'<margeAccountUUID>1</margeAccountUUID><components><component>'
+        b'<componentCategory>SCM</componentCategory>'
+        b'<softwareVersion>27.0.6.46330.5043500 epdbuild.trunk.hepdswbld04.2022-08-04T11:20:29</softwareVersion>'
+        b'<serialNumber>F1</serialNumber></component><component>'
+        b'<componentCategory>PackagedProduct</componentCategory>'
+        b'<softwareVersion>27.0.6.46330.5043500</softwareVersion>'
+        b'<serialNumber>069</serialNumber></component></components>'
+        b'<margeURL>https://streaming.bose.com</margeURL><networkInfo type="SCM">'
+        b'<macAddress>A0B1C2D3E4F5</macAddress><ipAddress>127.0.0.1</ipAddress>'
+        b'</networkInfo><moduleType>sm2</moduleType><variant>spotty</variant>'
+        b'<variantMode>normal</variantMode><countryCode>GB</countryCode>'
+        b'<regionCode>GB</regionCode></info>'
+    ),
+    'volume': (
+        b'<volume deviceID="A0B1C2D3E4F5"><targetvolume>32</targetvolume>'
+        b'<actualvolume>32</actualvolume><muteenabled>false</muteenabled></volume>'
+    ),
+    'nowPlaying': (
+        b'<nowPlaying deviceID="A0B1C2D3E4F5" source="INTERNET_RADIO" sourceAccount="">'
+        b'<ContentItem source="INTERNET_RADIO" location="4712" sourceAccount="" isPresetable="true">'
+        b'<itemName>Radio X</itemName><containerArt>http://x/y.png</containerArt>'
+        b'</ContentItem><track>Song</track><artist>Artist</artist>'
+        b'<album>Album</album><stationName>Radio X</stationName>'
+        b'<art artImageStatus="IMAGE_PRESENT">http://x/art.png</art>'
+        b'<time total="240">31</time><playStatus>PLAY_STATE</playStatus>'
+        b'<shuffleSetting>SHUFFLE_OFF</shuffleSetting>'
+        b'<repeatSetting>REPEAT_OFF</repeatSetting>'
+        b'<streamType>RADIO_STREAMING</streamType><trackID>t1</trackID>'
+        b'<description>desc</description><stationLocation>London</stationLocation>'
+        b'</nowPlaying>'
+    ),
+    'getZone': (
+        b'<zone master="A0B1C2D3E4F5" senderIPAddress="127.0.0.1">'
+        b'<member ipaddress="127.0.0.2">B0</member>'
+        b'<member ipaddress="127.0.0.3">C0</member></zone>'
+    ),
+    'capabilities': (
+        b'<capabilities deviceID="A0B1C2D3E4F5"><networkConfig>'
+        b'<dualMode>true</dualMode><wsapiproxy>true</wsapiproxy>'
+        b'<allInterfacesSupported /><wlanInterfaces /><security /></networkConfig>'
+        b'<lightswitch>false</lightswitch><clockDisplay>false</clockDisplay>'
+        b'<capability name="systemtimeout" url="/systemtimeout" />'
+        b'<capability name="rebroadcastlatencymode" url="/rebroadcastlatencymode" />'
+        b'<lrStereoCapable>true</lrStereoCapable>'
+        b'<bcoresetCapable>false</bcoresetCapable>'
+        b'<disablePowerSaving>true</disablePowerSaving></capabilities>'
+    ),
+    'netStats': (
+        b'<network-data><devices><device deviceID="A0B1C2D3E4F5">'
+        b'<deviceSerialNumber>F1</deviceSerialNumber><interfaces><interface>'
+        b'<name>eth0</name><mac>A0B1C2D3E4F6</mac><running>false</running>'
+        b'<kind>Ethernet</kind></interface><interface><name>wlan0</name>'
+        b'<mac>A0B1C2D3E4F5</mac><bindings><ipv4address>127.0.0.1</ipv4address>'
+        b'</bindings><running>true</running><kind>Wireless</kind><ssid>net</ssid>'
+        b'<rssi>-62</rssi><frequencyKHz>2437000</frequencyKHz></interface>'
+        b'</interfaces></device></devices></network-data>'
+    ),
+    'networkInfo': (
+        b'<networkInfo wifiProfileCount="1"><interfaces>'
+        b'<interface type="WIFI_INTERFACE" name="wlan0" macAddress="A0B1C2D3E4F5" ipAddress="127.0.0.1" ssid="net" frequencyKHz="2437000" state="NETWORK_WIFI_CONNECTED" signal="GOOD_SIGNAL" mode="STATION" />'
+        b'</interfaces></networkInfo>'
+    ),
+    'presets': (
+        b'<presets><preset id="1" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/1" sourceAccount="" isPresetable="true">'
+        b'<itemName>P1</itemName></ContentItem></preset>'
+        b'<preset id="2" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/2" sourceAccount="" isPresetable="true">'
+        b'<itemName>P2</itemName></ContentItem></preset>'
+        b'<preset id="3" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/3" sourceAccount="" isPresetable="true">'
+        b'<itemName>P3</itemName></ContentItem></preset>'
+        b'<preset id="4" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/4" sourceAccount="" isPresetable="true">'
+        b'<itemName>P4</itemName></ContentItem></preset>'
+        b'<preset id="5" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/5" sourceAccount="" isPresetable="true">'
+        b'<itemName>P5</itemName></ContentItem></preset>'
+        b'<preset id="6" createdOn="1" updatedOn="2">'
+        b'<ContentItem source="INTERNET_RADIO" type="stationurl" location="/v1/s/6" sourceAccount="" isPresetable="true">'
+        b'<itemName>P6</itemName></ContentItem></preset></presets>'
+    ),
+    'sources': (
+        b'<sources deviceID="A0B1C2D3E4F5">'
+        b'<sourceItem source="AUX" sourceAccount="AUX" status="READY" isLocal="true" multiroomallowed="true">AUX IN</sourceItem>'
+        b'<sourceItem source="SPOTIFY" sourceAccount="user1" status="READY" isLocal="false" multiroomallowed="true">user1</sourceItem>'
+        b'<sourceItem source="QPLAY" sourceAccount="QPlay1UserName" status="UNAVAILABLE" isLocal="true" multiroomallowed="true">QPlay1UserName</sourceItem>'
+        b'</sources>'
+    ),
+    'bass': (
+        b'<bass deviceID="A0B1C2D3E4F5"><targetbass>0</targetbass>'
+        b'<actualbass>0</actualbass></bass>'
+    ),
+}
+"""Node names mapped to a raw response body."""
+
+
+def firmware_index(devices: int = 60) -> bytes:
+    """Returns a firmware index.xml with the structure of the BOSE update index."""
+    return b''.join([b'<INDEX REVISION="1">'] + [
+        b'<DEVICE ID="%x" PRODUCTNAME="SoundTouch %d">'
+        b'<HARDWARE REVISION="%d">'
+        b'<RELEASE REVISION="27.0.6.46330.5043500" HTTPHOST="downloads.bose.com" '
+        b'URLPATH="/updates/soundtouch/prod/%d/Update.stu" USBPATH="/usb/%d/Update.stu">'
+        b'<IMAGE FILENAME="Update.stu" CHECKSUM="0123456789abcdef0123456789abcdef" SIZE="123456789" />'
+        b'<NOTES URL="https://downloads.bose.com/notes/%d.html" />'
+        b'<FEATURE NAME="spotify" VALUE="true" /><FEATURE NAME="alexa" VALUE="false" />'
+        b'</RELEASE></HARDWARE></DEVICE>' % (0x4000 + i, i, i % 3, i, i, i)
+        for i in range(devices)
+    ] + [b'</INDEX>'])
@@ -1,8 +1,12 @@
 from boseapi.model import *
 from boseapi.firmware import *
 from boseapi.client import SoundTouchClient
+from boseapi.metrics import *
+from boseapi.exporter import FleetExporter
+from boseapi.polling import PollScheduler
 
 from boseapi.ws.bosews import *
+from boseapi.ws.aiows import AsyncBoseWebSocket, WebSocketError
 
 from boseapi.common.device import *
 from boseapi.common.message import *
@@ -25,7 +25,8 @@ specified BOSE device. Warning: There are lots of functions that can be
 used to interact with the device. IT is recommended to read the docs before
 starting to use a client.
 """
-from xml.etree.ElementTree import fromstring, Element
+from time import perf_counter
+from xml.etree.ElementTree import Element
 
 import urllib3
 
@@ -37,8 +38,26 @@ from boseapi.common.message import (
     Key,
     Source
 )
-from boseapi.common import nodes
+from boseapi.common import nodes, xmlparser
+from boseapi.common.pool import shared_manager
+from boseapi.common.ratelimit import HostLimiter, host_limiters
+from boseapi.common.policy import (
+    RequestPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    DEFAULT_POLICY,
+    host_breakers
+)
 from boseapi import model
+from boseapi.metrics import (
+    RequestMetrics,
+    PHASE_ACQUIRE,
+    PHASE_NETWORK,
+    PHASE_PARSE,
+    PHASE_MODEL
+)
+
+_DEFAULT = object()
 
 class SoundTouchClient:
     """A simple client to interact with the BOSE WebAPI.
@@ -47,7 +66,9 @@ class SoundTouchClient:
     the standard WebAPI port.
 
     The client uses an urllib3.PoolManager instance to delegate the HTTP-requests.
-    Set a custom manager with the manage_traffic() method.
+    By default, all clients share the process-wide manager returned by
+    `boseapi.common.pool.shared_manager()`, so connections are kept alive across
+    client objects. Set a custom manager with the manage_traffic() method.
 
     Like the BoseWebSocket, this client can be used in two ways: 1. create a
     client manually or 2. use the client within a _with_ statement. Additionally,
@@ -66,11 +87,36 @@ class SoundTouchClient:
             The manager for HTTP requests to the device.
         config_manager:
             A dict to store the loaded configurations.
+        metrics: RequestMetrics = None
+            If set, all requests made by this client are recorded per device, node
+            and method. Use the instrument() method to enable it later on.
+        limiter: HostLimiter
+            Limits the request rate and the concurrent requests to the device. By
+            default, all clients of a device share the limiter stored in
+            `boseapi.common.ratelimit.host_limiters`. Set to None to disable it.
+        policy: RequestPolicy
+            The timeouts and retries of all requests (DEFAULT_POLICY by default).
+        breaker: CircuitBreaker
+            Rejects requests while the device seems to be down. By default, all
+            clients of a device share the breaker stored in
+            `boseapi.common.policy.host_breakers`. Set to None to disable it.
+        lazy: bool = False
+            If True, the model objects returned by this client keep the response and
+            decode each property on first access (see the lazy() method of the model
+            classes). Classes without lazy support are decoded immediately.
     """
-    def __init__(self, device: BoseDevice, errors: str = 'raise') -> None:
+    def __init__(self, device: BoseDevice, errors: str = 'raise',
+                 metrics: RequestMetrics = None, limiter: HostLimiter = _DEFAULT,
+                 policy: RequestPolicy = None, breaker: CircuitBreaker = _DEFAULT,
+                 lazy: bool = False) -> None:
         self.device = device
-        self.manager = urllib3.PoolManager(headers={'User-Agent': 'BoseApi/0.2.0'})
+        self.manager = shared_manager()
         self.config_manager = {}
+        self.metrics = metrics
+        self.limiter = host_limiters.get(device.host) if limiter is _DEFAULT else limiter
+        self.policy = policy if policy else DEFAULT_POLICY
+        self.breaker = host_breakers.get(device.host) if breaker is _DEFAULT else breaker
+        self.lazy = lazy
         self._errors = errors in ['ignore', 'IGNORE']
 
     def get(self, uri: SoundTouchUri) -> SoundTouchMessage:
@@ -153,7 +199,7 @@ class SoundTouchClient:
         Example:
         `message = client.put(nodes.volume, '<volume>0</volume>')`
         """
-        if not isinstance(body, str):
+        if not isinstance(body, (str, bytes)):
             body = body.to_xml()
         message = SoundTouchMessage(uri, body)
         self.make_request('POST', message)
@@ -183,30 +229,86 @@ class SoundTouchClient:
         :param msg: the altered message object
         :type msg: SoundTouchMessage
         :raises InterruptedError: if an error occurs while requesting content
+        :raises CircuitOpenError: if the device's circuit breaker rejected the request
         :return: the status code or allowed methods
         :rtype: int | list
         """
         if not method or not msg:
             return 400 # bad request
 
-        if msg.uri not in self.device.supportedUrls:
+        supported_urls = self.device.supported_urls
+        if supported_urls and msg.uri not in supported_urls:
             return 400
 
-        url = f'http://{self.device.host}:8090/{msg.uri}'
+        # The request is delegated to manager.urlopen() (and not to a pool of the
+        # manager) so that a ProxyManager set via manage_traffic() still applies
+        # its proxy and headers. Thus, PHASE_ACQUIRE covers the limiter wait and
+        # PHASE_NETWORK the pool lookup plus the round trip.
+        metrics = self.metrics
+        limiter = self.limiter
+        breaker = self.breaker
+        host = self.device.host
+        node = str(msg.uri)
+        if breaker is not None and not breaker.allow():
+            if metrics is not None:
+                metrics.count(host, node, method, 'circuit_open')
+            raise CircuitOpenError(f'Circuit open for "{host}"')
+
+        status = 'error'
+        acquired = sent = False
         try:
-            if msg.has_message:
-                response = self.manager.request(method, url, body=msg.get_message().encode('utf-8'))
-            else:
-                response = self.manager.request(method, url)
+            body = msg.get_message()
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            if metrics is not None:
+                started = perf_counter()
+            if limiter is not None:
+                acquired = limiter.acquire()
+            if metrics is not None:
+                current = perf_counter()
+                metrics.observe(host, node, method, PHASE_ACQUIRE, current - started)
+                started = current
+
+            sent = True
+            try:
+                response = self.manager.urlopen(method, f'http://{host}:8090/{node}',
+                                                body=body,
+                                                retries=self.policy.retries_for(method, node),
+                                                timeout=self.policy.timeout_for(node))
+            except Exception:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+
+            status = response.status
+            if breaker is not None:
+                if status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if metrics is not None:
+                current = perf_counter()
+                metrics.observe(host, node, method, PHASE_NETWORK, current - started)
+                started = current
 
             if response.status == 200 and response.data:
-                msg.set_response(fromstring(response.data))
+                msg.set_response(xmlparser.fromstring(response.data))
+                if metrics is not None:
+                    metrics.observe(host, node, method, PHASE_PARSE, perf_counter() - started)
                 self.raise_error(msg.response)
 
             response.close()
             return response.headers
         except Exception as err:
             raise InterruptedError(err) from err
+        finally:
+            if breaker is not None and not sent:
+                # a half-open trial must not be kept if the request never left
+                breaker.release_trial()
+            if acquired:
+                limiter.release()
+            if metrics is not None:
+                metrics.count(host, node, method, status)
 
     def __enter__(self) -> 'SoundTouchClient':
         return self
@@ -238,7 +340,19 @@ class SoundTouchClient:
         """
         msg = self.get(uri)
         if msg.response is not None:
-            self[uri] = class_type(root=msg.response)
+            if self.lazy and hasattr(class_type, 'lazy'):
+                factory = class_type.lazy
+            else:
+                factory = lambda root: class_type(root=root)
+
+            metrics = self.metrics
+            if metrics is None:
+                self[uri] = factory(msg.response)
+            else:
+                started = perf_counter()
+                self[uri] = factory(msg.response)
+                metrics.observe(self.device.host, uri, 'GET', PHASE_MODEL,
+                                perf_counter() - started)
         return self[uri]
 
     def get_property(self, uri: SoundTouchUri, class_type, refresh=True):
@@ -277,6 +391,15 @@ class SoundTouchClient:
         """Sets the request manager for this client."""
         if manager:
             self.manager = manager
+
+    def instrument(self, metrics: RequestMetrics):
+        """Sets (or removes with None) the metrics collector for this client.
+
+        Example:
+        `client.instrument(RequestMetrics())` and later on
+        `print(client.metrics.to_openmetrics())`
+        """
+        self.metrics = metrics
 ###############################################################################
 # API functions | set
 ###############################################################################
@@ -294,11 +417,11 @@ class SoundTouchClient:
         """Selects the given preset."""
         if not preset:
             raise ValueError('Invalid Preset (nullptr)')
-        return self.put(nodes.select, preset.xml_str)
+        return self.put(nodes.select, preset.xml_bytes)
 
     def select_content_item(self, item: model.ContentItem) -> SoundTouchMessage:
         """Selects the given ContentItem."""
-        return self.put(nodes.select, item.xml_str)
+        return self.put(nodes.select, item.xml_bytes)
 
     def select_source(self, src: Source) -> SoundTouchMessage:
         """Selects a new input source."""
@@ -376,6 +499,22 @@ class SoundTouchClient:
         """Set power on/off."""
         self.action(Key.POWER)
 
+    def sw_update_check(self) -> SoundTouchMessage:
+        """Lets the device look for a new software version."""
+        return self.get(nodes.swUpdateCheck)
+
+    def sw_update_start(self) -> SoundTouchMessage:
+        """Starts the installation of the available software update.
+
+        The device reports the progress with swUpdateStatusUpdated events
+        and restarts when the update was installed.
+        """
+        return self.get(nodes.swUpdateStart)
+
+    def sw_update_abort(self) -> SoundTouchMessage:
+        """Aborts the running software update (if the device allows it)."""
+        return self.get(nodes.swUpdateAbort)
+
 
 ###############################################################################
 # API functions | properties
@@ -676,3 +815,16 @@ class SoundTouchClient:
         object.
         """
         return self.get_property(nodes.sources, model.SourceItemList, refresh)
+
+    def sw_update_query(self, refresh=True) -> model.SoftwareUpdateStatus:
+        """Queries the state of the software update.
+
+        Arguments:
+        refresh: bool = True
+            If true, the internal configuration object will be replaced by the result
+            of this action.
+
+        Returns: SoftwareUpdateStatus
+        An object storing the update state and its progress in percent.
+        """
+        return self.get_property(nodes.swUpdateQuery, model.SoftwareUpdateStatus, refresh)
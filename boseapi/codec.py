@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+A compact serialization of the model classes for state transfer and caching.
+
+Objects are encoded as `[class name, values]`, where the values are stored in
+the order of the class' fields without any property names (nested objects
+are encoded the same way). The result is msgpack if the `msgpack` package is
+installed and compact JSON otherwise; decode() accepts both formats.
+
+Use to_dict()/from_dict() of the model classes if the receiver needs a
+self-describing format instead.
+"""
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from boseapi import model
+
+__all__ = ['encode', 'decode', 'CodecError', 'MSGPACK', 'JSON', 'DEFAULT_FORMAT']
+
+MSGPACK = 'msgpack'
+JSON = 'json'
+
+DEFAULT_FORMAT = MSGPACK if msgpack is not None else JSON
+"""The format used by encode() if none is given."""
+
+_TYPES = {
+    name: cls for name, cls in vars(model).items()
+    if isinstance(cls, type) and not name.startswith('_') and hasattr(cls, '_unpack')
+}
+
+
+class CodecError(ValueError):
+    """Raised when an object can not be encoded or decoded."""
+
+
+def encode(obj, fmt: str = None) -> bytes:
+    """Encodes the given model object.
+
+    :param obj: an object of any class in boseapi.model
+    :param fmt: MSGPACK or JSON, defaults to DEFAULT_FORMAT
+    :type fmt: str, optional
+    :raises CodecError: if the object is not a model object or msgpack was
+                        requested but is not installed
+    :return: the encoded object
+    :rtype: bytes
+    """
+    # lazy objects are instances of a subclass with the same name
+    name = type(obj).__name__
+    if name not in _TYPES or not isinstance(obj, _TYPES[name]):
+        raise CodecError('Can not encode objects of type %s' % type(obj).__name__)
+
+    data = [name, obj._pack()]
+    fmt = fmt or DEFAULT_FORMAT
+    if fmt == JSON:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+    if fmt == MSGPACK:
+        if msgpack is None:
+            raise CodecError('msgpack is not installed')
+        return msgpack.packb(data, use_bin_type=True)
+    raise CodecError('Unknown format: "%s"' % fmt)
+
+
+def decode(data: bytes):
+    """Decodes an object created by encode() (in any format).
+
+    :param data: the encoded object
+    :type data: bytes
+    :raises CodecError: if the data is malformed or of an unknown class
+    :return: the model object
+    """
+    try:
+        if data[:1] == b'[':
+            name, values = json.loads(data.decode('utf-8'))
+        elif msgpack is not None:
+            name, values = msgpack.unpackb(data, raw=False)
+        else:
+            raise CodecError('msgpack is not installed')
+        cls = _TYPES[name]
+        return cls._unpack(values)
+    except CodecError:
+        raise
+    except (KeyError, TypeError, ValueError) as err:
+        raise CodecError('Malformed data: %s' % err) from err
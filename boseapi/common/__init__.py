@@ -1,3 +1,3 @@
 from boseapi.common.message import *
-from boseapi.common.device import BoseDevice, BoseDeviceComponent, new_device
+from boseapi.common.device import BoseDevice, BoseDeviceComponent, new_device, load_info
 from boseapi.common import nodes
\ No newline at end of file
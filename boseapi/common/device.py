@@ -22,10 +22,11 @@
 import re
 import urllib3
 
-from xml.etree.ElementTree import fromstring
-
 from boseapi.model import InfoNetworkConfig
+from boseapi.common import xmlparser
 from boseapi.common.nodes import list_uris
+from boseapi.common.policy import DEFAULT_POLICY
+from boseapi.common.pool import shared_manager
 
 RE_IPV4_ADDRESS = r"\d{1,3}([.]\d{1,3}){3}"
 
@@ -145,6 +146,62 @@ class BoseDevice:
         return iter(self.components)
 
 
+def load_info(host: str, proxy: urllib3.ProxyManager = None) -> BoseDevice:
+    """Creates a new BoseDevice from the /info node of the given host.
+
+    Only http://host:8090/info is queried, so the supported URLs of the
+    returned device stay empty. Use this function instead of new_device()
+    when only the name, type and components of many devices are needed.
+
+    Arguments:
+        host: str
+            An IPv4 address of the target host.
+        proxy: Optional[urllib3.ProxyManager]
+            If a custom proxy should be used, it can be passed as a parameter. By
+            default, the process-wide shared_manager() is used.
+
+    Returns: BoseDevice
+
+    Raises:
+        ValueError: The host does not match the IPv4 pattern.
+        InterruptedError: An error occurred while fetching information from the
+                        target host.
+    """
+    if not host or not re.match(RE_IPV4_ADDRESS, host):
+        raise ValueError(f'Invalid host argument: "{host}"')
+
+    manager = proxy if proxy else shared_manager()
+    try:
+        response = manager.request('GET', f'http://{host}:8090/info',
+                                   retries=DEFAULT_POLICY.retries_for('GET', 'info'),
+                                   timeout=DEFAULT_POLICY.timeout_for('info'))
+        try:
+            if response.status != 200:
+                raise ConnectionError(f'Unexpected status {response.status} of /info')
+            root = xmlparser.fromstring(response.data)
+        finally:
+            response.close()
+
+        dev = BoseDevice(host, device_id=root.get('deviceID', None))
+        for e_name in ['name', 'type']:
+            element = root.find(e_name)
+            if element is not None and element.text:
+                setattr(dev, 'device_' + e_name, element.text)
+
+        for component in root.find('components'):
+            dev.components.append(BoseDeviceComponent(
+                category=component.findtext('componentCategory'),
+                serial_number=component.findtext('serialNumber'),
+                software_version=component.findtext('softwareVersion')
+            ))
+
+        for info in root.findall('networkInfo'):
+            dev.network_info.append(InfoNetworkConfig(info))
+        return dev
+    except Exception as err:
+        raise InterruptedError from err
+
+
 def new_device(host: str, proxy: urllib3.ProxyManager = None) -> BoseDevice:
     """Tries to create a new BoseDevice with a complete data section.
 
@@ -160,7 +217,8 @@ def new_device(host: str, proxy: urllib3.ProxyManager = None) -> BoseDevice:
         host: str
             An IPv4 address og the target host.
         proxy: Optional[urllib3.ProxyManager]
-            If a custom proxy should be used, it can be passed as a parameter.
+            If a custom proxy should be used, it can be passed as a parameter. By
+            default, the process-wide shared_manager() is used.
 
     Returns: Optional[BoseDevice]
         If the host does not match the IPv4 pattern, None will be returned as
@@ -170,35 +228,15 @@ def new_device(host: str, proxy: urllib3.ProxyManager = None) -> BoseDevice:
         InterruptedError: An error occurred while fetching information from the
                         target host.
     """
-    if not host or not re.match(RE_IPV4_ADDRESS, host):
-        raise ValueError(f'Invalid host argument: "{host}"')
-
-    manager = proxy if proxy else urllib3.PoolManager(headers={'User-Agent': 'BoseApi/0.1.2'})
+    manager = proxy if proxy else shared_manager()
+    dev = load_info(host, manager)
     try:
-        response = manager.request('GET', f'http://{host}:8090/info')
-        if response.status == 200:
-            root = fromstring(response.data)
-            dev = BoseDevice(host, device_id=root.get('deviceID', None))
-            for e_name in ['name', 'type']:
-                element = root.find(e_name)
-                if element.text:
-                    setattr(dev, 'device_' + e_name, element.text)
-
-        for component in root.find('components'):
-            dev.components.append(BoseDeviceComponent(
-                category=component.find('componentCategory').text,
-                serial_number=component.find('serialNumber').text,
-                software_version=component.find('softwareVersion').text
-            ))
-
-        for info in root.find('network_info'):
-            dev.network_info.append(InfoNetworkConfig(info))
-
-        response.close()
-        response = manager.request('GET', f'http://{host}:8090/supportedURLs')
+        response = manager.request('GET', f'http://{host}:8090/supportedURLs',
+                                   retries=DEFAULT_POLICY.retries_for('GET', 'supportedURLs'),
+                                   timeout=DEFAULT_POLICY.timeout_for('supportedURLs'))
         if response.status == 200:
             uris = list_uris()
-            for url_element in fromstring(response.data).findall('URL'):
+            for url_element in xmlparser.fromstring(response.data).findall('URL'):
                 name = url_element.get('location', default='/')[1:]
                 if name and name in uris:
                     dev.supported_urls.append(uris[name])
@@ -22,6 +22,8 @@
 from xml.etree.ElementTree import Element
 from enum import Enum
 
+from boseapi.common import xmlparser
+
 __all__ = [
     'SoundTouchUriScope', 'SoundTouchUriType', 'SoundTouchUri', 'SoundTouchMessage', 'Source', 'Key'
 ]
@@ -93,6 +95,9 @@ class SoundTouchUri:
     def __eq__(self, __o: object) -> bool:
         return self.path.__eq__(__o)
 
+    def __hash__(self) -> int:
+        return self.path.__hash__()
+
     def __len__(self) -> int:
         return self.path.__len__()
 
@@ -110,9 +115,9 @@ class SoundTouchMessage:
     Attributes:
         uri: SoundTouchUri
         The target uri which should be queried.
-        xml_message: str
+        xml_message: str | bytes
         If a key should be pressed or new data should be saved on the target
-        device, a xml formatted string is needed.
+        device, a xml formatted string (or its UTF-8 bytes) is needed.
         response: xml.etree.ElementTree.Element
         The response object as an XML-Element.
     """
@@ -136,11 +141,11 @@ class SoundTouchMessage:
         return self.get_message() is not None
 
     def is_simple_response(self) -> bool:
-        return self.response and len(self.response) != 0
+        return self.response is not None and len(self.response) != 0
 
     def set_response(self, response_object: Element):
-        """Set the response object."""
-        if isinstance(response_object, Element):
+        """Set the response object (an element of any XML backend)."""
+        if xmlparser.iselement(response_object):
             self.response = response_object
 
 
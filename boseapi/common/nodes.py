@@ -17,7 +17,7 @@ def list_uris() -> dict:
     :rtype: dict
     """
     values = {}
-    for uri_name, uri in __dict__.items():
+    for uri_name, uri in globals().items():
         if isinstance(uri, SoundTouchUri):
             values[uri_name] = uri
     return values
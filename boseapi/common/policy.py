@@ -0,0 +1,226 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+from threading import Lock
+
+from urllib3.util import Retry, Timeout
+
+__all__ = [
+    'RequestPolicy', 'CircuitBreaker', 'CircuitOpenError', 'BreakerRegistry',
+    'host_breakers', 'DEFAULT_POLICY'
+]
+
+
+class CircuitOpenError(InterruptedError):
+    """Raised when a request is rejected because the device's circuit is open."""
+
+
+class RequestPolicy:
+    """Timeouts and retries applied to each request of a client.
+
+    Reading requests (GET and OPTIONS) and POST requests to nodes listed in
+    `idempotent_nodes` are retried on connection, read and 5xx errors. All
+    other requests, for instance `/key` presses, are only retried if the
+    connection could not be established, because the device never saw them.
+    The same applies to nodes in `non_idempotent_nodes`: a GET request to
+    these nodes triggers an action (for example `swUpdateStart`), so it is
+    never repeated after it may have reached the device.
+
+    Attributes:
+        timeout: urllib3.Timeout
+            The default connect/read timeout.
+        node_timeouts: dict[str, urllib3.Timeout]
+            Node paths mapped to a timeout that replaces the default one.
+        retries: int
+            The maximum number of retries per request.
+        backoff_factor: float
+            The exponential backoff between retries (see urllib3.Retry).
+        retry_methods: tuple[str]
+            HTTP methods that are always safe to retry.
+        idempotent_nodes: set[str]
+            Node paths whose POST requests are safe to retry.
+        non_idempotent_nodes: set[str]
+            Node paths that are never retried once sent, regardless of the method.
+    """
+
+    def __init__(self, timeout: Timeout = None, node_timeouts: dict = None,
+                 retries: int = 2, backoff_factor: float = 0.25,
+                 retry_methods: tuple = ('GET', 'OPTIONS'),
+                 idempotent_nodes: set = None, non_idempotent_nodes: set = None) -> None:
+        self.timeout = timeout if timeout is not None else Timeout(connect=2.0, read=6.0)
+        self.node_timeouts = {
+            'performWirelessSiteSurvey': Timeout(connect=2.0, read=30.0),
+            'swUpdateCheck': Timeout(connect=2.0, read=30.0),
+            'searchStation': Timeout(connect=2.0, read=15.0),
+        }
+        if node_timeouts:
+            self.node_timeouts.update((str(k), v) for k, v in node_timeouts.items())
+        self.retries = max(0, retries)
+        self.backoff_factor = backoff_factor
+        self.retry_methods = tuple(retry_methods)
+        self.idempotent_nodes = set(idempotent_nodes) if idempotent_nodes is not None else {
+            'volume', 'bass', 'balance', 'name', 'language', 'systemtimeout',
+            'DSPMonoStereo', 'clockDisplay', 'clockTime', 'setZone'
+        }
+        self.non_idempotent_nodes = set(non_idempotent_nodes) if non_idempotent_nodes is not None else {
+            'resetDefaults', 'factoryDefault', 'setBCOReset', 'swUpdateStart', 'swUpdateAbort',
+            'swUpdateCheck', 'StartSoftwareUpdate', 'AbortSoftwareUpdate', 'SoftwareUpdateExit',
+            'clearBluetoothPaired', 'clearPairedList', 'enterBluetoothPairing', 'enterPairingMode',
+            'pairLightswitch', 'cancelPairLightswitch', 'performWirelessSiteSurvey', 'requestToken',
+            'pushCustomerSupportInfoToMarge', 'standby', 'lowPowerStandby', 'selectLastSource',
+            'selectLastWiFiSource', 'selectLastSoundTouchSource', 'selectLocalSource'
+        }
+
+    def timeout_for(self, node) -> Timeout:
+        """Returns the timeout of the given node."""
+        return self.node_timeouts.get(str(node), self.timeout)
+
+    def is_idempotent(self, method: str, node) -> bool:
+        """Returns whether the given request can be sent twice without harm."""
+        node = str(node)
+        if node in self.non_idempotent_nodes:
+            return False
+        return method in self.retry_methods or node in self.idempotent_nodes
+
+    def retries_for(self, method: str, node) -> Retry:
+        """Returns the urllib3.Retry configuration of the given request."""
+        if self.is_idempotent(method, node):
+            return Retry(
+                total=self.retries, backoff_factor=self.backoff_factor,
+                allowed_methods=None, status_forcelist=(500, 502, 503, 504),
+                raise_on_status=False, redirect=False
+            )
+        return Retry(
+            total=self.retries, connect=self.retries, read=0, status=0, other=0,
+            backoff_factor=self.backoff_factor, raise_on_status=False, redirect=False
+        )
+
+    def __repr__(self) -> str:
+        return '<RequestPolicy timeout=%s, retries=%d>' % (self.timeout, self.retries)
+
+
+DEFAULT_POLICY = RequestPolicy()
+"""The policy used by all clients that do not define their own policy."""
+
+
+class CircuitBreaker:
+    """Rejects requests to a device while it seems to be down.
+
+    The breaker opens after `failure_threshold` consecutive failures. While
+    it is open, every request fails immediately with a CircuitOpenError.
+    After `reset_timeout` seconds a single trial request is let through
+    (half-open): on success the breaker closes again, otherwise it stays
+    open for another `reset_timeout`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened = None
+        self._trial = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        """The current state: CLOSED, OPEN or HALF_OPEN."""
+        if self._opened is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Returns whether a request may be sent right now."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Gives up the half-open trial of a request that has never been sent."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        """Closes the breaker."""
+        with self._lock:
+            self.failures = 0
+            self._opened = None
+            self._trial = False
+
+    def record_failure(self):
+        """Counts a failure and opens the breaker if the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+            self._trial = False
+
+    def __repr__(self) -> str:
+        return '<CircuitBreaker state=%s, failures=%d>' % (self.state, self.failures)
+
+
+class BreakerRegistry:
+    """A thread-safe mapping of host addresses to their CircuitBreaker."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        """Returns the breaker of the given host (created with the registry's defaults)."""
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(host)
+                if breaker is None:
+                    breaker = self._breakers[host] = CircuitBreaker(
+                        self.failure_threshold, self.reset_timeout
+                    )
+        return breaker
+
+    def open_hosts(self) -> list:
+        """Returns all hosts whose breaker is currently not closed."""
+        return [host for host, breaker in self._breakers.items()
+                if breaker.state != CircuitBreaker.CLOSED]
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._breakers
+
+    def __len__(self) -> int:
+        return len(self._breakers)
+
+
+host_breakers = BreakerRegistry()
+"""The process-wide registry used by all SoundTouchClients by default."""
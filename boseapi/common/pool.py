@@ -0,0 +1,282 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+from collections import OrderedDict
+from threading import Lock, RLock
+
+import urllib3
+
+from boseapi.common.ratelimit import DEFAULT_MAX_IN_FLIGHT
+
+__all__ = ['SharedPoolManager', 'shared_manager', 'reset_shared_manager', 'DEFAULT_HEADERS']
+
+DEFAULT_HEADERS = {'User-Agent': 'BoseApi/0.2.0'}
+"""The headers sent with every request of the shared manager."""
+
+_MISSING = object()
+
+
+class _RecentlyUsedPools:
+    """A thread-safe, size-bounded mapping that keeps the most recently used pools.
+
+    The least recently used pool is passed to `dispose_func` once more than
+    `maxsize` pools are stored; removed and replaced pools are disposed as
+    well. The `lock` attribute is used by urllib3.PoolManager to make the
+    lookup and creation of a pool atomic.
+    """
+
+    def __init__(self, maxsize: int, dispose_func=None) -> None:
+        self.maxsize = maxsize
+        self.dispose_func = dispose_func
+        self.lock = RLock()
+        self._pools = OrderedDict()
+
+    def __getitem__(self, key):
+        with self.lock:
+            pool = self._pools.pop(key)
+            self._pools[key] = pool
+            return pool
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def peek(self, key, default=None):
+        """Returns the pool of the given key without marking it as used."""
+        with self.lock:
+            return self._pools.get(key, default)
+
+    def __setitem__(self, key, pool):
+        with self.lock:
+            evicted = self._pools.pop(key, _MISSING)
+            self._pools[key] = pool
+            if evicted is _MISSING and len(self._pools) > self.maxsize:
+                evicted = self._pools.popitem(last=False)[1]
+
+        if evicted is not _MISSING and evicted is not pool and self.dispose_func:
+            self.dispose_func(evicted)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            pool = self._pools.pop(key, _MISSING)
+        if pool is _MISSING:
+            return default
+        if self.dispose_func:
+            self.dispose_func(pool)
+        return pool
+
+    def clear(self):
+        with self.lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        if self.dispose_func:
+            for pool in pools:
+                self.dispose_func(pool)
+
+    def keys(self) -> list:
+        with self.lock:
+            return list(self._pools)
+
+    def __contains__(self, key) -> bool:
+        return key in self._pools
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+
+def _in_use(pool) -> bool:
+    # Each pool's queue starts with `maxsize` placeholders; a checked out
+    # connection is missing from it until it has been returned.
+    queue = getattr(pool, 'pool', None)
+    return queue is not None and queue.qsize() < queue.maxsize
+
+
+class SharedPoolManager(urllib3.PoolManager):
+    """A size-bounded PoolManager with idle eviction and usage statistics.
+
+    The manager stores one connection pool per host (at most `num_pools`,
+    the least recently used pool is closed first). Each pool keeps up to
+    `maxsize` connections alive and blocks further requests until a
+    connection is returned, but at most `pool_timeout` seconds (then an
+    urllib3.exceptions.EmptyPoolError is raised). Pools that have not been
+    used for `idle_timeout` seconds are closed on the next lookup or by
+    calling evict_idle(), unless one of their connections is still in use
+    (for instance by an unfinished streamed response).
+
+    Statistics (see stats()):
+        hits: int
+            Lookups that reused an existing pool.
+        misses: int
+            Lookups that created a new pool.
+        new_connections: int
+            TCP connections opened by all pools (including closed ones).
+        evictions: int
+            Pools closed because of the size bound or the idle timeout.
+    """
+
+    def __init__(self, num_pools: int = 128, maxsize: int = DEFAULT_MAX_IN_FLIGHT,
+                 idle_timeout: float = 120.0, headers: dict = None,
+                 pool_timeout: float = 10.0, **connection_pool_kw) -> None:
+        connection_pool_kw.setdefault('block', True)
+        super().__init__(num_pools=num_pools, headers=headers or dict(DEFAULT_HEADERS),
+                         maxsize=maxsize, **connection_pool_kw)
+        self.pools = _RecentlyUsedPools(num_pools, dispose_func=self._dispose)
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+        self.lookups = 0
+        self.misses = 0
+        self.evictions = 0
+        self._closed_connections = 0
+        self._closed_requests = 0
+        self._live_pools = set()
+        self._last_used = {}
+        self._last_eviction = time.monotonic()
+        self._stats_lock = Lock()
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        with self._stats_lock:
+            self.misses += 1
+            self._live_pools.add(pool)
+        return pool
+
+    def _dispose(self, pool):
+        with self._stats_lock:
+            self.evictions += 1
+            self._closed_connections += pool.num_connections
+            self._closed_requests += pool.num_requests
+            self._live_pools.discard(pool)
+        pool.close()
+
+    def connection_from_pool_key(self, pool_key, request_context=None):
+        now = time.monotonic()
+        if self.idle_timeout and now - self._last_eviction >= self.idle_timeout / 2:
+            self.evict_idle(now)
+
+        pool = super().connection_from_pool_key(pool_key, request_context)
+        with self._stats_lock:
+            self.lookups += 1
+            self._last_used[pool_key] = now
+        return pool
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        kw.setdefault('pool_timeout', self.pool_timeout)
+        return super().urlopen(method, url, redirect=redirect, **kw)
+
+    def evict_idle(self, now: float = None) -> int:
+        """Closes all pools that have been idle for longer than idle_timeout.
+
+        Pools with a checked out connection are kept until a later call.
+
+        :return: the number of closed pools
+        :rtype: int
+        """
+        now = time.monotonic() if now is None else now
+        self._last_eviction = now
+        with self._stats_lock:
+            idle = [key for key, used in self._last_used.items()
+                    if now - used >= self.idle_timeout]
+
+        evicted = 0
+        for key in idle:
+            with self.pools.lock:
+                pool = self.pools.peek(key)
+                if pool is not None and _in_use(pool):
+                    continue
+                with self._stats_lock:
+                    self._last_used.pop(key, None)
+                # dispose_func closes the pool and counts the eviction
+                if self.pools.pop(key) is not None:
+                    evicted += 1
+        return evicted
+
+    def clear(self):
+        """Closes all pools."""
+        with self._stats_lock:
+            self._last_used.clear()
+        super().clear()
+
+    @property
+    def hits(self) -> int:
+        """Lookups that reused an existing pool."""
+        return self.lookups - self.misses
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the usage statistics."""
+        with self._stats_lock:
+            pools = self._live_pools
+            return {
+                'pools': len(pools),
+                'hits': self.lookups - self.misses,
+                'misses': self.misses,
+                'new_connections': self._closed_connections + sum(
+                    pool.num_connections for pool in pools
+                ),
+                'requests': self._closed_requests + sum(
+                    pool.num_requests for pool in pools
+                ),
+                'evictions': self.evictions
+            }
+
+    def __repr__(self) -> str:
+        return '<SharedPoolManager pools=%d, hits=%d, misses=%d, evictions=%d>' % (
+            len(self.pools), self.hits, self.misses, self.evictions
+        )
+
+
+_shared_manager = None
+_shared_lock = Lock()
+
+
+def shared_manager(**kwargs) -> SharedPoolManager:
+    """Returns the process-wide SharedPoolManager.
+
+    All clients and the new_device() function use this manager by default,
+    so connections to a device are reused across client objects. Keyword
+    arguments are only applied when the manager is created (on the first
+    call); use reset_shared_manager() to change them later on.
+
+    :return: the shared manager
+    :rtype: SharedPoolManager
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_lock:
+            if _shared_manager is None:
+                _shared_manager = SharedPoolManager(**kwargs)
+    return _shared_manager
+
+
+def reset_shared_manager(**kwargs) -> SharedPoolManager:
+    """Closes the shared manager and replaces it with a new one.
+
+    Clients keep the manager they were created with.
+    """
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is not None:
+            _shared_manager.clear()
+        _shared_manager = SharedPoolManager(**kwargs)
+    return _shared_manager
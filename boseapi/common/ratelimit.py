@@ -0,0 +1,261 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+from collections import deque
+from threading import Condition, Lock
+
+__all__ = [
+    'TokenBucket', 'HostLimiter', 'LimiterRegistry', 'host_limiters',
+    'DEFAULT_MAX_IN_FLIGHT'
+]
+
+DEFAULT_MAX_IN_FLIGHT = 4
+"""The default number of concurrent requests per host."""
+
+
+class TokenBucket:
+    """A thread-safe token bucket to limit the rate of requests.
+
+    The bucket is refilled with `rate` tokens per second up to its capacity.
+    A rate of None (or <= 0) disables the limit, so every acquire succeeds
+    immediately.
+
+    Attributes:
+        rate: float
+            The number of tokens added per second.
+        capacity: float
+            The maximum number of stored tokens (the allowed burst size).
+    """
+
+    def __init__(self, rate: float = None, capacity: float = None) -> None:
+        self.rate = rate if rate and rate > 0 else None
+        self.capacity = float(capacity if capacity else max(1.0, self.rate or 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        """Returns whether this bucket does not limit anything."""
+        return self.rate is None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes the given tokens and returns the time to wait before using them.
+
+        The tokens are taken even if they are not available yet, which places
+        the caller in line behind all previous reservations.
+
+        :param tokens: the number of tokens, defaults to 1
+        :type tokens: float, optional
+        :return: the delay in seconds (0 if the tokens were available)
+        :rtype: float
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Takes the given tokens only if they are available right now."""
+        if self.rate is None:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def refund(self, tokens: float = 1):
+        """Returns reserved tokens that have not been used (up to the capacity)."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1):
+        """Blocks until the given tokens are available and takes them."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def __repr__(self) -> str:
+        return '<TokenBucket rate=%s, capacity=%s>' % (self.rate, self.capacity)
+
+
+class HostLimiter:
+    """Limits the rate and the number of concurrent requests to a single host.
+
+    Callers are served strictly in arrival order, regardless of whether they
+    read (GET) or write (POST), so a burst of queries can not starve a key
+    press and vice versa. A caller first waits for a token of the host's
+    TokenBucket and then for a free slot (at most `max_in_flight` requests
+    run at the same time), so waiting for the rate limit does not occupy a
+    slot.
+
+    Attributes:
+        bucket: TokenBucket
+            The rate limit of the host.
+        max_in_flight: int
+            The maximum number of concurrent requests (None for no limit).
+    """
+
+    def __init__(self, rate: float = None, burst: float = None,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        self._in_flight = 0
+        self._waiters = deque()
+        self._condition = Condition()
+        self.configure(rate, burst, max_in_flight)
+
+    def configure(self, rate: float = None, burst: float = None,
+                  max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        """Changes the limits of this host. Queued callers use the new limits."""
+        with self._condition:
+            self.bucket = TokenBucket(rate, burst)
+            self.max_in_flight = max_in_flight if max_in_flight and max_in_flight > 0 else None
+            self._condition.notify_all()
+
+    @property
+    def in_flight(self) -> int:
+        """The number of currently running requests."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """The number of queued callers."""
+        return len(self._waiters)
+
+    def _has_slot(self) -> bool:
+        return self.max_in_flight is None or self._in_flight < self.max_in_flight
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Waits for a token and a free slot in FIFO order.
+
+        :param timeout: the maximum time to wait for both, defaults to None
+        :type timeout: float, optional
+        :return: True, if the slot was acquired (release() must be called),
+                 False if the timeout expired.
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        bucket = self.bucket
+        delay = bucket.reserve()
+        if delay > 0:
+            if timeout is not None and delay > timeout:
+                bucket.refund()
+                return False
+            time.sleep(delay)
+
+        ticket = object()
+        with self._condition:
+            self._waiters.append(ticket)
+            while self._waiters[0] is not ticket or not self._has_slot():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(ticket)
+                    self._condition.notify_all()
+                    # no request has been sent with the token
+                    bucket.refund()
+                    return False
+                self._condition.wait(remaining)
+
+            self._waiters.popleft()
+            self._in_flight += 1
+            # the next caller may be able to proceed as well
+            self._condition.notify_all()
+        return True
+
+    def release(self):
+        """Releases a slot obtained through acquire()."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def __enter__(self) -> 'HostLimiter':
+        self.acquire()
+        return self
+
+    def __exit__(self, etype, value, traceback) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return '<HostLimiter rate=%s, max_in_flight=%s, in_flight=%d, waiting=%d>' % (
+            self.bucket.rate, self.max_in_flight, self.in_flight, self.waiting
+        )
+
+
+class LimiterRegistry:
+    """A thread-safe mapping of host addresses to their HostLimiter.
+
+    All clients of a process share the limiter of a host through the
+    `host_limiters` registry, so the limit applies to the device and not to
+    a single client object.
+    """
+
+    def __init__(self, rate: float = None, burst: float = None,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._limiters = {}
+        self._lock = Lock()
+
+    def get(self, host: str) -> HostLimiter:
+        """Returns the limiter of the given host (created with the registry's defaults)."""
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(host)
+                if limiter is None:
+                    limiter = self._limiters[host] = HostLimiter(
+                        self.rate, self.burst, self.max_in_flight
+                    )
+        return limiter
+
+    def configure(self, host: str, rate: float = None, burst: float = None,
+                  max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> HostLimiter:
+        """Changes the limits of the given host for all clients.
+
+        :return: the host's limiter
+        :rtype: HostLimiter
+        """
+        limiter = self.get(host)
+        limiter.configure(rate, burst, max_in_flight)
+        return limiter
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._limiters
+
+    def __len__(self) -> int:
+        return len(self._limiters)
+
+
+host_limiters = LimiterRegistry()
+"""The process-wide registry used by all SoundTouchClients by default."""
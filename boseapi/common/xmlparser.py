@@ -0,0 +1,139 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+The XML backend used to parse all responses, WebSocket packets and firmware
+files.
+
+The backend is selected on import through the `BOSEAPI_XML_BACKEND`
+environment variable:
+    - `stdlib` (default): xml.etree.ElementTree,
+    - `lxml`: lxml.etree (falls back to the standard library if missing),
+    - `auto`: lxml if it is installed, the standard library otherwise.
+
+lxml parses about 1.5-2x faster, but its elements are created lazily on
+access, so decoding the model classes takes longer than with the standard
+library. Select lxml if you mostly parse and forward elements (e.g. WebSocket
+listeners reading a single value) and keep the default for model objects
+(see benchmarks/bench_xml_backends.py).
+
+Use the module attributes (`xmlparser.fromstring(...)`) instead of importing
+the functions, so a backend changed with use_backend() takes effect everywhere.
+"""
+import os
+import warnings
+
+import xml.etree.ElementTree as xmltree
+
+from threading import local
+
+try:
+    from lxml import etree as _lxml
+except ImportError:
+    _lxml = None
+
+__all__ = [
+    'fromstring', 'tostring', 'iselement', 'use_backend', 'available_backends',
+    'backend', 'PARSE_ERRORS', 'BACKEND_ENV'
+]
+
+BACKEND_ENV = 'BOSEAPI_XML_BACKEND'
+"""The environment variable selecting the backend on import."""
+
+backend = None
+"""The name of the active backend ('lxml' or 'stdlib')."""
+
+fromstring = xmltree.fromstring
+"""Parses bytes (or a str) into the root element of the active backend."""
+
+tostring = xmltree.tostring
+"""Serializes an element of the active backend into bytes."""
+
+PARSE_ERRORS = (xmltree.ParseError,)
+"""A tuple of the exceptions raised by fromstring() on malformed input."""
+
+
+def iselement(obj) -> bool:
+    """Returns whether the given object is an element of any available backend."""
+    return isinstance(obj, _ELEMENT_TYPES)
+
+
+_ELEMENT_TYPES = (xmltree.Element,)
+
+
+def _lxml_backend() -> tuple:
+    # lxml parsers must not be used by two threads at the same time
+    parsers = local()
+
+    def lxml_fromstring(data):
+        parser = getattr(parsers, 'parser', None)
+        if parser is None:
+            # entities and network access stay disabled, the input comes
+            # from devices on the local network
+            parser = parsers.parser = _lxml.XMLParser(
+                resolve_entities=False, no_network=True,
+                remove_comments=True, remove_pis=True
+            )
+        if isinstance(data, str):
+            # lxml rejects str input that carries an encoding declaration
+            data = data.encode('utf-8')
+        return _lxml.fromstring(data, parser)
+
+    return lxml_fromstring, _lxml.tostring, (xmltree.ParseError, _lxml.XMLSyntaxError)
+
+
+def available_backends() -> list:
+    """Returns the names of all installed backends."""
+    return ['lxml', 'stdlib'] if _lxml is not None else ['stdlib']
+
+
+def use_backend(name: str = 'stdlib') -> str:
+    """Activates the given backend.
+
+    :param name: 'stdlib', 'lxml' or 'auto', defaults to 'stdlib'
+    :type name: str, optional
+    :raises ValueError: if the name is unknown
+    :return: the name of the activated backend, which is 'stdlib' if lxml
+             was requested but is not installed
+    :rtype: str
+    """
+    global backend, fromstring, tostring, PARSE_ERRORS, _ELEMENT_TYPES
+    name = (name or 'stdlib').lower()
+    if name not in ('auto', 'lxml', 'stdlib'):
+        raise ValueError('Unknown XML backend: "%s"' % name)
+
+    if name != 'stdlib' and _lxml is not None:
+        fromstring, tostring, PARSE_ERRORS = _lxml_backend()
+        _ELEMENT_TYPES = (xmltree.Element, _lxml._Element)
+        backend = 'lxml'
+    else:
+        fromstring, tostring = xmltree.fromstring, xmltree.tostring
+        PARSE_ERRORS = (xmltree.ParseError,)
+        _ELEMENT_TYPES = (xmltree.Element,)
+        backend = 'stdlib'
+    return backend
+
+
+try:
+    use_backend(os.environ.get(BACKEND_ENV, 'stdlib'))
+except ValueError as err:
+    warnings.warn('%s, using the default backend' % err)
+    use_backend('stdlib')
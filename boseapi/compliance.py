@@ -0,0 +1,332 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+A fleet-wide firmware compliance report.
+
+The installed software version of each device (taken from the components of
+the /info node) is compared with the release of its product in a
+FirmwareCatalogue. Devices are joined to the catalogue by their product
+name (`<type>` of /info and PRODUCTNAME of index.xml) or by an explicit
+mapping of device types to catalogue ids:
+
+    catalogue = FirmwareMirror('firmware').sync()
+    report = scan(hosts, catalogue, max_workers=64)
+
+    report.counts()      # -> {'SoundTouch 30': {'current': 12, 'outdated': 3, 'unknown': 0}, ...}
+    report.outdated()    # -> ['192.168.2.31', ...]
+
+Version strings are parsed once into tuples of integers and replaced by
+their rank among all versions of the report, so the comparison and the
+counting run on integer columns (numpy arrays if numpy is installed).
+"""
+import re
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import urllib3
+
+from boseapi.common.device import BoseDevice, load_info
+from boseapi.firmware import FirmwareCatalogue
+
+__all__ = [
+    'ComplianceReport', 'scan', 'check_compliance', 'fetch_devices', 'parse_version',
+    'installed_version', 'CURRENT', 'OUTDATED', 'UNKNOWN', 'STATES', 'VERSION_COMPONENTS'
+]
+
+CURRENT = 0
+"""The device runs the release of the catalogue or a newer one."""
+
+OUTDATED = 1
+"""The device runs an older version than the release of the catalogue."""
+
+UNKNOWN = 2
+"""The installed version or the product's release is not known."""
+
+STATES = ('current', 'outdated', 'unknown')
+"""The names of the states in code order."""
+
+VERSION_COMPONENTS = ('PackagedProduct', 'SCM')
+"""The component categories whose version is used, in order of preference."""
+
+_VERSION = re.compile(r'\d+(?:\.\d+)*')
+
+
+@lru_cache(maxsize=4096)
+def parse_version(text: str) -> tuple:
+    """Parses a version string into a tuple of integers.
+
+    Only the leading dotted numbers are used, so the build suffix of a
+    software version is ignored:
+
+    >>> parse_version('27.0.6.46330.5043500 epdbuild.trunk.hepdswbld04')
+    (27, 0, 6, 46330, 5043500)
+    >>> parse_version('unknown')
+    ()
+
+    :param text: the version string
+    :type text: str
+    :return: the version numbers, an empty tuple if there are none
+    :rtype: tuple
+    """
+    match = _VERSION.match(text.strip()) if text else None
+    return tuple(map(int, match.group().split('.'))) if match else ()
+
+
+def installed_version(device: BoseDevice, categories: tuple = VERSION_COMPONENTS) -> str:
+    """Returns the software version of the first component of the given categories.
+
+    :param device: a device loaded with load_info() or new_device()
+    :type device: BoseDevice
+    :param categories: the preferred component categories
+    :type categories: tuple
+    :return: the version string or None
+    :rtype: str
+    """
+    versions = {c.category: c.software_version for c in device.components
+                if c is not None and c.software_version}
+    for category in categories:
+        if category in versions:
+            return versions[category]
+    return None
+
+
+def fetch_devices(hosts: list, max_workers: int = 32,
+                  manager: urllib3.PoolManager = None) -> tuple:
+    """Loads the /info node of all hosts concurrently (see load_info()).
+
+    :param hosts: the IPv4 addresses of the devices
+    :type hosts: list[str]
+    :param max_workers: the maximum number of concurrent requests
+    :type max_workers: int
+    :param manager: the manager used for all requests, defaults to the shared manager
+    :type manager: urllib3.PoolManager, optional
+    :return: the loaded devices in host order and a dict of the failed hosts
+             mapped to their exception
+    :rtype: tuple[list[BoseDevice], dict[str, Exception]]
+    """
+    hosts = list(hosts)
+    devices, errors = [], {}
+    if not hosts:
+        return devices, errors
+
+    with ThreadPoolExecutor(max_workers=min(max(1, max_workers), len(hosts))) as executor:
+        futures = [executor.submit(load_info, host, manager) for host in hosts]
+    for host, future in zip(hosts, futures):
+        try:
+            devices.append(future.result())
+        except (ValueError, InterruptedError) as err:
+            errors[host] = err
+    return devices, errors
+
+
+class ComplianceReport:
+    """The compliance state of each device of a fleet.
+
+    Rows are in the order of the checked devices. `models[i]` is the label
+    of model code i (None for devices without a type).
+
+    Attributes:
+        hosts: list[str]
+            The device addresses in row order.
+        models: list[str]
+            The device types in code order.
+        targets: list[str]
+            The release revision of each model code (None if unknown).
+        model_codes: numpy.ndarray | array.array
+            The model code of each row.
+        states: numpy.ndarray | array.array
+            CURRENT, OUTDATED or UNKNOWN for each row.
+        versions: list[str]
+            The installed version of each row.
+        errors: dict[str, Exception]
+            The hosts that could not be loaded by scan().
+    """
+
+    def __init__(self, hosts: list, models: list, targets: list, model_codes,
+                 states, versions: list, errors: dict = None) -> None:
+        self.hosts = hosts
+        self.models = models
+        self.targets = targets
+        self.model_codes = model_codes
+        self.states = states
+        self.versions = versions
+        self.errors = errors if errors else {}
+
+    def counts(self) -> dict:
+        """Counts the devices of each model per state.
+
+        :return: each model mapped to a dict of 'current', 'outdated' and
+                 'unknown' counts
+        :rtype: dict[str, dict[str, int]]
+        """
+        width = len(STATES)
+        size = len(self.models) * width
+        if numpy is not None and isinstance(self.states, numpy.ndarray):
+            keys = self.model_codes.astype(numpy.intp) * width + self.states
+            flat = numpy.bincount(keys, minlength=size).tolist()
+        else:
+            flat = [0] * size
+            for code, state in zip(self.model_codes, self.states):
+                flat[code * width + state] += 1
+        return {
+            model: dict(zip(STATES, flat[code * width:(code + 1) * width]))
+            for code, model in enumerate(self.models)
+        }
+
+    def totals(self) -> dict:
+        """Returns the number of devices per state over all models."""
+        totals = dict.fromkeys(STATES, 0)
+        for counts in self.counts().values():
+            for state, count in counts.items():
+                totals[state] += count
+        return totals
+
+    def hosts_in(self, state: int) -> list:
+        """Returns the hosts of all devices in the given state."""
+        if numpy is not None and isinstance(self.states, numpy.ndarray):
+            return [self.hosts[row] for row in numpy.flatnonzero(self.states == state)]
+        return [host for host, value in zip(self.hosts, self.states) if value == state]
+
+    def outdated(self) -> list:
+        """Returns the hosts of all outdated devices."""
+        return self.hosts_in(OUTDATED)
+
+    def unknown(self) -> list:
+        """Returns the hosts of all devices whose state is unknown."""
+        return self.hosts_in(UNKNOWN)
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def __repr__(self) -> str:
+        totals = self.totals()
+        return '<ComplianceReport devices=%d, outdated=%d, unknown=%d, errors=%d>' % (
+            len(self), totals['outdated'], totals['unknown'], len(self.errors)
+        )
+
+
+def _release_index(catalogue: FirmwareCatalogue, product_ids: dict) -> dict:
+    # product names (and mapped device types) -> release revision
+    index = {}
+    for firmware in catalogue:
+        if firmware.product_name and firmware.release is not None:
+            index.setdefault(firmware.product_name, firmware.release.revision)
+    for device_type, device_id in (product_ids or {}).items():
+        release = catalogue.release_for(device_id)
+        index[device_type] = release.revision if release is not None else None
+    return index
+
+
+def check_compliance(devices: list, catalogue: FirmwareCatalogue,
+                     product_ids: dict = None, use_numpy: bool = True) -> ComplianceReport:
+    """Compares the installed versions of all devices with the catalogue.
+
+    Each device is joined to the release of its product: `product_ids` maps
+    device types to catalogue ids (an int or a hex string) and takes
+    precedence over the product names of the catalogue.
+
+    :param devices: devices loaded with load_info() or new_device()
+    :type devices: list[BoseDevice]
+    :param catalogue: the firmware catalogue
+    :type catalogue: FirmwareCatalogue
+    :param product_ids: device types mapped to catalogue ids, defaults to None
+    :type product_ids: dict, optional
+    :param use_numpy: whether numpy (if installed) should be used, defaults to True
+    :type use_numpy: bool, optional
+    :return: the compliance report
+    :rtype: ComplianceReport
+    """
+    releases = _release_index(catalogue, product_ids)
+    codes, models, targets = {}, [], []
+    hosts, model_codes, versions, installed = [], [], [], []
+    for device in devices:
+        model = device.device_type
+        code = codes.get(model)
+        if code is None:
+            code = codes[model] = len(models)
+            models.append(model)
+            targets.append(releases.get(model))
+        version = installed_version(device)
+        hosts.append(device.host)
+        model_codes.append(code)
+        versions.append(version)
+        installed.append(parse_version(version))
+
+    # each distinct version is replaced by its rank, 0 marks unknown versions
+    known = set(installed)
+    target_versions = [parse_version(revision) for revision in targets]
+    known.update(target_versions)
+    known.discard(())
+    ranks = {version: rank for rank, version in enumerate(sorted(known), 1)}
+    ranks[()] = 0
+    installed_ranks = [ranks[version] for version in installed]
+    target_ranks = [ranks[version] for version in target_versions]
+
+    if use_numpy and numpy is not None:
+        model_codes = numpy.array(model_codes, dtype=numpy.intp)
+        current = numpy.array(installed_ranks, dtype=numpy.int32)
+        target = numpy.array(target_ranks, dtype=numpy.int32)[model_codes]
+        states = numpy.where(
+            (current == 0) | (target == 0), UNKNOWN,
+            numpy.where(current < target, OUTDATED, CURRENT)
+        ).astype(numpy.int8)
+    else:
+        states = array('b', [
+            UNKNOWN if not current or not target_ranks[code]
+            else OUTDATED if current < target_ranks[code] else CURRENT
+            for code, current in zip(model_codes, installed_ranks)
+        ])
+        model_codes = array('i', model_codes)
+    return ComplianceReport(hosts, models, targets, model_codes, states, versions)
+
+
+def scan(hosts: list, catalogue: FirmwareCatalogue, max_workers: int = 32,
+         manager: urllib3.PoolManager = None, product_ids: dict = None) -> ComplianceReport:
+    """Loads the /info node of all hosts and checks them against the catalogue.
+
+    Hosts that could not be loaded are not part of the counts, they are
+    stored in the `errors` attribute of the report.
+
+    :param hosts: the IPv4 addresses of the devices
+    :type hosts: list[str]
+    :param catalogue: the firmware catalogue (e.g. FirmwareMirror.sync())
+    :type catalogue: FirmwareCatalogue
+    :param max_workers: the maximum number of concurrent requests, defaults to 32
+    :type max_workers: int, optional
+    :param manager: the manager used for all requests, defaults to the shared manager
+    :type manager: urllib3.PoolManager, optional
+    :param product_ids: device types mapped to catalogue ids (see check_compliance())
+    :type product_ids: dict, optional
+    :return: the compliance report
+    :rtype: ComplianceReport
+    """
+    devices, errors = fetch_devices(hosts, max_workers, manager)
+    report = check_compliance(devices, catalogue, product_ids)
+    report.errors = errors
+    return report
@@ -0,0 +1,371 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Finds SoundTouch devices on the local network.
+
+Candidates are collected from SSDP (an M-SEARCH to the UPnP multicast group)
+and, optionally, from a TCP sweep of a CIDR range on the WebAPI port 8090.
+Each candidate is verified by loading its /info node (see load_info()), and
+the devices are yielded as soon as they are verified:
+
+    for device in discover('192.168.0.0/22'):
+        print(device.device_name, device.host)
+
+The sweep opens at most `max_workers` connections at the same time, so a
+/22 network (1022 addresses) takes about four connect timeouts. Only IPv4
+networks with a prefix of at least /16 (MIN_PREFIX) can be swept.
+"""
+import ipaddress
+import socket
+import sys
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from queue import Queue
+from threading import Event, Lock
+from typing import Iterator
+from urllib.parse import urlsplit
+
+from boseapi.common.device import load_info
+
+__all__ = [
+    'DeviceDiscovery', 'discover', 'ssdp_search', 'sweep', 'probe', 'SSDP_ADDRESS',
+    'SEARCH_TARGETS', 'WEBAPI_PORT', 'MIN_PREFIX'
+]
+
+SSDP_ADDRESS = ('239.255.255.250', 1900)
+"""The UPnP multicast group and port."""
+
+SEARCH_TARGETS = ('urn:schemas-upnp-org:device:MediaRenderer:1', 'upnp:rootdevice')
+"""The search targets sent with each M-SEARCH."""
+
+WEBAPI_PORT = 8090
+"""The port of the WebAPI, probed by the sweep."""
+
+MIN_PREFIX = 16
+"""The shortest prefix length of a swept network (at most 65534 hosts)."""
+
+_M_SEARCH = (
+    'M-SEARCH * HTTP/1.1\r\n'
+    'HOST: %s:%d\r\n'
+    'MAN: "ssdp:discover"\r\n'
+    'MX: %d\r\n'
+    'ST: %s\r\n'
+    '\r\n'
+)
+
+_DONE = object()
+_STOP_INTERVAL = 0.1
+
+
+def _parse_response(data: bytes) -> dict:
+    # the header lines of an SSDP response, keys in upper case
+    lines = data.decode('utf-8', 'replace').split('\r\n')
+    if not lines or not lines[0].upper().startswith('HTTP/'):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition(':')
+        if sep:
+            headers[key.strip().upper()] = value.strip()
+    return headers
+
+
+def ssdp_search(timeout: float = 3.0, search_targets: tuple = SEARCH_TARGETS,
+                address: tuple = SSDP_ADDRESS, interface: str = None,
+                stop: Event = None) -> Iterator:
+    """Sends an M-SEARCH and yields the responding hosts until the timeout.
+
+    :param timeout: the seconds to wait for responses, defaults to 3.0
+    :type timeout: float, optional
+    :param search_targets: the ST values to search for
+    :type search_targets: tuple[str], optional
+    :param address: the group (or a unicast address) and port, defaults to SSDP_ADDRESS
+    :type address: tuple, optional
+    :param interface: the IPv4 address of the sending interface, defaults to None
+    :type interface: str, optional
+    :param stop: ends the search early once it is set, defaults to None
+    :type stop: threading.Event, optional
+    :yield: tuples of the host address and the response headers; a host is
+            yielded once, even if it answers multiple search targets
+    :rtype: Iterator[tuple[str, dict]]
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        if interface:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        mx = max(1, min(5, int(timeout)))
+        for target in search_targets:
+            sock.sendto((_M_SEARCH % (address[0], address[1], mx, target)).encode('ascii'), address)
+
+        seen = set()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop is not None and stop.is_set()):
+                return
+            sock.settimeout(remaining if stop is None else min(remaining, _STOP_INTERVAL))
+            try:
+                data, sender = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            headers = _parse_response(data)
+            if headers is None:
+                continue
+            host = urlsplit(headers.get('LOCATION', '')).hostname or sender[0]
+            if host not in seen:
+                seen.add(host)
+                yield host, headers
+    finally:
+        sock.close()
+
+
+def _sweep_network(network: str) -> ipaddress.IPv4Network:
+    # devices have IPv4 addresses, and sweeping larger networks is a mistake
+    parsed = ipaddress.ip_network(network, strict=False)
+    if parsed.version != 4:
+        raise ValueError('Only IPv4 networks can be swept: "%s"' % network)
+    if parsed.prefixlen < MIN_PREFIX:
+        raise ValueError('Network "%s" is larger than /%d' % (network, MIN_PREFIX))
+    return parsed
+
+
+def probe(host: str, port: int = WEBAPI_PORT, timeout: float = 0.5) -> bool:
+    """Returns whether a TCP connection to the given port can be opened."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def sweep(network: str, port: int = WEBAPI_PORT, max_workers: int = 256,
+          timeout: float = 0.5, stop: Event = None) -> Iterator:
+    """Probes all host addresses of a network and yields those with an open port.
+
+    :param network: the network in CIDR notation, e.g. '192.168.0.0/22'
+    :type network: str
+    :param port: the probed port, defaults to WEBAPI_PORT
+    :type port: int, optional
+    :param max_workers: the maximum number of concurrent connection attempts
+    :type max_workers: int, optional
+    :param timeout: the connect timeout per address, defaults to 0.5
+    :type timeout: float, optional
+    :param stop: ends the sweep early once it is set; only the running
+                 attempts are waited for, defaults to None
+    :type stop: threading.Event, optional
+    :raises ValueError: if the network is invalid, not IPv4 or has a prefix
+                        shorter than MIN_PREFIX
+    :yield: the addresses with an open port, in completion order
+    :rtype: Iterator[str]
+    """
+    network = _sweep_network(network)
+    workers = min(max(1, max_workers), network.num_addresses)
+
+    def attempt(host: str) -> str:
+        return host if probe(host, port, timeout) else None
+
+    # addresses are generated while probing, at most `workers` are in flight
+    hosts = iter(network.hosts())
+    running = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            for host in hosts:
+                if stop is not None and stop.is_set():
+                    break
+                running.add(executor.submit(attempt, str(host)))
+                if len(running) >= workers:
+                    break
+            if not running or (stop is not None and stop.is_set()):
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    yield future.result()
+
+
+def _cancel(executor: ThreadPoolExecutor, futures: list):
+    # shuts the executor down without running its queued tasks
+    if sys.version_info >= (3, 9):
+        executor.shutdown(wait=True, cancel_futures=True)
+    else:
+        for future in list(futures):
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class DeviceDiscovery:
+    """Collects candidates from SSDP and a network sweep and verifies them.
+
+    Iterating over the discovery runs it once and yields each verified
+    BoseDevice as soon as its /info node was loaded. Candidates found by both
+    SSDP and the sweep are verified once.
+
+    Statistics of the last run (see `stats`):
+        ssdp: int
+            Hosts that answered the M-SEARCH.
+        swept: int
+            Hosts with an open WebAPI port.
+        verified: int
+            Candidates whose /info node could be loaded.
+        rejected: int
+            Candidates that are no SoundTouch device (or did not answer).
+        seconds: float
+            The duration of the run.
+
+    :param networks: networks in CIDR notation to sweep, defaults to None
+    :type networks: str | list[str], optional
+    :param ssdp: whether an M-SEARCH is sent, defaults to True
+    :type ssdp: bool, optional
+    :param ssdp_timeout: the seconds to wait for SSDP responses
+    :type ssdp_timeout: float, optional
+    :param sweep_timeout: the connect timeout of the sweep
+    :type sweep_timeout: float, optional
+    :param max_workers: the maximum number of concurrent connection attempts
+    :type max_workers: int, optional
+    :param verify_workers: the maximum number of concurrent /info requests
+    :type verify_workers: int, optional
+    :param manager: the urllib3 PoolManager used to load /info, defaults to
+                    the shared manager
+    :param ssdp_address: the address the M-SEARCH is sent to
+    :type ssdp_address: tuple, optional
+    """
+
+    def __init__(self, networks=None, ssdp: bool = True, ssdp_timeout: float = 3.0,
+                 sweep_timeout: float = 0.5, max_workers: int = 256,
+                 verify_workers: int = 16, manager=None,
+                 ssdp_address: tuple = SSDP_ADDRESS, interface: str = None) -> None:
+        self.networks = [networks] if isinstance(networks, str) else list(networks or ())
+        self.ssdp = ssdp
+        self.ssdp_timeout = ssdp_timeout
+        self.sweep_timeout = sweep_timeout
+        self.max_workers = max(1, max_workers)
+        self.verify_workers = max(1, verify_workers)
+        self.manager = manager
+        self.ssdp_address = ssdp_address
+        self.interface = interface
+        self.devices = {}
+        self.stats = {}
+        self._lock = Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def __iter__(self) -> Iterator:
+        started = time.monotonic()
+        self.stats = {'ssdp': 0, 'swept': 0, 'verified': 0, 'rejected': 0, 'seconds': 0.0}
+        self.devices = {}
+        results = Queue()
+        candidates = set()
+        verifying = []
+        pending = [0]
+        stop = Event()
+
+        def finished():
+            with self._lock:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    results.put(_DONE)
+
+        def verify(host):
+            try:
+                device = load_info(host, self.manager)
+            except (ValueError, InterruptedError):
+                self._count('rejected')
+            else:
+                self._count('verified')
+                results.put(device)
+            finally:
+                finished()
+
+        def submit(host, source):
+            with self._lock:
+                self.stats[source] += 1
+                if host in candidates:
+                    return
+                candidates.add(host)
+                pending[0] += 1
+            verifying.append(verifier.submit(verify, host))
+
+        def produce(source, hosts):
+            try:
+                for host in hosts:
+                    if stop.is_set():
+                        break
+                    submit(host, source)
+            finally:
+                hosts.close()
+                finished()
+
+        producers = []
+        if self.ssdp:
+            producers.append(('ssdp', lambda: (host for host, _ in ssdp_search(
+                self.ssdp_timeout, address=self.ssdp_address, interface=self.interface,
+                stop=stop))))
+        for network in self.networks:
+            _sweep_network(network)   # raises ValueError early
+            producers.append(('swept', lambda network=network: sweep(
+                network, WEBAPI_PORT, self.max_workers, self.sweep_timeout, stop)))
+        if not producers:
+            return
+
+        pending[0] = len(producers)
+        verifier = ThreadPoolExecutor(max_workers=self.verify_workers)
+        producer_pool = ThreadPoolExecutor(max_workers=len(producers))
+        try:
+            for source, hosts in producers:
+                producer_pool.submit(lambda source=source, hosts=hosts: produce(source, hosts()))
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                self.devices[item.host] = item
+                yield item
+        finally:
+            # the caller may stop iterating early: end the SSDP search and the
+            # sweeps and drop the candidates that are not verified yet
+            stop.set()
+            producer_pool.shutdown(wait=True)
+            _cancel(verifier, verifying)
+            self.stats['seconds'] = time.monotonic() - started
+
+    def __repr__(self) -> str:
+        return '<DeviceDiscovery networks=%s, ssdp=%s, devices=%d>' % (
+            self.networks, self.ssdp, len(self.devices)
+        )
+
+
+def discover(networks=None, ssdp: bool = True, **kwargs) -> Iterator:
+    """Yields the SoundTouch devices found via SSDP and an optional sweep.
+
+    Keyword arguments are passed to DeviceDiscovery.
+
+    :param networks: networks in CIDR notation to sweep, defaults to None
+    :type networks: str | list[str], optional
+    :param ssdp: whether an M-SEARCH is sent, defaults to True
+    :type ssdp: bool, optional
+    :yield: the verified devices (without supported URLs, see load_info())
+    :rtype: Iterator[BoseDevice]
+    """
+    return iter(DeviceDiscovery(networks, ssdp, **kwargs))
@@ -0,0 +1,421 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+The `exporter` module serves fleet metrics of multiple BOSE devices on a local
+`/metrics` endpoint that can be scraped by Prometheus.
+
+Device values are cached per group (volume, status, zone and network) and only
+stale groups are fetched again, with a bounded number of concurrent requests.
+If the devices support the WebSocket-API, volume, status and zone updates are
+applied to the cache as they arrive, so a scrape usually triggers no HTTP
+request at all. The exporter can be started from the command line:
+
+>>> python -m boseapi.exporter --port 9120 192.168.1.10 192.168.1.11
+"""
+import argparse
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+
+from boseapi import model
+from boseapi.client import SoundTouchClient
+from boseapi.common import nodes
+from boseapi.common.device import BoseDevice, new_device
+from boseapi.metrics import RequestMetrics, format_sample
+from boseapi.ws.bosews import BoseWebSocket, VOLUME_UPDATE, STATUS_UPDATE, ZONE_UPDATE
+
+__all__ = ['DeviceState', 'FleetExporter', 'MetricsServer', 'CONTENT_TYPE']
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+"""The content type of the rendered metrics."""
+
+GROUP_VOLUME = 'volume'
+GROUP_STATUS = 'status'
+GROUP_ZONE = 'zone'
+GROUP_NETWORK = 'network'
+
+DEFAULT_TTL = {
+    GROUP_VOLUME: 10.0,
+    GROUP_STATUS: 10.0,
+    GROUP_ZONE: 30.0,
+    GROUP_NETWORK: 60.0
+}
+"""Default cache lifetime (in seconds) of each value group."""
+
+GROUP_NODES = {
+    GROUP_VOLUME: (nodes.volume, model.Volume),
+    GROUP_STATUS: (nodes.nowPlaying, model.Status),
+    GROUP_ZONE: (nodes.getZone, model.Zone),
+    GROUP_NETWORK: (nodes.netStats, model.NetworkStats)
+}
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    """The HTTP server of the exporter (one thread per request)."""
+    daemon_threads = True
+
+
+class DeviceState:
+    """The cached values of a single device.
+
+    Attributes:
+        device: BoseDevice
+            The device these values belong to.
+        client: SoundTouchClient
+            The client used to fetch new values.
+        up: bool
+            False, if the last request to the device failed.
+        volume: model.Volume
+            The last known volume config.
+        status: model.Status
+            The last known playing status.
+        zone: model.Zone
+            The last known multiroom config.
+        net_stats: model.NetworkStats
+            The last known network stats (RSSI and frequency).
+        updated: dict[str, float]
+            The monotonic timestamp of the last update per value group.
+        scrape_duration: float
+            The duration of the last fetch in seconds.
+    """
+
+    def __init__(self, device: BoseDevice, client: SoundTouchClient) -> None:
+        self.device = device
+        self.client = client
+        self.up = False
+        self.volume = None
+        self.status = None
+        self.zone = None
+        self.net_stats = None
+        self.updated = {}
+        self.scrape_duration = 0.0
+        self.websocket = None
+
+    def stale_groups(self, ttl: dict, now: float) -> list:
+        """Returns all value groups whose cached values are older than their TTL."""
+        return [name for name, lifetime in ttl.items()
+                if now - self.updated.get(name, float('-inf')) >= lifetime]
+
+    def labels(self) -> dict:
+        """Returns the identifying labels of this device."""
+        return {
+            'host': self.device.host,
+            'device_id': self.device.device_id or '',
+            'name': self.device.device_name or ''
+        }
+
+    def __repr__(self) -> str:
+        return '<DeviceState host="%s", up=%s>' % (self.device.host, self.up)
+
+
+class FleetExporter:
+    """Collects and renders metrics of a whole fleet of BOSE devices.
+
+    :param devices: the devices to export
+    :type devices: list[BoseDevice]
+    :param max_workers: the maximum number of concurrent device requests, defaults to 16
+    :type max_workers: int, optional
+    :param ttl: the cache lifetime per value group, defaults to DEFAULT_TTL
+    :type ttl: dict, optional
+    :param metrics: an optional collector shared by all clients; its values are
+                    rendered together with the device metrics.
+    :type metrics: RequestMetrics, optional
+
+    Example:
+    `FleetExporter([new_device('127.0.0.1')]).serve(port=9120)`
+    """
+
+    def __init__(self, devices: list, max_workers: int = 16, ttl: dict = None,
+                 metrics: RequestMetrics = None) -> None:
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.metrics = metrics
+        self.max_workers = max(1, max_workers)
+        self.states = [
+            DeviceState(device, SoundTouchClient(device, errors='ignore', metrics=metrics))
+            for device in devices
+        ]
+        self._lock = Lock()
+        self._refresh_lock = Lock()
+        self._server = None
+
+    def refresh(self, force: bool = False) -> int:
+        """Fetches all stale value groups of all devices concurrently.
+
+        :param force: whether all values should be fetched, defaults to False
+        :type force: bool, optional
+        :return: the number of devices that have been contacted
+        :rtype: int
+        """
+        # concurrent scrapes wait for the running refresh and reuse its values
+        with self._refresh_lock:
+            now = time.monotonic()
+            work = []
+            for state in self.states:
+                groups = list(self.ttl) if force else state.stale_groups(self.ttl, now)
+                if groups:
+                    work.append((state, groups))
+
+            if work:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(work))) as executor:
+                    for state, groups in work:
+                        executor.submit(self._fetch, state, groups)
+            return len(work)
+
+    def _fetch(self, state: DeviceState, groups: list):
+        client = state.client
+        started = time.monotonic()
+        try:
+            for group in groups:
+                node, class_type = GROUP_NODES[group]
+                response = client.get(node).response
+                # The client ignores device errors, so an <errors> response
+                # has to be rejected here instead of becoming a model object.
+                if response is None or response.tag == 'errors':
+                    raise ConnectionError('No valid response for "%s"' % group)
+                self._apply(state, group, class_type(response))
+            state.up = True
+        except Exception:
+            state.up = False
+        state.scrape_duration = time.monotonic() - started
+
+    def _apply(self, state: DeviceState, group: str, value):
+        with self._lock:
+            if group == GROUP_VOLUME:
+                state.volume = value
+            elif group == GROUP_STATUS:
+                state.status = value
+            elif group == GROUP_ZONE:
+                state.zone = value
+            else:
+                state.net_stats = value
+            state.updated[group] = time.monotonic()
+
+    def start_notifications(self):
+        """Opens a WebSocket connection to each device to keep values fresh.
+
+        Devices without WebSocket support (see Capabilities.wsapiproxy) are
+        polled on every scrape instead.
+        """
+        for state in self.states:
+            if state.websocket:
+                continue
+            try:
+                if not state.client.capabilities().wsapiproxy:
+                    continue
+            except Exception:
+                continue
+
+            websocket = BoseWebSocket(state.device)
+            websocket.add_listener(VOLUME_UPDATE, self._listener(state, GROUP_VOLUME, 'volume', model.Volume))
+            websocket.add_listener(STATUS_UPDATE, self._listener(state, GROUP_STATUS, 'nowPlaying', model.Status))
+            websocket.add_listener(ZONE_UPDATE, self._listener(state, GROUP_ZONE, 'zone', model.Zone))
+            websocket.start_notification()
+            state.websocket = websocket
+
+    def stop_notifications(self):
+        """Closes all WebSocket connections."""
+        for state in self.states:
+            if state.websocket:
+                state.websocket.stop_notification()
+                state.websocket = None
+
+    def _listener(self, state: DeviceState, group: str, tag: str, class_type):
+        def on_update(event):
+            element = event.find(tag)
+            if element is not None:
+                self._apply(state, group, class_type(element))
+                state.up = True
+        return on_update
+
+    def collect(self) -> str:
+        """Refreshes stale values and renders all metrics in the OpenMetrics format.
+
+        :return: the exposition text
+        :rtype: str
+        """
+        self.refresh()
+        lines = []
+        with self._lock:
+            self._render(lines)
+
+        if self.metrics is not None:
+            text = self.metrics.to_openmetrics()
+            lines.append(text[:text.rindex('# EOF')].rstrip('\n'))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def _render(self, lines: list):
+        families = {}
+
+        def add(name, kind, doc, labels, value):
+            if value is None:
+                return
+            if name not in families:
+                families[name] = (kind, doc, [])
+            families[name][2].append(format_sample(name, labels, value))
+
+        now = time.monotonic()
+        wall = time.time()
+        for state in self.states:
+            labels = state.labels()
+            add('boseapi_device_up', 'gauge', 'Whether the last request to the device succeeded.',
+                labels, int(state.up))
+            add('boseapi_device_scrape_duration_seconds', 'gauge', 'Duration of the last fetch.',
+                labels, state.scrape_duration)
+            for group, updated in state.updated.items():
+                add('boseapi_device_last_update_timestamp_seconds', 'gauge',
+                    'Time of the last update per value group.',
+                    dict(labels, group=group), wall - (now - updated))
+
+            if state.volume is not None:
+                add('boseapi_volume_actual', 'gauge', 'The actual volume.', labels,
+                    state.volume.actual_vol)
+                add('boseapi_volume_target', 'gauge', 'The targeted volume.', labels,
+                    state.volume.target_vol)
+                add('boseapi_volume_muted', 'gauge', 'Whether the device is muted.', labels,
+                    int(bool(state.volume.muted)))
+
+            if state.status is not None:
+                add('boseapi_play_status', 'gauge', 'The current play status and source.',
+                    dict(labels, status=state.status.play_status or '',
+                         source=state.status.source or ''), 1)
+
+            if state.zone is not None:
+                add('boseapi_zone_members', 'gauge', 'Number of zone members (0 if no zone).',
+                    labels, len(state.zone))
+                add('boseapi_zone_master', 'gauge',
+                    'Whether the device is the master of its zone.', labels,
+                    int(bool(state.zone.master_id) and state.zone.master_id == state.device.device_id))
+
+            if state.net_stats is not None:
+                for interface in state.net_stats:
+                    if_labels = dict(labels, interface=interface.name or '')
+                    add('boseapi_net_running', 'gauge', 'Whether the interface is running.',
+                        if_labels, int(interface.running == 'true'))
+                    add('boseapi_wifi_rssi_dbm', 'gauge', 'The wireless signal strength.',
+                        if_labels, _number(interface.rssi))
+                    add('boseapi_wifi_frequency_khz', 'gauge', 'The wireless frequency.',
+                        if_labels, _number(interface.frequencyKHz))
+
+        for name, (kind, doc, samples) in families.items():
+            lines.append('# HELP %s %s' % (name, doc))
+            lines.append('# TYPE %s %s' % (name, kind))
+            lines.extend(samples)
+
+    def serve(self, address: str = '127.0.0.1', port: int = 9120) -> MetricsServer:
+        """Starts serving `/metrics` in a background thread.
+
+        :param address: the local address to bind to, defaults to '127.0.0.1'
+        :type address: str, optional
+        :param port: the local port, defaults to 9120
+        :type port: int, optional
+        :return: the running server (use shutdown() to stop it)
+        :rtype: MetricsServer
+        """
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.collect().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                """Requests are not logged."""
+
+        self._server = MetricsServer((address, port), MetricsHandler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        """Stops the HTTP server and closes all WebSocket connections."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.stop_notifications()
+
+    def __enter__(self) -> 'FleetExporter':
+        return self
+
+    def __exit__(self, etype, value, traceback) -> None:
+        self.shutdown()
+
+
+def _number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_device(host: str) -> BoseDevice:
+    try:
+        return new_device(host)
+    except Exception:
+        # the device is exported as being down until it answers
+        return BoseDevice(host)
+
+
+def main(argv: list = None):
+    """Command line entry point of the fleet exporter."""
+    parser = argparse.ArgumentParser(description='Prometheus exporter for BOSE SoundTouch devices.')
+    parser.add_argument('hosts', nargs='+', help='IPv4 addresses of the devices')
+    parser.add_argument('--address', default='127.0.0.1', help='local address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=9120, help='local port (default: 9120)')
+    parser.add_argument('--workers', type=int, default=16, help='concurrent device requests')
+    parser.add_argument('--ttl', type=float, default=None,
+                        help='cache lifetime of all value groups in seconds')
+    parser.add_argument('--no-websocket', action='store_true',
+                        help='do not use WebSocket notifications')
+    args = parser.parse_args(argv)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        devices = list(executor.map(_load_device, args.hosts))
+
+    ttl = dict.fromkeys(DEFAULT_TTL, args.ttl) if args.ttl is not None else None
+    exporter = FleetExporter(devices, max_workers=args.workers, ttl=ttl, metrics=RequestMetrics())
+    if not args.no_websocket:
+        exporter.start_notifications()
+    exporter.serve(args.address, args.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.shutdown()
+
+
+if __name__ == '__main__':
+    main()
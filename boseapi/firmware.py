@@ -24,8 +24,11 @@ The `stu` module contains methods and classes related to the update process.
 Classes defined here are made to store data.
 """
 
+import io
 import xml.etree.ElementTree as xmltree
 
+from typing import Iterator
+
 BOSE_ST_INDEX_URL = 'https://downloads.bose.com/updates/soundtouch'
 """
 To fetch the BOSE SoundTouch index.xml file this URL has to be visited.
@@ -74,7 +77,7 @@ class Release:
         :return: An object containing all relevant information about a software release.
         :rtype: Release
         """
-        if not element:
+        if element is None:
             raise ValueError('Expected non null input')
 
         release = Release(
@@ -88,7 +91,7 @@ class Release:
             release.image = image.attrib
 
         notes = element.find('NOTES')
-        if notes:
+        if notes is not None:
             release.notes_url = notes.get('URL', None)
 
         for feature in element.findall('FEATURE'):
@@ -140,7 +143,7 @@ class Firmware:
         :return: the parsed firmware object
         :rtype: Firmware
         """
-        if not element:
+        if element is None:
             raise ValueError('Invalid XML-Element')
 
         dev = Firmware(
@@ -148,7 +151,7 @@ class Firmware:
             element.get('PRODUCTNAME')
         )
         hardware_el = element.find('HARDWARE')
-        if hardware_el:
+        if hardware_el is not None:
             dev.revision = hardware_el.get('REVISION', None)
             dev.release = Release.loadxml(hardware_el.find('RELEASE'))
 
@@ -196,7 +199,7 @@ class Product:
         :return: An object containing all relevant information about a software release.
         :rtype: Product
         """
-        if not element:
+        if element is None:
             raise ValueError('Invalid XML-Element (nullptr)')
 
         return Product(
@@ -217,7 +220,7 @@ def load_index(root: xmltree.Element) -> list:
     :return:  A list of parsed firmware releases.
     :rtype: list
     """
-    if not root:
+    if root is None:
         return []
 
     elements = []
@@ -236,7 +239,7 @@ def load_lookupxml(root: xmltree.Element) -> list:
     :return:  A list of parsed products.
     :rtype: list
     """
-    if not root:
+    if root is None:
         return []
 
     data = []
@@ -246,3 +249,136 @@ def load_lookupxml(root: xmltree.Element) -> list:
     for prod in root.findall('PRA-PRODUCT'):
         data.append(Product.loadxml(prod))
     return data
+
+
+def _iterparse(source, tags: tuple) -> Iterator:
+    # yields the complete elements with one of the given tags below the root
+    # and clears the root afterwards, so only one entry is kept in memory
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    root = None
+    for event, element in xmltree.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = element
+        elif event == 'end' and element.tag in tags:
+            yield element
+            root.clear()
+
+
+def iter_index(source) -> Iterator:
+    """Streams the Firmware objects of an index.xml file.
+
+    Unlike load_index(), the document is never built completely: each DEVICE
+    entry is converted as soon as it was read and freed afterwards.
+
+    :param source: a file name, a binary file object or the document's bytes
+    :return: the firmware of each DEVICE entry in document order
+    :rtype: Iterator[Firmware]
+    """
+    for element in _iterparse(source, ('DEVICE',)):
+        yield Firmware.loadxml(element)
+
+
+def iter_lookup(source) -> Iterator:
+    """Streams the Product objects of a lookup.xml file (see iter_index()).
+
+    :param source: a file name, a binary file object or the document's bytes
+    :return: the products of all PRODUCT and PRA-PRODUCT entries in document order
+    :rtype: Iterator[Product]
+    """
+    for element in _iterparse(source, ('PRODUCT', 'PRA-PRODUCT')):
+        yield Product.loadxml(element)
+
+
+def _hex_id(value) -> int:
+    return int(value, 16) if isinstance(value, str) else value
+
+
+class FirmwareCatalogue:
+    """Firmware and products indexed by device id, product id and release revision.
+
+    Example:
+        catalogue = FirmwareCatalogue()
+        catalogue.load_index('index.xml')
+        release = catalogue.release_for(0x4020)   # or '4020'
+
+    Attributes:
+        firmware: dict[int, Firmware]
+            The device ids mapped to their firmware (the first entry wins).
+        products: dict[int, Product]
+            The product ids mapped to their product (the first entry wins).
+    """
+
+    def __init__(self) -> None:
+        self.firmware = {}
+        self.products = {}
+        self._revisions = {}
+
+    def add_firmware(self, firmware: Firmware):
+        """Adds a firmware object to the indexes."""
+        if firmware.device_id not in self.firmware:
+            self.firmware[firmware.device_id] = firmware
+            release = firmware.release
+            if release is not None:
+                self._revisions.setdefault(release.revision, []).append(firmware)
+
+    def add_product(self, product: Product):
+        """Adds a product to the index."""
+        self.products.setdefault(product.product_id, product)
+
+    def load_index(self, source) -> int:
+        """Streams an index.xml file into the catalogue (see iter_index()).
+
+        :return: the number of DEVICE entries read
+        :rtype: int
+        """
+        count = 0
+        for count, firmware in enumerate(iter_index(source), 1):
+            self.add_firmware(firmware)
+        return count
+
+    def load_lookup(self, source) -> int:
+        """Streams a lookup.xml file into the catalogue (see iter_lookup()).
+
+        :return: the number of product entries read
+        :rtype: int
+        """
+        count = 0
+        for count, product in enumerate(iter_lookup(source), 1):
+            self.add_product(product)
+        return count
+
+    def get_firmware(self, device_id) -> Firmware:
+        """Returns the firmware of a device id (an int or a hex string), or None."""
+        return self.firmware.get(_hex_id(device_id))
+
+    def get_product(self, product_id) -> Product:
+        """Returns the product of a product id (an int or a hex string), or None."""
+        return self.products.get(_hex_id(product_id))
+
+    def release_for(self, device_id) -> Release:
+        """Returns the release that applies to the given device id, or None."""
+        firmware = self.get_firmware(device_id)
+        return firmware.release if firmware is not None else None
+
+    def by_revision(self, revision: str) -> list:
+        """Returns the firmware of all devices whose release has the given revision."""
+        return list(self._revisions.get(revision, ()))
+
+    def revisions(self) -> list:
+        """Returns all release revisions in the catalogue."""
+        return list(self._revisions)
+
+    def __contains__(self, device_id) -> bool:
+        return _hex_id(device_id) in self.firmware
+
+    def __iter__(self) -> Iterator:
+        return iter(self.firmware.values())
+
+    def __len__(self) -> int:
+        return len(self.firmware)
+
+    def __repr__(self) -> str:
+        return '<FirmwareCatalogue firmware=%d, products=%d, revisions=%d>' % (
+            len(self.firmware), len(self.products), len(self._revisions)
+        )
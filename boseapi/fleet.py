@@ -0,0 +1,382 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+A columnar snapshot of the state of many devices for fleet-wide queries.
+
+Instead of one set of model objects per device, the FleetSnapshot stores each
+value in a column indexed by the device's row: numpy arrays if numpy is
+installed, `array.array` columns otherwise. Categorical values (play status
+and source) are stored as integer codes. Queries like "all muted devices" or
+"rssi < -70" are evaluated on whole columns:
+
+    fleet = FleetSnapshot()
+    fleet.listen(socket)                    # updated in place by WebSocket events
+    fleet.update_network(device_id, client.net_stats())
+
+    fleet.where('muted', '==', True)        # -> ['A0B1C2D3E4F5', ...]
+    fleet.where('rssi', '<', -70)
+    fleet.counts('play_status')             # -> {'PLAY_STATE': 12, ...}
+
+Each column has a value that marks a missing value (see COLUMNS), e.g. the
+rssi of wired devices. Missing values never match a comparison, so wired
+devices are not part of `where('rssi', '>', -50)`; compare with None to find
+them instead (`where('rssi', '==', None)`).
+"""
+import operator
+
+from array import array
+from threading import Lock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from boseapi import model
+from boseapi.common.message import Source
+
+__all__ = ['FleetSnapshot', 'COLUMNS', 'PLAY_STATES']
+
+COLUMNS = (
+    # name, typecode, missing value (out of the column's valid range)
+    ('actual_vol', 'h', -1),
+    ('target_vol', 'h', -1),
+    ('muted', 'b', -1),
+    ('rssi', 'h', -32768),
+    ('frequencyKHz', 'i', 0),
+    ('play_status', 'H', 0),
+    ('source', 'H', 0),
+)
+"""The columns of a FleetSnapshot."""
+
+_MISSING = {name: missing for name, _, missing in COLUMNS}
+
+_VOLUME_TAGS = (
+    ('actual_vol', 'actualvolume'), ('target_vol', 'targetvolume'), ('muted', 'muteenabled')
+)
+
+PLAY_STATES = ('PLAY_STATE', 'PAUSE_STATE', 'STOP_STATE', 'BUFFERING_STATE', 'INVALID_PLAY_STATUS')
+"""The play states that are known before the first update."""
+
+_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+def _int(value, missing: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return missing
+
+
+class _Vocabulary:
+    # maps the values of a categorical column to codes, None is code 0
+    __slots__ = ('labels', 'codes')
+
+    def __init__(self, labels) -> None:
+        self.labels = [None]
+        self.codes = {None: 0}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class FleetSnapshot:
+    """The state of many devices stored in columns (see COLUMNS).
+
+    Each device gets a row on its first update, `devices[row]` is the id of
+    the device stored in a row. All update methods are thread-safe, so one
+    snapshot can be shared by the listeners of many BoseWebSockets. Queries
+    do not block updates and may see a value that is updated concurrently.
+
+    Attributes:
+        devices: list[str]
+            The device ids in row order.
+        vectorized: bool
+            Whether the columns are numpy arrays.
+    """
+
+    def __init__(self, capacity: int = 64, use_numpy: bool = True) -> None:
+        self.devices = []
+        self.vectorized = use_numpy and numpy is not None
+        self._rows = {}
+        self._vocabularies = {
+            'play_status': _Vocabulary(PLAY_STATES),
+            'source': _Vocabulary(sorted({source.name for source in Source})),
+        }
+        self._columns = {name: self._new_column(typecode, missing, 0)
+                         for name, typecode, missing in COLUMNS}
+        self._capacity = 0
+        self._lock = Lock()
+        self._grow(max(1, capacity))
+
+    def _new_column(self, typecode: str, missing: int, size: int):
+        if self.vectorized:
+            return numpy.full(size, missing, dtype=typecode)
+        return array(typecode, [missing]) * size
+
+    def _grow(self, capacity: int):
+        for name, typecode, missing in COLUMNS:
+            old = self._columns[name]
+            if self.vectorized:
+                column = self._new_column(typecode, missing, capacity)
+                column[:len(old)] = old
+            else:
+                column = old + self._new_column(typecode, missing, capacity - len(old))
+            self._columns[name] = column
+        self._capacity = capacity
+
+    def row(self, device_id: str) -> int:
+        """Returns the row of the given device and adds the device if necessary."""
+        row = self._rows.get(device_id)
+        if row is None:
+            with self._lock:
+                row = self._rows.get(device_id)
+                if row is None:
+                    row = len(self.devices)
+                    if row == self._capacity:
+                        self._grow(self._capacity * 2)
+                    self.devices.append(device_id)
+                    self._rows[device_id] = row
+        return row
+
+    def set(self, device_id: str, **values):
+        """Stores the given column values of a device.
+
+        Values of the play_status and source columns are labels (e.g.
+        'PLAY_STATE') and are translated to codes.
+
+        :param device_id: the id of the device
+        :type device_id: str
+        :raises KeyError: if a column does not exist
+        """
+        row = self.row(device_id)
+        with self._lock:
+            for name, value in values.items():
+                vocabulary = self._vocabularies.get(name)
+                if vocabulary is not None:
+                    value = vocabulary.code(value)
+                self._columns[name][row] = value
+
+    def update_volume(self, device_id: str, volume: model.Volume):
+        """Stores the actual_vol, target_vol and muted columns."""
+        self.set(device_id, actual_vol=volume.actual_vol,
+                 target_vol=volume.target_vol, muted=bool(volume.muted))
+
+    def update_status(self, device_id: str, status: model.Status):
+        """Stores the play_status and source columns."""
+        self.set(device_id, play_status=status.play_status, source=status.source)
+
+    def update_network(self, device_id: str, stats: model.NetworkStats):
+        """Stores the rssi and frequencyKHz columns of the device's wireless interface.
+
+        Both values are missing if the device has no wireless interface.
+        """
+        rssi, frequency = _MISSING['rssi'], _MISSING['frequencyKHz']
+        for interface in stats:
+            if interface.rssi is not None:
+                self.set(device_id, rssi=_int(interface.rssi, rssi),
+                         frequencyKHz=_int(interface.frequencyKHz, frequency))
+                return
+        self.set(device_id, rssi=rssi, frequencyKHz=frequency)
+
+    def update_client(self, client, refresh: bool = False):
+        """Stores the volume, status and network stats of a SoundTouchClient.
+
+        :param client: the client of the device
+        :type client: SoundTouchClient
+        :param refresh: whether to query the device or to use the cached
+                        objects only, defaults to False
+        :type refresh: bool, optional
+        """
+        device_id = client.device.device_id or client.device.host
+        volume = client.volume(refresh)
+        if volume is not None:
+            self.update_volume(device_id, volume)
+        status = client.status(refresh)
+        if status is not None:
+            self.update_status(device_id, status)
+        stats = client.net_stats(refresh)
+        if stats is not None:
+            self.update_network(device_id, stats)
+
+    def apply(self, device_id: str, update) -> bool:
+        """Applies a WebSocket update (volumeUpdated or nowPlayingUpdated).
+
+        :param device_id: the id of the device that sent the update
+        :type device_id: str
+        :param update: the update element
+        :type update: Element
+        :return: whether the update changed any column
+        :rtype: bool
+        """
+        if update.tag == 'volumeUpdated':
+            root = update.find('volume')
+            if root is not None:
+                # Volume would store 0 for fields missing in the event
+                values = {}
+                for name, tag in _VOLUME_TAGS:
+                    text = root.findtext(tag)
+                    if text is None:
+                        values[name] = _MISSING[name]
+                    elif name == 'muted':
+                        values[name] = int(text == 'true')
+                    else:
+                        values[name] = _int(text, _MISSING[name])
+                self.set(device_id, **values)
+                return True
+        elif update.tag == 'nowPlayingUpdated':
+            root = update.find('nowPlaying')
+            if root is not None:
+                # only the two attributes are decoded
+                self.update_status(device_id, model.Status.lazy(root))
+                return True
+        return False
+
+    def listen(self, socket, device_id: str = None):
+        """Updates the snapshot on each volume and status event of a BoseWebSocket.
+
+        :param socket: the socket of the device
+        :type socket: BoseWebSocket
+        :param device_id: the id stored in `devices`, defaults to the
+                          device's id (or its host if the id is unknown)
+        :type device_id: str, optional
+        """
+        device_id = device_id or socket.device.device_id or socket.device.host
+        self.row(device_id)
+        listener = lambda update: self.apply(device_id, update)
+        socket.add_listener('volumeUpdated', listener)
+        socket.add_listener('nowPlayingUpdated', listener)
+
+    def column(self, name: str):
+        """Returns the values of the given column for all devices.
+
+        The result is a numpy view (or an array copy) in row order, use
+        labels() to translate the codes of categorical columns.
+
+        :raises KeyError: if the column does not exist
+        """
+        return self._columns[name][:len(self.devices)]
+
+    def labels(self, name: str) -> list:
+        """Returns the labels of a categorical column, indexed by their code."""
+        return list(self._vocabularies[name].labels)
+
+    def mask(self, name: str, op: str, value):
+        """Compares a column with the given value.
+
+        :param name: the column name
+        :type name: str
+        :param op: one of '==', '!=', '<', '<=', '>' and '>='
+        :type op: str
+        :param value: a number, True/False, the label of a categorical column
+                      or None to compare with missing values
+        :raises KeyError: if the column or operator does not exist
+        :raises ValueError: if None is compared with another operator than == or !=
+        :return: a boolean numpy array (or a list of bools) in row order,
+                 missing values only match a comparison with None
+        """
+        compare = _OPERATORS[op]
+        missing = _MISSING[name]
+        values = self.column(name)
+        if value is None:
+            if op not in ('==', '!='):
+                raise ValueError('Missing values can only be compared with == or !=')
+            value = missing
+        else:
+            vocabulary = self._vocabularies.get(name)
+            if vocabulary is not None:
+                value = vocabulary.codes.get(value, -1)
+            if self.vectorized:
+                return compare(values, value) & (values != missing)
+            return [x != missing and compare(x, value) for x in values]
+
+        if self.vectorized:
+            return compare(values, value)
+        return [compare(x, value) for x in values]
+
+    def select(self, mask) -> list:
+        """Returns the ids of the devices selected by a mask (see mask())."""
+        if self.vectorized:
+            rows = numpy.flatnonzero(mask)
+        else:
+            rows = [row for row, selected in enumerate(mask) if selected]
+        devices = self.devices
+        return [devices[row] for row in rows]
+
+    def where(self, name: str, op: str = '==', value=True) -> list:
+        """Returns the ids of all devices whose column matches (see mask())."""
+        return self.select(self.mask(name, op, value))
+
+    def counts(self, name: str) -> dict:
+        """Counts the devices per label of a categorical column.
+
+        :return: each label (None for unknown values) mapped to its count,
+                 labels without devices are left out
+        :rtype: dict
+        """
+        labels = self._vocabularies[name].labels
+        values = self.column(name)
+        if self.vectorized:
+            counts = numpy.bincount(values, minlength=len(labels))
+        else:
+            counts = [0] * len(labels)
+            for code in values:
+                counts[code] += 1
+        return {labels[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def get(self, device_id: str) -> dict:
+        """Returns the values of a single device (labels for categorical columns).
+
+        Missing values are returned as None.
+
+        :raises KeyError: if the device is not part of the snapshot
+        """
+        row = self._rows[device_id]
+        result = {}
+        for name, _, missing in COLUMNS:
+            value = int(self._columns[name][row])
+            vocabulary = self._vocabularies.get(name)
+            if vocabulary is not None:
+                result[name] = vocabulary.labels[value]
+            else:
+                result[name] = None if value == missing else value
+        if result['muted'] is not None:
+            result['muted'] = bool(result['muted'])
+        return result
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._rows
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __repr__(self) -> str:
+        return '<FleetSnapshot devices=%d, vectorized=%s>' % (len(self.devices), self.vectorized)
@@ -0,0 +1,333 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Downloads the firmware images referenced by the releases of a catalogue.
+
+Images are streamed to disk in chunks and verified against the SIZE and
+CHECKSUM attributes of `Release.image` while they are written. Interrupted
+downloads are kept as `.part` files and resumed with a Range request.
+Releases that share an image (the same checksum) are downloaded once:
+
+    downloader = ImageDownloader('/srv/firmware/images', max_workers=4)
+    paths = downloader.download(catalogue)       # Release -> local file
+    print(downloader.stats)
+"""
+import hashlib
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from urllib3.util import Retry, Timeout
+
+from boseapi.common.pool import shared_manager
+from boseapi.firmware import Firmware, Release
+
+__all__ = ['ImageDownloader', 'ChecksumError', 'image_url', 'DEFAULT_CHUNK_SIZE']
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+"""The number of bytes read from the response and written to disk at once."""
+
+_HASHES = {32: 'md5', 40: 'sha1', 64: 'sha256'}
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-\d+/(?:\d+|\*)')
+
+
+class ChecksumError(ValueError):
+    """Raised when a downloaded image does not match its size or checksum."""
+
+
+def image_url(release: Release, scheme: str = 'https') -> str:
+    """Returns the download URL of the release's image, or None.
+
+    :param release: the release
+    :type release: Release
+    :param scheme: the scheme used with the release's host, defaults to 'https'
+    :type scheme: str, optional
+    :rtype: str
+    """
+    if not release.uri:
+        return None
+    if not release.host or '://' in release.uri:
+        return release.uri
+    return '%s://%s/%s' % (scheme, release.host, release.uri.lstrip('/'))
+
+
+def _size(release: Release) -> int:
+    try:
+        return int(release.image.get('SIZE'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _range_start(content_range: str) -> int:
+    # the first byte of a 206 response, None if the header is missing or invalid
+    match = _CONTENT_RANGE.match(content_range or '')
+    return int(match.group(1)) if match else None
+
+
+def _checksum(release: Release) -> str:
+    checksum = (release.image.get('CHECKSUM') or '').strip().lower()
+    return checksum if len(checksum) in _HASHES and re.fullmatch('[0-9a-f]+', checksum) else None
+
+
+class _Image:
+    # one file on disk, shared by all releases with the same checksum
+    __slots__ = ('url', 'path', 'name', 'size', 'checksum')
+
+    def __init__(self, url: str, path: str, name: str, size: int, checksum: str) -> None:
+        self.url = url
+        self.path = path
+        self.name = name
+        self.size = size
+        self.checksum = checksum
+
+    def new_hash(self):
+        return hashlib.new(_HASHES[len(self.checksum)]) if self.checksum else None
+
+
+class ImageDownloader:
+    """Downloads firmware images in parallel into a local directory.
+
+    Each image is stored in a file named by its checksum (or by the hash of
+    its URL if the release has no checksum), so releases that list the same
+    image under different FILENAMEs share one file. Images that already
+    exist with the expected size are not downloaded again.
+
+    Statistics of the last download() (see `stats`):
+        images: int
+            Distinct images referenced by the releases.
+        deduplicated: int
+            Releases whose image is shared with another release.
+        skipped: int
+            Images that already existed.
+        downloaded: int
+            Images that were downloaded and verified.
+        resumed: int
+            Downloads continued from a partial file.
+        bytes: int
+            Bytes received from the server.
+        errors: int
+            Images that could not be downloaded or verified (see `errors`).
+
+    :param directory: the image directory, created if necessary
+    :type directory: str
+    :param max_workers: the maximum number of concurrent downloads
+    :type max_workers: int, optional
+    :param manager: the urllib3 PoolManager, defaults to the shared manager
+    :param chunk_size: the size of the chunks written to disk
+    :type chunk_size: int, optional
+    :param verify_existing: whether existing images are hashed again instead
+                            of only checking their size
+    :type verify_existing: bool, optional
+    """
+
+    def __init__(self, directory: str, max_workers: int = 4, manager=None,
+                 timeout: Timeout = None, retries: int = 2,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, scheme: str = 'https',
+                 verify_existing: bool = False) -> None:
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_workers = max(1, max_workers)
+        self.manager = manager if manager is not None else shared_manager()
+        self.timeout = timeout if timeout is not None else Timeout(connect=5.0, read=60.0)
+        self.retries = Retry(total=retries, backoff_factor=0.5,
+                             status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+        self.chunk_size = max(1024, chunk_size)
+        self.scheme = scheme
+        self.verify_existing = verify_existing
+        self.stats = {}
+        self.errors = {}
+        self._lock = Lock()
+
+    def image_of(self, release: Release) -> _Image:
+        """Returns the image of a release (None if the release has no URL)."""
+        url = image_url(release, self.scheme)
+        if url is None:
+            return None
+        checksum = _checksum(release)
+        key = checksum or hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+        # the file name is only shown in messages, it does not identify the image
+        name = release.image.get('FILENAME') or url.rsplit('/', 1)[-1] or 'image'
+        return _Image(url, os.path.join(self.directory, key), name, _size(release), checksum)
+
+    def path_of(self, release: Release) -> str:
+        """Returns the local file of a release's image, or None."""
+        image = self.image_of(release)
+        return image.path if image is not None else None
+
+    def fetch(self, image: _Image) -> str:
+        """Downloads (or resumes) a single image and verifies it.
+
+        If the server answers a resumed download with another range than
+        requested, the partial file is dropped and the image downloaded again.
+
+        :raises ConnectionError: if the request fails or returns an error status
+        :raises ChecksumError: if the size or checksum does not match; the
+                               partial file is removed
+        :return: the path of the verified image
+        :rtype: str
+        """
+        if os.path.exists(image.path) and self._is_complete(image, image.path):
+            self._count('skipped')
+            return image.path
+
+        part = image.path + '.part'
+        digest = image.new_hash()
+        offset = self._hash_file(part, digest) if os.path.exists(part) else 0
+        headers = dict(self.manager.headers)
+        if offset:
+            headers['Range'] = 'bytes=%d-' % offset
+
+        try:
+            response = self.manager.request('GET', image.url, headers=headers, timeout=self.timeout,
+                                            retries=self.retries, preload_content=False)
+        except Exception as err:
+            raise ConnectionError('Could not fetch "%s": %s' % (image.url, err)) from err
+
+        start = _range_start(response.headers.get('Content-Range')) if response.status == 206 else None
+        restart = False
+        try:
+            if response.status == 416 and offset:
+                if offset != image.size:
+                    # the partial file does not belong to the current image
+                    os.remove(part)
+                    raise ConnectionError('Could not resume "%s" at byte %d' % (image.url, offset))
+                # the partial file already holds the whole image
+            elif response.status == 206 and offset and start == offset:
+                self._count('resumed')
+                offset = self._write(response, image.url, part, 'ab', digest)
+            elif response.status == 206 and offset and start != 0:
+                # the server sent another range than requested, appending it
+                # would corrupt the image: start again without the partial file
+                response.close()
+                os.remove(part)
+                restart = True
+            elif response.status == 200 or (response.status == 206 and offset):
+                # the whole image, or a range that starts at the first byte
+                digest = image.new_hash()
+                offset = self._write(response, image.url, part, 'wb', digest)
+            else:
+                raise ConnectionError('Could not fetch "%s": HTTP %d' % (image.url, response.status))
+        finally:
+            response.release_conn()
+        if restart:
+            return self.fetch(image)
+
+        error = None
+        if image.size is not None and offset != image.size:
+            # a short file can be resumed later, a long one is broken
+            if offset < image.size:
+                raise ConnectionError('Download of "%s" ended after %d of %d bytes'
+                                      % (image.url, offset, image.size))
+            error = 'size %d, expected %d' % (offset, image.size)
+        elif digest is not None and digest.hexdigest() != image.checksum:
+            error = 'checksum %s, expected %s' % (digest.hexdigest(), image.checksum)
+        if error:
+            os.remove(part)
+            raise ChecksumError('Invalid image %s from "%s": %s' % (image.name, image.url, error))
+
+        os.replace(part, image.path)
+        self._count('downloaded')
+        return image.path
+
+    def _write(self, response, url: str, path: str, mode: str, digest) -> int:
+        # streams the response body into the file, returns the file size
+        with open(path, mode) as fp:
+            try:
+                for chunk in response.stream(self.chunk_size):
+                    fp.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    self._count('bytes', len(chunk))
+            except Exception as err:
+                # keep what was received, the next download resumes from it
+                raise ConnectionError('Download of "%s" was interrupted: %s'
+                                      % (url, err)) from err
+            return fp.tell()
+
+    def _hash_file(self, path: str, digest) -> int:
+        # feeds an existing file into the digest, returns its size
+        size = 0
+        with open(path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(self.chunk_size), b''):
+                if digest is not None:
+                    digest.update(chunk)
+                size += len(chunk)
+        return size
+
+    def _is_complete(self, image: _Image, path: str) -> bool:
+        if not self.verify_existing:
+            return image.size is None or os.path.getsize(path) == image.size
+        digest = image.new_hash()
+        size = self._hash_file(path, digest)
+        return ((image.size is None or size == image.size)
+                and (digest is None or digest.hexdigest() == image.checksum))
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def download(self, releases) -> dict:
+        """Downloads the images of all releases.
+
+        :param releases: Release or Firmware objects, or a FirmwareCatalogue
+        :return: each release mapped to the path of its image; releases whose
+                 image failed are left out and listed in `errors`
+        :rtype: dict[Release, str]
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.stats = dict.fromkeys(
+            ('images', 'deduplicated', 'skipped', 'downloaded', 'resumed', 'bytes', 'errors'), 0
+        )
+        self.errors = {}
+
+        images, users = {}, {}
+        for release in releases:
+            if isinstance(release, Firmware):
+                release = release.release
+            image = self.image_of(release) if release is not None else None
+            if image is None:
+                continue
+            if image.path in images:
+                self.stats['deduplicated'] += 1
+            else:
+                images[image.path] = image
+            users.setdefault(image.path, []).append(release)
+        self.stats['images'] = len(images)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(images)))) as executor:
+            futures = {path: executor.submit(self.fetch, image) for path, image in images.items()}
+
+        paths = {}
+        for path, future in futures.items():
+            try:
+                future.result()
+            except (ConnectionError, ChecksumError, OSError) as err:
+                self._count('errors')
+                self.errors[images[path].url] = err
+                continue
+            for release in users[path]:
+                paths[release] = path
+        return paths
+
+    def __repr__(self) -> str:
+        return '<ImageDownloader directory="%s">' % self.directory
@@ -0,0 +1,385 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Collects the diagnostic logs (logread.dat and pts.dat) of many devices.
+
+The files are streamed in chunks, either into gzip compressed local files
+or as decoded lines. The collector remembers how many bytes of each file it
+has read and only requests the new bytes on the next pull (a Range
+request), so a device's log is downloaded once and then tailed:
+
+    collector = LogCollector('/var/log/soundtouch', max_workers=8)
+    collector.collect(devices)          # the complete logs
+    collector.collect(devices)          # only the lines written since then
+
+    for line in collector.lines(device, LOGREAD):
+        print(line)
+
+Compressed files are appended as new gzip members, `gzip.open()` reads
+them as one stream. A log that became shorter than the stored offset was
+rotated and is read from its start.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Iterator
+
+from urllib3.util import Retry, Timeout
+
+from boseapi.common.device import BoseDevice
+from boseapi.common.pool import shared_manager
+
+__all__ = ['LogCollector', 'LOGREAD', 'PTS', 'LOG_FILES', 'DEFAULT_CHUNK_SIZE']
+
+LOGREAD = 'logread'
+"""The system log (see BoseDevice.get_logread_url())."""
+
+PTS = 'pts'
+"""The pts.dat diagnostics (see BoseDevice.get_pts_url())."""
+
+LOG_FILES = (LOGREAD, PTS)
+"""The names of all collected files."""
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+"""The number of bytes read from the response at once."""
+
+_STATE_FILE = 'state.json'
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-\d+/(?:\d+|\*)')
+
+
+def _total_length(content_range: str) -> int:
+    # 'bytes 100-199/2000' or 'bytes */2000' -> 2000
+    try:
+        return int(content_range.rpartition('/')[2])
+    except (AttributeError, ValueError):
+        return None
+
+
+def _range_start(content_range: str) -> int:
+    # the first byte of a 206 response, None if the header is missing or invalid
+    match = _CONTENT_RANGE.match(content_range or '')
+    return int(match.group(1)) if match else None
+
+
+class LogCollector:
+    """Streams and tails the log files of many devices.
+
+    The offsets of all files are stored in the collector (and in state.json
+    if a directory is used), keyed by the device id (or the host if the id
+    is unknown) and the file name.
+
+    Statistics of the last collect() (see `stats`):
+        requests: int
+            Requests sent.
+        bytes: int
+            New bytes received.
+        unchanged: int
+            Files without new bytes.
+        rotated: int
+            Files read from their start because they became shorter.
+        errors: int
+            Files that could not be fetched (see `errors`).
+
+    :param directory: the directory of the compressed files, defaults to None
+                      (only lines() can be used)
+    :type directory: str, optional
+    :param names: the collected files, defaults to LOG_FILES
+    :type names: tuple, optional
+    :param max_workers: the maximum number of concurrent downloads
+    :type max_workers: int, optional
+    :param manager: the urllib3 PoolManager, defaults to the shared manager
+    :param compresslevel: the gzip compression level, defaults to 6
+    :type compresslevel: int, optional
+    """
+
+    def __init__(self, directory: str = None, names: tuple = LOG_FILES, max_workers: int = 8,
+                 manager=None, timeout: Timeout = None, retries: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, compresslevel: int = 6) -> None:
+        self.directory = os.path.abspath(os.path.expanduser(directory)) if directory else None
+        self.names = tuple(names)
+        self.max_workers = max(1, max_workers)
+        self.manager = manager if manager is not None else shared_manager()
+        self.timeout = timeout if timeout is not None else Timeout(connect=2.0, read=30.0)
+        self.retries = Retry(total=retries, backoff_factor=0.25,
+                             status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+        self.chunk_size = max(1024, chunk_size)
+        self.compresslevel = compresslevel
+        self.stats = {}
+        self.errors = {}
+        self._offsets = None
+        self._lock = Lock()
+
+    @staticmethod
+    def url_of(device: BoseDevice, name: str) -> str:
+        """Returns the URL of a log file."""
+        if name == LOGREAD:
+            return device.get_logread_url()
+        if name == PTS:
+            return device.get_pts_url()
+        raise ValueError('Unknown log file: "%s"' % name)
+
+    @staticmethod
+    def _key(device: BoseDevice, name: str) -> str:
+        return '%s/%s' % (device.device_id or device.host, name)
+
+    def path_of(self, device: BoseDevice, name: str) -> str:
+        """Returns the compressed local file of a log."""
+        if self.directory is None:
+            raise ValueError('The collector has no directory')
+        folder = device.device_id or hashlib.sha1(device.host.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directory, folder, '%s.log.gz' % name)
+
+    @property
+    def offsets(self) -> dict:
+        """The number of bytes read from each file ('<device id>/<name>' mapped to an int)."""
+        if self._offsets is None:
+            self._offsets = {}
+            if self.directory is not None:
+                try:
+                    with open(os.path.join(self.directory, _STATE_FILE), 'r', encoding='utf-8') as fp:
+                        self._offsets = {str(k): int(v) for k, v in json.load(fp).items()}
+                except (OSError, ValueError, AttributeError):
+                    pass
+        return self._offsets
+
+    def offset(self, device: BoseDevice, name: str) -> int:
+        """Returns the number of bytes already read from a file."""
+        with self._lock:
+            return self.offsets.get(self._key(device, name), 0)
+
+    def reset(self, device: BoseDevice = None):
+        """Forgets the offsets of a device (or of all devices), so its logs are read again."""
+        with self._lock:
+            if device is None:
+                self.offsets.clear()
+            else:
+                for name in self.names:
+                    self.offsets.pop(self._key(device, name), None)
+        self.save()
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def save(self):
+        """Stores the offsets in state.json (collect() and lines() do this automatically)."""
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, _STATE_FILE)
+        with self._lock:
+            data = json.dumps(self.offsets, indent=1, sort_keys=True)
+        temp = '%s.%d.tmp' % (path, os.getpid())
+        with open(temp, 'w', encoding='utf-8') as fp:
+            fp.write(data)
+        os.replace(temp, path)
+
+    def _open(self, device: BoseDevice, name: str, offset: int, ranges: bool = True) -> tuple:
+        # returns the streaming response, the file offset of the first new
+        # byte and the number of leading response bytes to skip
+        url = self.url_of(device, name)
+        headers = dict(self.manager.headers)
+        if offset and ranges:
+            headers['Range'] = 'bytes=%d-' % offset
+        self._count('requests')
+        try:
+            response = self.manager.request('GET', url, headers=headers, timeout=self.timeout,
+                                            retries=self.retries, preload_content=False)
+        except Exception as err:
+            raise ConnectionError('Could not fetch "%s": %s' % (url, err)) from err
+
+        size = response.headers.get('Content-Length')
+        if response.status == 206:
+            content_range = response.headers.get('Content-Range')
+            start = _range_start(content_range)
+            if start == offset:
+                return response, offset, 0
+            if start != 0:
+                # another range than requested, appending it would corrupt the
+                # local copy: read the whole log and skip the known bytes
+                response.close()
+                response.release_conn()
+                if not ranges:
+                    raise ConnectionError('Could not fetch "%s": unexpected range "%s"'
+                                          % (url, content_range))
+                return self._open(device, name, offset, ranges=False)
+            # a range from the first byte is read like the complete log
+            size = str(_total_length(content_range))
+        if response.status == 416:
+            response.drain_conn()
+            total = _total_length(response.headers.get('Content-Range'))
+            if total is not None and total < offset:
+                # the log was rotated, read it again
+                self._count('rotated')
+                return self._open(device, name, 0)
+            return None, offset, 0
+        if response.status in (200, 206):
+            if offset and size is not None and size.isdigit() and int(size) < offset:
+                self._count('rotated')
+                return response, 0, 0
+            # the complete log, the bytes read before are skipped
+            return response, offset, offset
+        response.drain_conn()
+        raise ConnectionError('Could not fetch "%s": HTTP %d' % (url, response.status))
+
+    def _chunks(self, response, skip: int) -> Iterator:
+        complete = False
+        try:
+            for chunk in response.stream(self.chunk_size):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk, skip = chunk[skip:], 0
+                yield chunk
+            complete = True
+        finally:
+            if complete:
+                response.release_conn()
+            else:
+                # the rest of the body is not read, the connection can not be
+                # reused; it is closed and its pool slot freed
+                response.close()
+                response.release_conn()
+
+    @staticmethod
+    def _discard(chunks, response, complete: bool):
+        # _chunks() returns a completely read connection to the pool; if
+        # reading stopped early (or never started) the response is closed
+        chunks.close()
+        if not complete:
+            response.close()
+            response.release_conn()
+
+    def pull(self, device: BoseDevice, name: str) -> int:
+        """Appends the new bytes of a log file to its compressed local file.
+
+        :param device: the device
+        :type device: BoseDevice
+        :param name: LOGREAD or PTS
+        :type name: str
+        :raises ConnectionError: if the request fails; the bytes received
+                                 before the error are kept
+        :raises ValueError: if the collector has no directory
+        :return: the number of new bytes
+        :rtype: int
+        """
+        key = self._key(device, name)
+        path = self.path_of(device, name)
+        response, start, skip = self._open(device, name, self.offset(device, name))
+        if response is None:
+            self._count('unchanged')
+            return 0
+
+        received, fp, complete = 0, None, False
+        chunks = self._chunks(response, skip)
+        try:
+            for chunk in chunks:
+                if fp is None:
+                    # opened on the first new byte, so no empty members are appended
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    fp = gzip.open(path, 'ab', compresslevel=self.compresslevel)
+                fp.write(chunk)
+                received += len(chunk)
+            complete = True
+        except Exception as err:
+            raise ConnectionError('Download of "%s" was interrupted: %s'
+                                  % (self.url_of(device, name), err)) from err
+        finally:
+            self._discard(chunks, response, complete)
+            if fp is not None:
+                fp.close()
+            with self._lock:
+                self.offsets[key] = start + received
+            self._count('bytes', received)
+        if not received:
+            self._count('unchanged')
+        return received
+
+    def lines(self, device: BoseDevice, name: str = LOGREAD, encoding: str = 'utf-8',
+              errors: str = 'replace') -> Iterator:
+        """Yields the new lines of a log file while it is downloaded.
+
+        Only complete lines are yielded; the offset is advanced to the end
+        of the last yielded line, so an incomplete last line is read again
+        by the next call. Stop iterating early to keep the remaining lines
+        for later.
+
+        :raises ConnectionError: if the request fails
+        :yield: the decoded lines without line breaks
+        :rtype: Iterator[str]
+        """
+        key = self._key(device, name)
+        response, start, skip = self._open(device, name, self.offset(device, name))
+        if response is None:
+            return
+        consumed, pending, complete = start, b'', False
+        chunks = self._chunks(response, skip)
+        try:
+            for chunk in chunks:
+                pending += chunk
+                *lines, pending = pending.split(b'\n')
+                for line in lines:
+                    consumed += len(line) + 1
+                    with self._lock:
+                        self.offsets[key] = consumed
+                    yield line.rstrip(b'\r').decode(encoding, errors)
+            complete = True
+        finally:
+            self._discard(chunks, response, complete)
+            self.save()
+
+    def collect(self, devices: list) -> dict:
+        """Pulls the log files of all devices concurrently (see pull()).
+
+        :param devices: the devices
+        :type devices: list[BoseDevice]
+        :return: the hosts mapped to the new bytes per file name; failed files
+                 are left out and stored in `errors` as '<host>/<name>'
+        :rtype: dict[str, dict[str, int]]
+        """
+        self.stats = dict.fromkeys(('requests', 'bytes', 'unchanged', 'rotated', 'errors'), 0)
+        self.errors = {}
+        jobs = [(device, name) for device in devices for name in self.names]
+        results = {}
+        if not jobs:
+            return results
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+                futures = [executor.submit(self.pull, device, name) for device, name in jobs]
+            for (device, name), future in zip(jobs, futures):
+                try:
+                    results.setdefault(device.host, {})[name] = future.result()
+                except (ConnectionError, OSError, ValueError) as err:
+                    self._count('errors')
+                    self.errors['%s/%s' % (device.host, name)] = err
+        finally:
+            self.save()
+        return results
+
+    def __repr__(self) -> str:
+        return '<LogCollector directory="%s", files=%d>' % (self.directory, len(self.offsets))
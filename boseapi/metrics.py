@@ -0,0 +1,301 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+The `metrics` module contains an optional instrumentation layer for the
+SoundTouchClient. A RequestMetrics object records counters and latency
+histograms per device, node and HTTP method for each phase of a request.
+Clients without metrics (the default) skip all timing calls.
+"""
+from bisect import bisect_left
+from threading import Lock
+
+__all__ = [
+    'PHASE_ACQUIRE', 'PHASE_NETWORK', 'PHASE_PARSE', 'PHASE_MODEL',
+    'DEFAULT_BUCKETS', 'Histogram', 'RequestMetrics', 'format_sample'
+]
+
+PHASE_ACQUIRE = 'acquire'
+"""Time spent waiting for the target host's rate limiter (request slot and token)."""
+
+PHASE_NETWORK = 'network'
+"""Time spent sending the request and receiving the complete response."""
+
+PHASE_PARSE = 'parse'
+"""Time spent decoding the XML response body."""
+
+PHASE_MODEL = 'model'
+"""Time spent constructing a `boseapi.model` object from the response."""
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+"""The default upper bounds (in seconds) of all latency histograms."""
+
+
+def _format_float(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_sample(name: str, labels: dict, value) -> str:
+    """Formats a single sample line in the Prometheus/OpenMetrics text format.
+
+    :param name: the metric name (including a suffix like `_total`)
+    :type name: str
+    :param labels: the label names mapped to their values
+    :type labels: dict
+    :param value: the sample value
+    :type value: int | float
+    :return: the formatted sample line (without a trailing newline)
+    :rtype: str
+    """
+    if labels:
+        name = '%s{%s}' % (name, ','.join(
+            '%s="%s"' % (key, _escape(val)) for key, val in labels.items()
+        ))
+    if isinstance(value, float):
+        value = _format_float(value)
+    return '%s %s' % (name, value)
+
+
+class Histogram:
+    """A fixed-bucket latency histogram.
+
+    Attributes:
+        buckets: tuple[float]
+            The sorted upper bounds of all buckets. An implicit `+Inf` bucket
+            is always added.
+        counts: list[int]
+            The number of observations per bucket (not cumulative).
+        total: float
+            The sum of all observed values.
+        count: int
+            The number of observations.
+    """
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Adds a single observation to this histogram."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """Returns a list of (upper bound, cumulative count) pairs."""
+        result, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Estimates the given quantile (0..1) from the bucket counts.
+
+        The returned value is the upper bound of the bucket containing the
+        quantile, which is the usual estimate for fixed-bucket histograms.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> dict:
+        """Returns a plain-dict copy of this histogram."""
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'buckets': self.cumulative()
+        }
+
+    def __repr__(self) -> str:
+        return '<Histogram count=%d, sum=%f>' % (self.count, self.total)
+
+
+class RequestMetrics:
+    """Collects request counters and phase latencies of one or more clients.
+
+    A single instance can be shared by all clients of a process. Each
+    observation is stored under the key (host, node, method, phase), each
+    finished request under the key (host, node, method, status) where status
+    is either the HTTP status code or `error`.
+
+    Hooks are called for every observed phase with the following arguments:
+    `hook(host, node, method, phase, seconds)`. They are invoked outside of
+    the internal lock, so they may call back into this object.
+
+    Example:
+    `client = SoundTouchClient(device, metrics=RequestMetrics())`
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = Lock()
+        self._histograms = {}
+        self._requests = {}
+        self._hooks = []
+
+    def add_hook(self, hook) -> bool:
+        """Registers a callable that is notified about each observed phase."""
+        if not hook:
+            return False
+        self._hooks.append(hook)
+        return True
+
+    def remove_hook(self, hook) -> bool:
+        """Removes a previously registered hook."""
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+            return True
+        return False
+
+    def observe(self, host: str, node, method: str, phase: str, seconds: float):
+        """Records the duration of a single request phase.
+
+        :param host: the device's host address
+        :type host: str
+        :param node: the requested node (SoundTouchUri or str)
+        :type node: SoundTouchUri
+        :param method: the HTTP method
+        :type method: str
+        :param phase: one of the PHASE_* constants
+        :type phase: str
+        :param seconds: the measured duration
+        :type seconds: float
+        """
+        key = (host, str(node), method, phase)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+        for hook in self._hooks:
+            hook(host, key[1], method, phase, seconds)
+
+    def count(self, host: str, node, method: str, status):
+        """Increments the request counter for the given outcome."""
+        key = (host, str(node), method, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def reset(self):
+        """Removes all recorded values."""
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+    def histogram(self, host: str, node, method: str, phase: str) -> Histogram:
+        """Returns the histogram for the given key or None."""
+        return self._histograms.get((host, str(node), method, phase))
+
+    def snapshot(self) -> dict:
+        """Returns a consistent copy of all recorded values.
+
+        The returned dict contains two entries: `requests` maps the tuple
+        (host, node, method, status) to a counter and `latency` maps the tuple
+        (host, node, method, phase) to a histogram snapshot (see
+        Histogram.snapshot()).
+        """
+        with self._lock:
+            return {
+                'requests': dict(self._requests),
+                'latency': {
+                    key: value.snapshot() for key, value in self._histograms.items()
+                }
+            }
+
+    def slowest(self, phase: str = PHASE_NETWORK, group_by: str = 'host',
+                limit: int = 10) -> list:
+        """Returns the slowest hosts (or nodes) ordered by their mean latency.
+
+        :param phase: the phase to inspect, defaults to PHASE_NETWORK
+        :type phase: str, optional
+        :param group_by: either 'host' or 'node', defaults to 'host'
+        :type group_by: str, optional
+        :param limit: the maximum number of entries, defaults to 10
+        :type limit: int, optional
+        :return: a list of (name, mean seconds, count) tuples
+        :rtype: list
+        """
+        index = 0 if group_by == 'host' else 1
+        groups = {}
+        with self._lock:
+            for key, histogram in self._histograms.items():
+                if key[3] != phase:
+                    continue
+                total, count = groups.get(key[index], (0.0, 0))
+                groups[key[index]] = (total + histogram.total, count + histogram.count)
+
+        result = [(name, total / count, count) for name, (total, count) in groups.items() if count]
+        result.sort(key=lambda x: x[1], reverse=True)
+        return result[:limit]
+
+    def to_openmetrics(self, prefix: str = 'boseapi') -> str:
+        """Renders all recorded values in the Prometheus/OpenMetrics text format.
+
+        :param prefix: the metric name prefix, defaults to 'boseapi'
+        :type prefix: str, optional
+        :return: the exposition text, terminated by `# EOF`
+        :rtype: str
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        name = '%s_requests' % prefix
+        lines.append('# HELP %s Number of finished requests.' % name)
+        lines.append('# TYPE %s counter' % name)
+        for (host, node, method, status), value in sorted(snapshot['requests'].items()):
+            lines.append(format_sample(name + '_total', {
+                'host': host, 'node': node, 'method': method, 'status': status
+            }, value))
+
+        name = '%s_request_phase_seconds' % prefix
+        lines.append('# HELP %s Latency of each request phase.' % name)
+        lines.append('# TYPE %s histogram' % name)
+        for (host, node, method, phase), value in sorted(snapshot['latency'].items()):
+            labels = {'host': host, 'node': node, 'method': method, 'phase': phase}
+            for bound, running in value['buckets']:
+                lines.append(format_sample(name + '_bucket', dict(labels, le=_format_float(bound)), running))
+            lines.append(format_sample(name + '_sum', labels, value['sum']))
+            lines.append(format_sample(name + '_count', labels, value['count']))
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self) -> str:
+        return '<RequestMetrics series=%d>' % len(self._histograms)
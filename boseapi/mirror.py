@@ -0,0 +1,296 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+A local mirror of the BOSE firmware lookup.xml and all index files it
+references.
+
+FirmwareMirror.sync() revalidates every mirrored file with a conditional
+request (ETag / Last-Modified), downloads changed files concurrently and
+stores a pre-parsed FirmwareCatalogue next to them. If no file changed,
+the stored catalogue is loaded without parsing any XML:
+
+    mirror = FirmwareMirror('~/.cache/boseapi/firmware')
+    catalogue = mirror.sync()
+    release = catalogue.release_for('4020')
+"""
+import hashlib
+import json
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from urllib.parse import urljoin
+
+from urllib3.util import Retry, Timeout
+
+from boseapi.common.pool import shared_manager
+from boseapi.firmware import (BOSE_ST_INDEX_URL, Firmware, FirmwareCatalogue, Product,
+                              Release, iter_lookup)
+
+__all__ = ['FirmwareMirror', 'DEFAULT_LOOKUP_URL']
+
+DEFAULT_LOOKUP_URL = '%s/lookup.xml' % BOSE_ST_INDEX_URL
+"""The lookup.xml file listing the index file of each product."""
+
+_STATE_FILE = 'state.json'
+_CATALOGUE_FILE = 'catalogue.json'
+_CATALOGUE_VERSION = 2
+
+
+def _write_atomic(path: str, data: bytes):
+    # readers never see a partially written file
+    temp = '%s.%d.tmp' % (path, os.getpid())
+    with open(temp, 'wb') as fp:
+        fp.write(data)
+    os.replace(temp, path)
+
+
+def _dump_catalogue(catalogue: FirmwareCatalogue) -> dict:
+    # plain JSON values in insertion order, so the "first entry wins" rule
+    # of the catalogue holds when the entries are added again
+    def release(value: Release):
+        if value is None:
+            return None
+        return [value.revision, value.host, value.uri, value.usb_uri, value.image,
+                value.notes_url, value.features]
+
+    return {
+        'firmware': [[x.device_id, x.product_name, x.revision, x.protocols, release(x.release)]
+                     for x in catalogue.firmware.values()],
+        'products': [[x.product_id, x.index_url, x.device_class]
+                     for x in catalogue.products.values()],
+    }
+
+
+def _load_catalogue(values: dict) -> FirmwareCatalogue:
+    catalogue = FirmwareCatalogue()
+    for device_id, product_name, revision, protocols, release in values['firmware']:
+        catalogue.add_firmware(Firmware(device_id, product_name, revision,
+                                        Release(*release) if release is not None else None,
+                                        protocols))
+    for product_id, index_url, device_class in values['products']:
+        catalogue.add_product(Product(product_id, index_url, device_class))
+    return catalogue
+
+
+class FirmwareMirror:
+    """Mirrors the firmware lookup and index files into a local directory.
+
+    The directory contains lookup.xml, one file per index URL (named by the
+    URL's hash), the validators of all files (state.json) and the catalogue
+    built from them (catalogue.json).
+
+    Statistics of the last sync() (see `stats`):
+        requests: int
+            Conditional requests sent.
+        not_modified: int
+            Responses with status 304.
+        downloaded: int
+            Files that were downloaded because they changed or were missing.
+        errors: int
+            Files that could not be fetched (the mirrored copy is kept).
+        parsed: bool
+            Whether the catalogue was rebuilt from the XML files.
+
+    :param directory: the mirror directory, created if necessary
+    :type directory: str
+    :param lookup_url: the URL of lookup.xml
+    :type lookup_url: str, optional
+    :param max_workers: the maximum number of concurrent downloads
+    :type max_workers: int, optional
+    :param manager: the urllib3 PoolManager, defaults to the shared manager
+    """
+
+    def __init__(self, directory: str, lookup_url: str = DEFAULT_LOOKUP_URL,
+                 max_workers: int = 4, manager=None,
+                 timeout: Timeout = None, retries: int = 2) -> None:
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.lookup_url = lookup_url
+        self.max_workers = max(1, max_workers)
+        self.manager = manager if manager is not None else shared_manager()
+        self.timeout = timeout if timeout is not None else Timeout(connect=5.0, read=30.0)
+        self.retries = Retry(total=retries, backoff_factor=0.5,
+                             status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+        self.stats = {}
+        self._state = None
+        self._lock = Lock()
+
+    def path_of(self, url: str) -> str:
+        """Returns the local file of a mirrored URL."""
+        if url == self.lookup_url:
+            return os.path.join(self.directory, 'lookup.xml')
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, 'index-%s.xml' % name)
+
+    @property
+    def state(self) -> dict:
+        """The validators of all mirrored files (URL mapped to a dict)."""
+        if self._state is None:
+            try:
+                with open(os.path.join(self.directory, _STATE_FILE), 'r', encoding='utf-8') as fp:
+                    self._state = json.load(fp)
+            except (OSError, ValueError):
+                self._state = {}
+        return self._state
+
+    def fetch(self, url: str) -> bool:
+        """Revalidates a single file and downloads it if it changed.
+
+        :param url: the file's URL
+        :type url: str
+        :raises ConnectionError: if the request fails or returns an error status
+        :return: whether the local file changed
+        :rtype: bool
+        """
+        path = self.path_of(url)
+        with self._lock:
+            entry = dict(self.state.get(url, ()))
+        headers = dict(self.manager.headers)
+        if os.path.exists(path):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        self._count('requests')
+        try:
+            response = self.manager.request('GET', url, headers=headers, timeout=self.timeout,
+                                            retries=self.retries)
+        except Exception as err:
+            raise ConnectionError('Could not fetch "%s": %s' % (url, err)) from err
+        if response.status == 304:
+            self._count('not_modified')
+            return False
+        if response.status != 200:
+            raise ConnectionError('Could not fetch "%s": HTTP %d' % (url, response.status))
+
+        _write_atomic(path, response.data)
+        with self._lock:
+            self.state[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched': time.time(),
+            }
+        self._count('downloaded')
+        return True
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def index_urls(self) -> list:
+        """Returns the index URLs referenced by the mirrored lookup.xml."""
+        urls = []
+        for product in iter_lookup(self.path_of(self.lookup_url)):
+            if product.index_url:
+                url = urljoin(self.lookup_url, product.index_url)
+                if url not in urls:
+                    urls.append(url)
+        return urls
+
+    def sync(self) -> FirmwareCatalogue:
+        """Updates the mirror and returns the catalogue of all mirrored files.
+
+        lookup.xml is revalidated first, then all index files it references
+        are revalidated concurrently. Index files that can not be fetched are
+        counted in `stats` and their last mirrored copy is used.
+
+        :raises ConnectionError: if lookup.xml can not be fetched and was
+                                 never mirrored before
+        :return: the catalogue
+        :rtype: FirmwareCatalogue
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.stats = {'requests': 0, 'not_modified': 0, 'downloaded': 0, 'errors': 0, 'parsed': False}
+        try:
+            changed = self.fetch(self.lookup_url)
+        except ConnectionError:
+            if not os.path.exists(self.path_of(self.lookup_url)):
+                raise
+            self._count('errors')
+            changed = False
+
+        urls = self.index_urls()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(urls)))) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+        for future in futures:
+            try:
+                changed = future.result() or changed
+            except ConnectionError:
+                self._count('errors')
+
+        # remove index files that are no longer referenced
+        with self._lock:
+            for url in [x for x in self.state if x != self.lookup_url and x not in urls]:
+                del self.state[url]
+                try:
+                    os.remove(self.path_of(url))
+                except FileNotFoundError:
+                    pass
+                changed = True
+        self._save_state()
+
+        catalogue = None if changed else self.load_catalogue(urls)
+        if catalogue is None:
+            catalogue = self.build_catalogue(urls)
+            self.stats['parsed'] = True
+        return catalogue
+
+    def _save_state(self):
+        data = json.dumps(self.state, indent=1, sort_keys=True).encode('utf-8')
+        _write_atomic(os.path.join(self.directory, _STATE_FILE), data)
+
+    def build_catalogue(self, urls: list = None) -> FirmwareCatalogue:
+        """Parses all mirrored files into a catalogue and stores it."""
+        urls = self.index_urls() if urls is None else urls
+        catalogue = FirmwareCatalogue()
+        catalogue.load_lookup(self.path_of(self.lookup_url))
+        for url in urls:
+            path = self.path_of(url)
+            if os.path.exists(path):
+                catalogue.load_index(path)
+
+        data = json.dumps({
+            'version': _CATALOGUE_VERSION,
+            'urls': sorted(urls),
+            'catalogue': _dump_catalogue(catalogue),
+        }, separators=(',', ':')).encode('utf-8')
+        _write_atomic(os.path.join(self.directory, _CATALOGUE_FILE), data)
+        return catalogue
+
+    def load_catalogue(self, urls: list = None) -> FirmwareCatalogue:
+        """Returns the stored catalogue, or None if it is missing or outdated."""
+        try:
+            with open(os.path.join(self.directory, _CATALOGUE_FILE), 'r', encoding='utf-8') as fp:
+                stored = json.load(fp)
+            if stored['version'] != _CATALOGUE_VERSION:
+                return None
+            if urls is not None and stored['urls'] != sorted(urls):
+                return None
+            return _load_catalogue(stored['catalogue'])
+        except (OSError, ValueError, KeyError, TypeError):
+            # missing, truncated or written by an incompatible version
+            return None
+
+    def __repr__(self) -> str:
+        return '<FirmwareMirror directory="%s", files=%d>' % (self.directory, len(self.state))
@@ -19,32 +19,429 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+from operator import attrgetter
+from sys import intern
 from typing import Iterator
-from xml.etree.ElementTree import Element, tostring
+from xml.etree.ElementTree import Element
 
+from boseapi.xmlbody import attributes, element, escape_text
 
-def _xmlfind_attr(root: Element, tag: str, name: str, default = None):
-    return _xmlfind(root, tag, lambda x: x.get(name, default), default)
 
+_ELEMENT = object()
+"""Marks fields whose converter is called with the element itself."""
 
-def _xmlfind(root: Element, tag: str, extractor = lambda x: x.text, default = None):
-    if not root:
-        return default
+# Fields with values from small fixed vocabularies (sources, play states,
+# interface kinds, ...) use `convert=intern`, so all objects share one string
+# per value instead of a copy per response. Unknown values are interned too.
 
-    result = root.find(tag)
-    if result is None:
-        return default
-    return extractor(result)
 
+def _field(name: str, tag: str = None, attr = None, convert = None, default = None,
+           public: str = None) -> tuple:
+    """Describes how a model attribute is decoded from a response element.
+
+    :param name: the attribute (slot) name of the model object
+    :type name: str
+    :param tag: the child's tag or path (`parent/child`), None for the root itself
+    :type tag: str, optional
+    :param attr: the XML attribute to read, None for the element's text or
+                 _ELEMENT to pass the element (or None) to `convert`
+    :param convert: applied to the extracted value, e.g. int
+    :type convert: Callable, optional
+    :param default: the value used if the element, attribute or text is missing
+    :param public: the key of the value in to_dict() and diff(), defaults to
+                   the attribute name without leading underscores
+    :type public: str, optional
+    :return: the field description
+    :rtype: tuple
+    """
+    return (name, tag or None, attr, convert, default, public or name.lstrip('_'))
+
+
+def _xmldecoder(fields: tuple, indexed: bool = True):
+    """Builds a function decoding all of the given fields at once.
+
+    The returned function indexes the root's children in a single pass and
+    resolves each field with one dictionary lookup instead of a find() call
+    per field. Elements used by more than one field (or as the parent of a
+    nested path) are looked up only once. Decoders of single fields should
+    set `indexed` to False, so they call find() instead of indexing all
+    children; all decoders return the value of the last field.
+    """
+    paths = set()
+    for field in fields:
+        path = field[1]
+        while path:
+            paths.add(path)
+            path = path.rpartition('/')[0]
+
+    # Direct children come first, nested paths follow their parents and the
+    # root itself is stored last (index -1).
+    ordered = sorted(paths, key=lambda x: (x.count('/'), x))
+    index = {path: number for number, path in enumerate(ordered)}
+    tags = tuple(path for path in ordered if '/' not in path)
+    nested = tuple(
+        (index[path.rpartition('/')[0]], path.rpartition('/')[2])
+        for path in ordered if '/' in path
+    )
+    setters = []
+    for name, path, attr, convert, default, _ in fields:
+        if attr is not _ELEMENT and convert is not None and default is not None:
+            default = convert(default)
+        setters.append((name, index[path] if path else -1, attr, convert, default))
+    setters = tuple(setters)
+    index_children = indexed and bool(tags)
+
+    def decode(self, root):
+        if index_children:
+            children = {}
+            for child in root:
+                if child.tag not in children:
+                    children[child.tag] = child
+            find = children.get
+        else:
+            find = root.find
+
+        elements = [find(tag) for tag in tags]
+        for parent, tag in nested:
+            parent = elements[parent]
+            elements.append(parent.find(tag) if parent is not None else None)
+        elements.append(root)
+
+        value = None
+        for name, number, attr, convert, default in setters:
+            value = elements[number]
+            if attr is _ELEMENT:
+                value = convert(value)
+            elif value is not None:
+                value = value.text if attr is None else value.get(attr)
+                if value is None:
+                    value = default
+                elif convert is not None:
+                    value = convert(value)
+            else:
+                value = default
+            setattr(self, name, value)
+        return value
+
+    return decode
+
+
+class _XmlModel:
+    """Base class of all model classes decoded through a `_fields` table.
+
+    Objects created with the constructor decode all fields at once. Objects
+    created with lazy() only keep the response element and decode each
+    field when it is accessed for the first time (the decoded value is
+    stored in its slot, so every field is decoded at most once).
+    """
+    __slots__ = ()
+
+    _fields = ()
+
+    _nested = {}
+    # slot names mapped to a tuple of the model class name of their value and
+    # whether the value is a list of such objects (used by from_dict())
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if '_fields' in vars(cls):
+            cls._decode = _xmldecoder(cls._fields)
+            cls._model_type = cls
+            cls._public_names = tuple(field[5] for field in cls._fields)
+
+    @classmethod
+    def lazy(cls, root: Element):
+        """Creates an object that decodes its fields from the given element on demand.
+
+        The returned object is an instance of a subclass of this class, which
+        references the element until the object is deleted. Use lazy objects
+        for responses of which only a few values are read.
+
+        :param root: the response element
+        :type root: Element
+        :return: the lazy model object
+        """
+        lazy_type = _lazy_types.get(cls)
+        if lazy_type is None:
+            lazy_type = _lazy_types[cls] = _lazy_type(cls)
+        obj = lazy_type.__new__(lazy_type)
+        obj._root = root
+        return obj
+
+    def _values(self) -> tuple:
+        return tuple([getattr(self, field[0]) for field in self._fields])
+
+    def __eq__(self, other) -> bool:
+        # lazy objects compare equal to eagerly decoded ones
+        if getattr(other, '_model_type', None) is not self._model_type:
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash((self._model_type, _frozen(self._values())))
+
+    def diff(self, other) -> dict:
+        """Returns the fields whose values differ in the given object.
+
+        Use the result to forward only the changes between two snapshots of
+        the same node, e.g. `{name: new for name, (old, new) in a.diff(b).items()}`.
+
+        :param other: an object of the same model class
+        :raises TypeError: if the object is of another class
+        :return: the names of the changed properties mapped to a tuple of
+                 this object's and the other object's value
+        :rtype: dict
+        """
+        if getattr(other, '_model_type', None) is not self._model_type:
+            raise TypeError('Can not compare %s to %s' % (
+                self._model_type.__name__, type(other).__name__
+            ))
+        changes = {}
+        for field, name in zip(self._fields, self._public_names):
+            old, new = getattr(self, field[0]), getattr(other, field[0])
+            if old != new:
+                changes[name] = (old, new)
+        return changes
+
+    def to_dict(self) -> dict:
+        """Returns the values of all properties as plain Python objects.
+
+        Nested model objects are converted to dicts as well, so the result
+        can be serialized with json or msgpack and restored with from_dict().
+
+        :return: the property names mapped to their values
+        :rtype: dict
+        """
+        return {
+            name: _plain(getattr(self, field[0]))
+            for field, name in zip(self._fields, self._public_names)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Creates an object from the result of to_dict() without parsing XML.
+
+        :param data: the property names mapped to their values, missing
+                     properties are set to None
+        :type data: dict
+        :return: the model object
+        """
+        cls = cls._model_type
+        obj = cls.__new__(cls)
+        nested = cls._nested
+        for field, name in zip(cls._fields, cls._public_names):
+            value = data.get(name)
+            if value is not None:
+                if field[0] in nested:
+                    value = _restore(nested[field[0]], 'from_dict', value)
+                elif field[3] is intern:
+                    value = intern(value)
+            setattr(obj, field[0], value)
+        return obj
+
+    def _pack(self) -> list:
+        # the values in the order of _fields (see boseapi.codec)
+        return [_packed(value) for value in self._values()]
+
+    @classmethod
+    def _unpack(cls, values: list):
+        cls = cls._model_type
+        if len(values) != len(cls._fields):
+            raise ValueError('Expected %d values for %s, got %d' % (
+                len(cls._fields), cls.__name__, len(values)
+            ))
+        obj = cls.__new__(cls)
+        nested = cls._nested
+        for field, value in zip(cls._fields, values):
+            if value is not None:
+                if field[0] in nested:
+                    value = _restore(nested[field[0]], '_unpack', value)
+                elif field[3] is intern:
+                    value = intern(value)
+            setattr(obj, field[0], value)
+        return obj
+
+
+_lazy_types = {}
+
+
+def _plain(value):
+    if isinstance(value, (_XmlModel, _ModelList, SimpleConfig)):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(x) for x in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def _packed(value):
+    if isinstance(value, (_XmlModel, _ModelList, SimpleConfig)):
+        return value._pack()
+    if isinstance(value, list):
+        return [_packed(x) for x in value]
+    return value
+
+
+def _restore(nested: tuple, method: str, value):
+    name, many = nested
+    create = getattr(globals()[name], method)
+    return [create(x) for x in value] if many else create(value)
+
+
+def _frozen(value):
+    # a hashable equivalent of lists and dicts within field values
+    if isinstance(value, (list, tuple)):
+        return tuple([_frozen(x) for x in value])
+    if isinstance(value, dict):
+        return frozenset((k, _frozen(v)) for k, v in value.items())
+    return value
+
+
+class _ModelList:
+    """Base class of the model classes that wrap a list of items.
+
+    Two lists are equal if they contain equal items in the same order. The
+    diff() method matches the items of both lists by their `_key()`. Lists
+    are mutable and therefore not hashable.
+
+    Items are indexed in dicts when they are appended, one per entry in
+    `_indexed` (index names mapped to a function returning an item's value),
+    so lookup() is a single hash probe. If several items share a value, the
+    first one is returned.
+    """
+    __slots__ = ()
+
+    _item_type = None
+
+    _indexed = {}
+
+    def _new_index(self) -> dict:
+        return {name: {} for name in self._indexed}
+
+    def _add_to_index(self, item):
+        for name, value_of in self._indexed.items():
+            self._index[name].setdefault(value_of(item), item)
+
+    def lookup(self, name: str, value):
+        """Returns the first item whose property has the given value.
+
+        :param name: the index name (see `_indexed` of each class)
+        :type name: str
+        :param value: the value to look up
+        :raises KeyError: if there is no such index
+        :return: the item or None if there is no such item
+        """
+        return self._index[name].get(value)
 
-class Volume:
+    @staticmethod
+    def _key(item):
+        return item
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return list(self) == list(other)
+
+    # items can be appended, so lists compare by value but are not hashable
+    __hash__ = None
+
+    def diff(self, other) -> dict:
+        """Returns the items that were added, removed or changed in the given list.
+
+        :param other: a list of the same class
+        :raises TypeError: if the list is of another class
+        :return: the keys of all changed items mapped to a tuple of the item
+                 in this list and the item in the other list (None if the
+                 item was added or removed)
+        :rtype: dict
+        """
+        if type(other) is not type(self):
+            raise TypeError('Can not compare %s to %s' % (
+                type(self).__name__, type(other).__name__
+            ))
+        old = {self._key(item): item for item in self}
+        new = {self._key(item): item for item in other}
+        changes = {}
+        for key, item in old.items():
+            if new.get(key) != item:
+                changes[key] = (item, new.get(key))
+        for key, item in new.items():
+            if key not in old:
+                changes[key] = (None, item)
+        return changes
+
+    def to_dict(self) -> dict:
+        """Returns the items as plain Python objects (see _XmlModel.to_dict())."""
+        return {'items': [item.to_dict() for item in self]}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Creates a list from the result of to_dict() without parsing XML."""
+        obj = cls()
+        for item in data.get('items', ()):
+            obj.append(cls._item_type.from_dict(item))
+        return obj
+
+    def _pack(self) -> list:
+        return [item._pack() for item in self]
+
+    @classmethod
+    def _unpack(cls, values: list):
+        obj = cls()
+        for item in values:
+            obj.append(cls._item_type._unpack(item))
+        return obj
+
+
+def _lazy_type(cls) -> type:
+    decoders = {field[0]: _xmldecoder((field,), indexed=False) for field in cls._fields}
+
+    def __getattr__(self, name: str):
+        # only called for slots that have not been set yet
+        decoder = decoders.get(name)
+        if decoder is None:
+            raise AttributeError('%r object has no attribute %r' % (cls.__name__, name))
+        return decoder(self, self._root)
+
+    def __reduce__(self):
+        return (cls.lazy, (self._root,))
+
+    return type(cls.__name__, (cls,), {
+        '__slots__': ('_root',),
+        '__module__': cls.__module__,
+        '__qualname__': cls.__qualname__,
+        '__getattr__': __getattr__,
+        '__reduce__': __reduce__,
+    })
+
+
+def _bool(value: str) -> bool:
+    return value == 'true'
+
+
+class Volume(_XmlModel):
     """A class representing the current Volume config."""
 
+    __slots__ = ('actual_vol', 'target_vol', 'muted')
+
+    _fields = (
+        _field('actual_vol', 'actualvolume', convert=int, default='0', public='actualvolume'),
+        _field('target_vol', 'targetvolume', convert=int, default='0', public='targetvolume'),
+        _field('muted', 'muteenabled', convert=_bool, default='false'),
+    )
+
+    # the values are public attributes, so objects are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element = None, actual_vol: int = 0,
                 target_vol: int = 0, muted: bool = False) -> None:
-        self.actual_vol = int(_xmlfind(root, 'actualvolume', default='0')) if root else actual_vol
-        self.target_vol = int(_xmlfind(root, 'targetvolume', default='0')) if root else target_vol
-        self.muted = _xmlfind(root, 'muteenabled', default='false') == 'true' if root else muted
+        if root is not None:
+            self._decode(root)
+        else:
+            self.actual_vol = actual_vol
+            self.target_vol = target_vol
+            self.muted = muted
 
     @property
     def actualvolume(self) -> int:
@@ -69,13 +466,28 @@ class Volume:
         return '<Volume actual=%d, target=%d, muted=%s>' % (self.actualvolume, self.targetvolume, self.is_muted())
 
 
-class ZoneSlave:
+class ZoneSlave(_XmlModel):
     """A class representing a multiroom slave."""
+
+    __slots__ = ('ip_address', 'role', '_device_id')
+
+    _fields = (
+        _field('ip_address', attr='ipaddress', public='ipaddress'),
+        _field('role', attr='role', convert=intern, public='devicerole'),
+        _field('_device_id', public='deviceid'),
+    )
+
+    # the values are public attributes, so objects are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element = None, ip_address: str = None,
                 role: str = None, device_id: str = None) -> None:
-        self.ip_address = root.get('ipaddress') if root else ip_address
-        self.role = root.get('role') if root else role
-        self._device_id = None if root else device_id
+        if root is not None:
+            self._decode(root)
+        else:
+            self.ip_address = ip_address
+            self.role = role
+            self._device_id = device_id
 
     @property
     def deviceid(self) -> str:
@@ -98,21 +510,35 @@ class ZoneSlave:
         )
 
 
-class Zone:
+class Zone(_XmlModel):
     """A class representing a mutliroom master.
 
     This class contains a list-like implementation to store the different
     ZoneSlaves.
     """
 
+    __slots__ = ('master_id', 'master_ip', 'slaves')
+
+    _fields = (
+        _field('master_id', attr='master', public='masterid'),
+        _field('master_ip', attr='senderIPAddress', public='masterip'),
+        _field('slaves', attr=_ELEMENT,
+               convert=lambda root: [ZoneSlave(x) for x in root.findall('member')]),
+    )
+
+    _nested = {'slaves': ('ZoneSlave', True)}
+
+    # slaves can be added or replaced, so zones are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element = None, device_id: str = None,
                 ip: str = None, slaves: list = None) -> None:
-        self.master_id = _xmlfind_attr(root, 'zone', 'master') if root else device_id
-        self.master_ip = _xmlfind_attr(root, 'zone', 'senderIPAddress') if root else ip
-        self.slaves = [] if not slaves else slaves
-
-        for slave in root.findall('member'):
-            self.slaves.append(ZoneSlave(slave))
+        if root is not None:
+            self._decode(root)
+        else:
+            self.master_id = device_id
+            self.master_ip = ip
+            self.slaves = [] if not slaves else slaves
 
     @property
     def masterid(self) -> str:
@@ -126,10 +552,12 @@ class Zone:
 
     def to_xml(self) -> str:
         """Converts this object into a xml representation."""
-        xmlstr = '<zone master="%s" senderIPAddress="%s">' % (self.master_id, self.master_ip)
-        for slave in self:
-            xmlstr = '%s<member ipaddress="%s">%s</member>' % (xmlstr, slave.ipaddress, slave.deviceid)
-        return '%s</zone>' % xmlstr
+        parts = ['<zone%s>' % attributes((('master', self.master_id),
+                                           ('senderIPAddress', self.master_ip)))]
+        parts += [element('member', slave.deviceid, (('ipaddress', slave.ip_address),))
+                  for slave in self.slaves]
+        parts.append('</zone>')
+        return ''.join(parts)
 
     def is_zone_master(self) -> bool:
         """Returns whether this zone object is a zone master."""
@@ -154,12 +582,19 @@ class Zone:
         if slave: self.slaves.append(slave)
 
 
-class InfoNetworkConfig:
+class InfoNetworkConfig(_XmlModel):
     """An object storing basic attributes of device's connected interfaces."""
+
+    __slots__ = ('_net_type', '_net_mac', '_net_ip')
+
+    _fields = (
+        _field('_net_type', attr='type', convert=intern, public='nettype'),
+        _field('_net_mac', 'macAddress', public='macaddress'),
+        _field('_net_ip', 'ipAddress', public='ipaddress'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._net_type = root.get('type')
-        self._net_mac = _xmlfind(root, 'macAddress')
-        self._net_ip = _xmlfind(root, 'ipAddress')
+        self._decode(root)
 
     @property
     def macaddress(self) -> str:
@@ -182,37 +617,47 @@ class InfoNetworkConfig:
         )
 
 
-class Status:
+class Status(_XmlModel):
     """A class covering all information about the current ContentItem.
 
     An object of this class can be obtained when querying the nowPlaying
     node.
     """
 
+    __slots__ = (
+        '_source', '_content_item', '_track', '_artist', '_album', '_image',
+        '_duration', '_position', '_play_status', '_shuffle_setting', '_repeat_setting',
+        '_stream_type', '_track_id', '_station_name', '_description',
+        '_station_location'
+    )
+
+    _fields = (
+        _field('_source', attr='source', convert=intern),
+        _field('_content_item', 'ContentItem', attr=_ELEMENT,
+               convert=lambda x: ContentItem(root=x) if x is not None else None,
+               public='contentitem'),
+        _field('_track', 'track'),
+        _field('_artist', 'artist'),
+        _field('_album', 'album'),
+        _field('_image', 'art', attr=_ELEMENT,
+               convert=lambda x: x.text if x is not None
+                                 and x.get('artImageStatus') == 'IMAGE_PRESENT' else None),
+        _field('_duration', 'time', attr='total', convert=int, default='0'),
+        _field('_position', 'time', convert=int, default='0'),
+        _field('_play_status', 'playStatus', convert=intern),
+        _field('_shuffle_setting', 'shuffleSetting', convert=intern),
+        _field('_repeat_setting', 'repeatSetting', convert=intern),
+        _field('_stream_type', 'streamType', convert=intern, public='streamtype'),
+        _field('_track_id', 'trackID', public='trackid'),
+        _field('_station_name', 'stationName', public='station'),
+        _field('_description', 'description'),
+        _field('_station_location', 'stationLocation', public='stationlocation'),
+    )
+
+    _nested = {'_content_item': ('ContentItem', False)}
+
     def __init__(self, root: Element) -> None:
-        self._source = _xmlfind_attr(root, 'nowPlaying', 'source')
-
-        self._content_item = None
-        content_item = root.find("ContentItem")
-        if content_item: self._content_item = ContentItem(root=content_item)
-
-        self._track = _xmlfind(root, "track")
-        self._artist = _xmlfind(root, "artist")
-        self._album = _xmlfind(root, "album")
-        image_status = _xmlfind_attr(root, "art", "artImageStatus")
-        if image_status == "IMAGE_PRESENT": self._image = _xmlfind(root, "art")
-        else: self._image = None
-
-        self._duration = int(_xmlfind_attr(root, "time", "total", default='0'))
-        self._position = int(_xmlfind(root, "time", default='0'))
-        self._play_status = _xmlfind(root, "playStatus")
-        self._shuffle_setting = _xmlfind(root, "shuffleSetting")
-        self._repeat_setting = _xmlfind(root, "repeatSetting")
-        self._stream_type = _xmlfind(root, "streamType")
-        self._track_id = _xmlfind(root, "trackID")
-        self._station_name = _xmlfind(root, "stationName")
-        self._description = _xmlfind(root, "description")
-        self._station_location = _xmlfind(root, "stationLocation")
+        self._decode(root)
 
     @property
     def source(self) -> str:
@@ -296,33 +741,70 @@ class Status:
         return self._station_location
 
 
-class ContentItem:
+def _content_item_xml(source, account, location, itemtype, name,
+                      presetable: bool = None, container_art: str = None) -> bytes:
+    xml = '<ContentItem%s' % attributes((
+        ('source', source), ('sourceAccount', account),
+        ('location', location), ('type', itemtype),
+        ('isPresetable', None if presetable is None else str(presetable).lower())
+    ))
+    children = ''
+    if name:
+        children = element('itemName', name)
+    if container_art:
+        children += element('containerArt', container_art)
+    if children:
+        xml = '%s>%s</ContentItem>' % (xml, children)
+    else:
+        xml += '/>'
+    return xml.encode('utf-8')
+
+
+class ContentItem(_XmlModel):
     """A class covering all information about the media source.
 
     Instances of this class can be used to switch the input source of media.
     """
 
+    __slots__ = (
+        '_name', '_source', '_type', '_location', '_source_account', '_is_presetable', '_xml'
+    )
+
+    _fields = (
+        _field('_name', 'itemName'),
+        _field('_source', attr='source', convert=intern),
+        _field('_type', attr='type', convert=intern, public='itemtype'),
+        _field('_location', attr='location'),
+        _field('_source_account', attr='sourceAccount', public='sourceaccount'),
+        _field('_is_presetable', attr='isPresetable', convert=_bool, default='false'),
+    )
+
     def __init__(self, src: str = None, account: str = None, media_type: str = None,
                 location: str = None, root: Element = None, name: str = None) -> None:
-        self._name = _xmlfind(root, "itemName") if root else name
-        self._source = root.get("source") if root else src
-        self._type = root.get("type") if root else media_type
-        self._location = root.get("location") if root else location
-        self._source_account = root.get("sourceAccount") if root else account
-        self._is_presetable = root.get("isPresetable") == 'true' if root else True
+        if root is not None:
+            self._decode(root)
+        else:
+            self._name = name
+            self._source = src
+            self._type = media_type
+            self._location = location
+            self._source_account = account
+            self._is_presetable = True
+
+    @property
+    def xml_bytes(self) -> bytes:
+        """The item object as encoded XML (built on first access, items are immutable)."""
+        xml = getattr(self, '_xml', None)
+        if xml is None:
+            xml = self._xml = _content_item_xml(
+                self._source, self._source_account, self._location, self._type, self._name
+            )
+        return xml
 
     @property
     def xml_str(self) -> str:
         """The item object as an XML string."""
-        xml = '<ContentItem '
-        if self.source: xml = '%ssource="%s" ' % (xml, self.source)
-        if self.sourceaccount: xml = '%ssourceAccount="%s" ' % (xml, self.sourceaccount)
-        if self.location: xml = '%slocation="%s" ' % (xml, self.location)
-        if self.itemtype: xml = '%stype="%s" ' % (xml, self.itemtype)
-        if not self.name:
-            return '%s/>' % xml
-        else:
-            return '%s><itemName>%s</itemName></ContentItem>' % (xml, self.name)
+        return self.xml_bytes.decode('utf-8')
 
     @property
     def name(self) -> str:
@@ -363,6 +845,9 @@ class SimpleConfig:
     On init, this object takes all stored attributes and the text from
     an XML-Element.
     """
+
+    __slots__ = ('_tag', '_value', '_attr')
+
     def __init__(self, root: Element) -> None:
         self._tag = root.tag
         self._value = root.text
@@ -383,21 +868,66 @@ class SimpleConfig:
         """The stored text value from the XML-Element."""
         return self._value
 
+    def __eq__(self, other) -> bool:
+        if type(other) is not SimpleConfig:
+            return NotImplemented
+        return (self._tag, self._value, self._attr) == (other._tag, other._value, other._attr)
+
+    def __hash__(self) -> int:
+        return hash((self._tag, self._value, _frozen(self._attr)))
+
+    def diff(self, other: 'SimpleConfig') -> dict:
+        """Returns the changed value and attributes (see _XmlModel.diff())."""
+        if type(other) is not SimpleConfig:
+            raise TypeError('Can not compare SimpleConfig to %s' % type(other).__name__)
+        changes = {}
+        for name, old, new in (('configname', self._tag, other._tag),
+                               ('value', self._value, other._value),
+                               ('attrib', self._attr, other._attr)):
+            if old != new:
+                changes[name] = (old, new)
+        return changes
+
+    def to_dict(self) -> dict:
+        """Returns the tag, value and attributes (see _XmlModel.to_dict())."""
+        return {'configname': self._tag, 'value': self._value, 'attrib': dict(self._attr)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SimpleConfig':
+        """Creates an object from the result of to_dict() without parsing XML."""
+        return cls._unpack([data.get('configname'), data.get('value'), data.get('attrib')])
+
+    def _pack(self) -> list:
+        return [self._tag, self._value, dict(self._attr)]
+
+    @classmethod
+    def _unpack(cls, values: list) -> 'SimpleConfig':
+        obj = cls.__new__(cls)
+        obj._tag, obj._value, attr = values
+        obj._attr = attr if attr is not None else {}
+        return obj
+
     @staticmethod
     def body(tag: str, value) -> str:
-        return '<%s>%s</%s>' % (tag, value, tag)
+        return '<%s>%s</%s>' % (tag, escape_text(value), tag)
 
     def __repr__(self) -> str:
         _name = '%s%s' % (self.configname[1].upper(), self.configname[1:])
         return '<%s value="%s" attrib=%s>' % (_name, self.value, self.attrib)
 
 
-class Bass:
+class Bass(_XmlModel):
     """The current bass configuration."""
 
+    __slots__ = ('_target_bass', '_actual_bass')
+
+    _fields = (
+        _field('_target_bass', 'targetbass', convert=int, default=0, public='target'),
+        _field('_actual_bass', 'actualbass', convert=int, default=0, public='actual'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._target_bass = int(_xmlfind(root, 'targetbass', default=0))
-        self._actual_bass = int(_xmlfind(root, 'actualbass', default=0))
+        self._decode(root)
 
     @property
     def target(self) -> int:
@@ -418,14 +948,20 @@ class Bass:
         return '<Bass target=%d, actual=%d>' % (self.target, self.actual)
 
 
-class BassCapabilities:
+class BassCapabilities(_XmlModel):
     """A simple boolean value wrapper.
 
     This class stores True if bass capabilities are enabled on the BOSE device.
     """
 
+    __slots__ = ('_available',)
+
+    _fields = (
+        _field('_available', 'bassAvailable', convert=_bool, default='false'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._available = _xmlfind(root, 'bassAvailable', default='false') == 'true'
+        self._decode(root)
 
     @property
     def available(self) -> bool:
@@ -436,16 +972,26 @@ class BassCapabilities:
         return '<BassCapabilities available=%s>' % self.available
 
 
-class Balance:
+class Balance(_XmlModel):
     """A class to represent the balance configuration."""
 
+    __slots__ = (
+        '_balanceAvailable', '_balanceMin', '_balanceMax', '_balanceDefault',
+        '_targetBalance', '_actualBalance'
+    )
+
+    _fields = (
+        _field('_balanceAvailable', 'balanceAvailable', convert=_bool, default='false',
+               public='available'),
+        _field('_balanceMin', 'balanceMin', convert=int, default=0, public='min'),
+        _field('_balanceMax', 'balanceMax', convert=int, default=0, public='max'),
+        _field('_balanceDefault', 'balanceDefault', convert=int, default=0, public='default'),
+        _field('_targetBalance', 'targetBalance', convert=int, default=0, public='target'),
+        _field('_actualBalance', 'actualBalance', convert=int, default=0, public='actual'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._balanceAvailable = _xmlfind(root, 'balanceAvailable', default='false') == 'true'
-        self._balanceMin = int(_xmlfind(root, 'balanceMin', default=0))
-        self._balanceMax = int(_xmlfind(root, 'balanceMax', default=0))
-        self._balanceDefault = int(_xmlfind(root, 'balanceDefault', default=0))
-        self._targetBalance = int(_xmlfind(root, 'targetBalance', default=0))
-        self._actualBalance = int(_xmlfind(root, 'actualBalance', default=0))
+        self._decode(root)
 
     @property
     def available(self) -> bool:
@@ -486,7 +1032,7 @@ class Balance:
             )
 
 
-class Capabilities:
+class Capabilities(_XmlModel):
     """The global capabilities storage.
 
     This class contains important configuration values, such as `wsapiproxy`
@@ -497,18 +1043,29 @@ class Capabilities:
     additional features, which are also stored in this class with a dict-like
     implementation with the following mapping: `self[cap.name] = cap.url`.
     """
+
+    __slots__ = (
+        '_lightswitch', '_clockDisplay', '_lrStereoCapable', '_bcoresetCapable',
+        '_disablePowerSaving', '_dualMode', '_wsapiproxy', '_capabilities'
+    )
+
+    _fields = (
+        _field('_lightswitch', 'lightswitch', convert=_bool, default='false'),
+        _field('_clockDisplay', 'clockDisplay', convert=_bool, default='false'),
+        _field('_lrStereoCapable', 'lrStereoCapable', convert=_bool, default='false'),
+        _field('_bcoresetCapable', 'bcoresetCapable', convert=_bool, default='false'),
+        _field('_disablePowerSaving', 'disablePowerSaving', convert=_bool, default='false'),
+        _field('_dualMode', 'networkConfig/dualMode', convert=_bool, default='false'),
+        _field('_wsapiproxy', 'networkConfig/wsapiproxy', convert=_bool, default='false'),
+        _field('_capabilities', attr=_ELEMENT,
+               convert=lambda root: {x.get('name'): x.get('url') for x in root.findall('capability')}),
+    )
+
+    # capabilities can be set like dict items, so objects are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element) -> None:
-        self._lightswitch = _xmlfind(root, 'lightswitch', default='false') == 'true'
-        self._clockDisplay = _xmlfind(root, 'clockDisplay', default='false') == 'true'
-        self._lrStereoCapable = _xmlfind(root, 'lrStereoCapable', default='false') == 'true'
-        self._bcoresetCapable = _xmlfind(root, 'bcoresetCapable', default='false') == 'true'
-        self._disablePowerSaving = _xmlfind(root, 'disablePowerSaving', default='false') == 'true'
-        self._dualMode = _xmlfind(root, './networkConfig/dualMode', default='false') == 'true'
-        self._wsapiproxy = _xmlfind(root, './networkConfig/wsapiproxy', default='false') == 'true'
-        self._capabilities = {}
-
-        for cap in root.findall('capability'):
-            self[cap.get('name')] = cap.get('url')
+        self._decode(root)
 
     def __getitem__(self, key):
         return self._capabilities[key]
@@ -563,16 +1120,25 @@ class Capabilities:
         )
 
 
-class ClockConfig:
+class ClockConfig(_XmlModel):
     """A class storing the current clock configuration."""
 
+    __slots__ = (
+        '_timezoneInfo', '_userEnable', '_timeFormat', '_userOffsetMinute',
+        '_brightnessLevel', '_userUtcTime'
+    )
+
+    _fields = (
+        _field('_timezoneInfo', 'clockConfig', attr='timezoneInfo'),
+        _field('_userEnable', 'clockConfig', attr='userEnable', convert=_bool, default='false'),
+        _field('_timeFormat', 'clockConfig', attr='timeFormat'),
+        _field('_userOffsetMinute', 'clockConfig', attr='userOffsetMinute', convert=int, default='0'),
+        _field('_brightnessLevel', 'clockConfig', attr='brightnessLevel', convert=int, default='0'),
+        _field('_userUtcTime', 'clockConfig', attr='userUtcTime', convert=int, default='0'),
+    )
+
     def __init__(self, root) -> None:
-        self._timezoneInfo = _xmlfind_attr(root, 'clockConfig', 'timezoneInfo')
-        self._userEnable = _xmlfind_attr(root, 'clockConfig', 'userEnable', default='false') == 'true'
-        self._timeFormat = _xmlfind_attr(root, 'clockConfig', 'timeFormat')
-        self._userOffsetMinute = int(_xmlfind_attr(root, 'clockConfig', 'userOffsetMinute', default='0'))
-        self._brightnessLevel = int(_xmlfind_attr(root, 'clockConfig', 'brightnessLevel', default='0'))
-        self._userUtcTime = int(_xmlfind_attr(root, 'clockConfig', 'userUtcTime', default='0'))
+        self._decode(root)
 
     @property
     def timezoneInfo(self):
@@ -608,23 +1174,33 @@ class ClockConfig:
         return '<ClockConfig format="%s">' % self.timeFormat
 
 
-class ClockTime:
+class ClockTime(_XmlModel):
     """A class containing the clock time."""
+
+    __slots__ = (
+        '_utcTime', '_cueMusic', '_timeFormat', '_brightness', '_clockError',
+        '_utcSyncTime', '_year', '_month', '_dayOfMonth', '_dayOfWeek', '_hour',
+        '_minute', '_second'
+    )
+
+    _fields = (
+        _field('_utcTime', attr='utcTime', convert=int, default='0'),
+        _field('_cueMusic', attr='cueMusic', convert=int, default='0'),
+        _field('_timeFormat', attr='timeFormat'),
+        _field('_brightness', attr='brightness', convert=int, default='0'),
+        _field('_clockError', attr='clockError', convert=int, default='0'),
+        _field('_utcSyncTime', attr='utcSyncTime', convert=int, default='0'),
+        _field('_year', 'localTime', attr='year', convert=int, default='0'),
+        _field('_month', 'localTime', attr='month', convert=int, default='0'),
+        _field('_dayOfMonth', 'localTime', attr='dayOfMonth', convert=int, default='0'),
+        _field('_dayOfWeek', 'localTime', attr='dayOfWeek', convert=int, default='0'),
+        _field('_hour', 'localTime', attr='hour', convert=int, default='0'),
+        _field('_minute', 'localTime', attr='minute', convert=int, default='0'),
+        _field('_second', 'localTime', attr='second', convert=int, default='0'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._utcTime = int(root.get('utcTime', default='0'))
-        self._cueMusic = int(root.get('cueMusic', default='0'))
-        self._timeFormat = root.get('timeFormat')
-        self._brightness = int(root.get('brightness', default='0'))
-        self._clockError = int(root.get('clockError', default='0'))
-        self._utcSyncTime = int(root.get('utcSyncTime', default='0'))
-
-        self._year = int(_xmlfind_attr(root, 'localTime', 'year', default='0'))
-        self._month = int(_xmlfind_attr(root, 'localTime', 'month', default='0'))
-        self._dayOfMonth = int(_xmlfind_attr(root, 'localTime', 'dayOfMonth', default='0'))
-        self._dayOfWeek =int( _xmlfind_attr(root, 'localTime', 'dayOfWeek', default='0'))
-        self._hour = int(_xmlfind_attr(root, 'localTime', 'hour', default='0'))
-        self._minute = int(_xmlfind_attr(root, 'localTime', 'minute', default='0'))
-        self._second = int(_xmlfind_attr(root, 'localTime', 'second', default='0'))
+        self._decode(root)
 
     @property
     def year(self):
@@ -685,9 +1261,15 @@ class ClockTime:
         )
 
 
-class DSPMonoStereo:
+class DSPMonoStereo(_XmlModel):
+    __slots__ = ('_mono',)
+
+    _fields = (
+        _field('_mono', 'mono', attr='enable', convert=_bool, default='false'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._mono = _xmlfind_attr(root, 'mono', 'enable', default='false') == 'true'
+        self._decode(root)
 
     @property
     def mono(self):
@@ -697,9 +1279,15 @@ class DSPMonoStereo:
         return '<DSP mono=%s>' % self.mono
 
 
-class WirelessProfile:
+class WirelessProfile(_XmlModel):
+    __slots__ = ('_ssid',)
+
+    _fields = (
+        _field('_ssid', 'ssid'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._ssid = _xmlfind(root, 'ssid')
+        self._decode(root)
 
     @property
     def ssid(self):
@@ -709,16 +1297,25 @@ class WirelessProfile:
         return '<WifiProfile ssid="%s">' % self.ssid
 
 
-class MediaServer:
+class MediaServer(_XmlModel):
+    __slots__ = (
+        '_id', '_mac', '_ip', '_manufacturer', '_model_name', '_friendly_name',
+        '_model_description', '_location'
+    )
+
+    _fields = (
+        _field('_id', attr='id', public='serverid'),
+        _field('_mac', attr='mac'),
+        _field('_ip', attr='ip'),
+        _field('_manufacturer', attr='manufacturer'),
+        _field('_model_name', attr='model_name'),
+        _field('_friendly_name', attr='friendly_name'),
+        _field('_model_description', attr='model_description'),
+        _field('_location', attr='location'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._id = root.get('id')
-        self._mac = root.get('mac')
-        self._ip = root.get('ip')
-        self._manufacturer = root.get('manufacturer')
-        self._model_name = root.get('model_name')
-        self._friendly_name = root.get('friendly_name')
-        self._model_description = root.get('model_description')
-        self._location = root.get('location')
+        self._decode(root)
 
     @property
     def serverid(self):
@@ -758,15 +1355,35 @@ class MediaServer:
         )
 
 
-class MediaServerList:
+class MediaServerList(_ModelList):
+    __slots__ = ('_servers', '_index')
+
+    _item_type = MediaServer
+
+    _indexed = {'serverid': attrgetter('serverid'), 'ip': attrgetter('ip')}
+
+    @staticmethod
+    def _key(item: 'MediaServer') -> str:
+        return item.serverid
+
     def __init__(self, root: Element = None) -> None:
         self._servers = []
-        if root:
+        self._index = self._new_index()
+        if root is not None:
             for server in root.findall('media_server'):
                 self.append(MediaServer(server))
 
     def append(self, value: MediaServer):
         self._servers.append(value)
+        self._add_to_index(value)
+
+    def by_id(self, server_id: str) -> MediaServer:
+        """Returns the server with the given id (or None)."""
+        return self._index['serverid'].get(server_id)
+
+    def by_ip(self, ip: str) -> MediaServer:
+        """Returns the server with the given IP address (or None)."""
+        return self._index['ip'].get(ip)
 
     def __getitem__(self, key) -> MediaServer:
         return self._servers[key]
@@ -781,16 +1398,29 @@ class MediaServerList:
         return self._servers.__repr__()
 
 
-class NetInterface:
+class NetInterface(_XmlModel):
+    __slots__ = (
+        '_name', '_mac', '_running', '_kind', '_ssid', '_rssi', '_frequencyKHz',
+        '_bindings'
+    )
+
+    _fields = (
+        _field('_name', 'name'),
+        _field('_mac', 'mac'),
+        _field('_running', 'running', convert=intern),
+        _field('_kind', 'kind', convert=intern),
+        _field('_ssid', 'ssid'),
+        _field('_rssi', 'rssi'),
+        _field('_frequencyKHz', 'frequencyKHz'),
+        _field('_bindings', 'bindings', attr=_ELEMENT,
+               convert=lambda x: {y.tag: y.text for y in x} if x is not None else {}),
+    )
+
+    # bindings can be set like dict items, so objects are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element) -> None:
-        self._name = _xmlfind(root, 'name')
-        self._mac = _xmlfind(root, 'mac')
-        self._running = _xmlfind(root, 'running')
-        self._kind = _xmlfind(root, 'kind')
-        self._ssid = _xmlfind(root, 'ssid')
-        self._rssi = _xmlfind(root, 'rssi')
-        self._frequencyKHz = _xmlfind(root, 'frequencyKHz')
-        self._bindings = {}
+        self._decode(root)
 
     @property
     def name(self):
@@ -838,13 +1468,24 @@ class NetInterface:
         )
 
 
-class NetworkStats:
+class NetworkStats(_XmlModel):
+    __slots__ = ('_devid', '_serial', '_interfaces')
+
+    _fields = (
+        _field('_devid', 'devices/device', attr='deviceID', public='deviceid'),
+        _field('_serial', 'devices/device/deviceSerialNumber'),
+        _field('_interfaces', 'devices/device/interfaces', attr=_ELEMENT,
+               convert=lambda x: [NetInterface(y) for y in x.findall('interface')]
+                                 if x is not None else []),
+    )
+
+    _nested = {'_interfaces': ('NetInterface', True)}
+
+    # NetInterface objects are mutable, so neither are hashable
+    __hash__ = None
+
     def __init__(self, root: Element) -> None:
-        self._devid = _xmlfind_attr(root, 'device', 'deviceID')
-        self._serial = _xmlfind(root, 'deviceSerialNumber')
-        self._interfaces = []
-        for interface in root.find('interfaces'):
-            self._interfaces.append(NetInterface(interface))
+        self._decode(root)
 
     @property
     def deviceid(self):
@@ -867,16 +1508,22 @@ class NetworkStats:
         return self._interfaces.__repr__()
 
 
-class NetworkInfoInterface:
+class NetworkInfoInterface(_XmlModel):
+    __slots__ = ('_iftype', '_name', '_ip', '_ssid', '_frequencyKHz', '_state', '_signal', '_mode')
+
+    _fields = (
+        _field('_iftype', attr='iftype', convert=intern),
+        _field('_name', attr='name'),
+        _field('_ip', attr='ip', public='ipaddress'),
+        _field('_ssid', attr='ssid'),
+        _field('_frequencyKHz', attr='frequencyKHz'),
+        _field('_state', attr='state', convert=intern),
+        _field('_signal', attr='signal', convert=intern),
+        _field('_mode', attr='mode', convert=intern),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._iftype = root.get('iftype')
-        self._name = root.get('name')
-        self._ip = root.get('ip')
-        self._ssid = root.get('ssid')
-        self._frequencyKHz = root.get('frequencyKHz')
-        self._state = root.get('state')
-        self._signal = root.get('signal')
-        self._mode = root.get('mode')
+        self._decode(root)
 
     @property
     def iftype(self):
@@ -914,13 +1561,26 @@ class NetworkInfoInterface:
         return '<Interface name="%s", state="%s">' % (self.name, self.state)
 
 
-class NetworkInfo:
+class NetworkInfo(_XmlModel):
+    __slots__ = ('_interfaces', '_wifi_profile_count')
+
+    _fields = (
+        _field('_interfaces', 'interfaces', attr=_ELEMENT,
+               convert=lambda x: [NetworkInfoInterface(y) for y in x] if x is not None else []),
+        _field('_wifi_profile_count', attr='wifiProfileCount', public='wifiprofilecount'),
+    )
+
+    _nested = {'_interfaces': ('NetworkInfoInterface', True)}
+
+    # interfaces can be appended, so objects are not hashable
+    __hash__ = None
+
     def __init__(self, root: Element = None) -> None:
-        self._interfaces = []
-        self._wifi_profile_count = root.get('wifiProfileCount')
-        if root:
-            for interface in root.find('interfaces'):
-                self.append(NetworkInfoInterface(interface))
+        if root is not None:
+            self._decode(root)
+        else:
+            self._interfaces = []
+            self._wifi_profile_count = None
 
     def append(self, value: NetworkInfoInterface):
         self._interfaces.append(value)
@@ -942,10 +1602,16 @@ class NetworkInfo:
         return self._wifi_profile_count
 
 
-class PowerManagement:
+class PowerManagement(_XmlModel):
+    __slots__ = ('_state', '_battery_capable')
+
+    _fields = (
+        _field('_state', 'powerState', convert=intern),
+        _field('_battery_capable', 'capable', convert=intern),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._state = _xmlfind(root, 'powerState')
-        self._battery_capable = _xmlfind(root, 'capable')
+        self._decode(root)
 
     @property
     def state(self):
@@ -959,14 +1625,23 @@ class PowerManagement:
         return '<PowerManagement state="%s">' % self.state
 
 
-class SourceItem:
+class SourceItem(_XmlModel):
+    __slots__ = (
+        '_username', '_source', '_sourceAccount', '_status', '_isLocal',
+        '_multiroomallowed'
+    )
+
+    _fields = (
+        _field('_username'),
+        _field('_source', attr='source', convert=intern),
+        _field('_sourceAccount', attr='sourceAccount'),
+        _field('_status', attr='status', convert=intern),
+        _field('_isLocal', attr='isLocal', convert=intern),
+        _field('_multiroomallowed', attr='multiroomallowed', convert=intern),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._username = root.text
-        self._source = root.get('source')
-        self._sourceAccount = root.get('sourceAccount')
-        self._status = root.get('status')
-        self._isLocal = root.get('isLocal')
-        self._multiroomallowed = root.get('multiroomallowed')
+        self._decode(root)
 
     @property
     def source(self):
@@ -993,23 +1668,52 @@ class SourceItem:
         return self._username
 
 
-class SourceItemList:
+class SourceItemList(_ModelList):
+    __slots__ = ('_items', '_index')
+
+    _item_type = SourceItem
+
+    _indexed = {
+        'source': attrgetter('source'),
+        'sourceAccount': attrgetter('sourceAccount'),
+        'key': attrgetter('source', 'sourceAccount'),
+    }
+
+    @staticmethod
+    def _key(item: 'SourceItem') -> tuple:
+        return item.source, item.sourceAccount
+
     def __init__(self, root: Element = None) -> None:
         self._items = []
-        if root:
-            for item in root.find('sources'):
+        self._index = self._new_index()
+        if root is not None:
+            for item in root.findall('sourceItem'):
                 self.append(SourceItem(root=item))
 
     def append(self, value: SourceItem):
         self._items.append(value)
+        self._add_to_index(value)
+
+    def get(self, source: str, source_account: str = None) -> SourceItem:
+        """Returns the item of the given source (and account) or None.
+
+        :param source: the source name, e.g. 'SPOTIFY'
+        :type source: str
+        :param source_account: the account, defaults to the first item of the source
+        :type source_account: str, optional
+        """
+        if source_account is None:
+            return self._index['source'].get(source)
+        return self._index['key'].get((source, source_account))
+
+    def by_account(self, source_account: str) -> SourceItem:
+        """Returns the first item with the given source account (or None)."""
+        return self._index['sourceAccount'].get(source_account)
 
     def __getitem__(self, key) -> SourceItem:
         if isinstance(key, str):
-            for item in self:
-                if item.source == key:
-                    return item
-        else:
-            return self._items[key]
+            return self._index['source'].get(key)
+        return self._items[key]
 
     def __iter__(self) -> Iterator:
         return iter(self._items)
@@ -1018,28 +1722,109 @@ class SourceItemList:
         return len(self._items)
 
 
-class SystemTimeout:
+class SystemTimeout(_XmlModel):
+    __slots__ = ('_powersaving_enabled',)
+
+    _fields = (
+        _field('_powersaving_enabled', 'powersaving_enabled', convert=_bool, default='false',
+               public='powersaving'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._powersaving_enabled = _xmlfind(root, 'powersaving_enabled', default='false') == 'true'
+        self._decode(root)
 
     @property
     def powersaving(self) -> bool:
-        return self.powersaving
+        return self._powersaving_enabled
 
     def __repr__(self) -> str:
         return '<SystemTimeout powersaving=%s>' % self.powersaving
 
 
-class Preset:
+def _lookup(name: str, convert=None, default=None):
+    # reads the first <name> text or name="..." attribute below the element
+    def lookup(root):
+        if root is not None:
+            for node in root.iter():
+                value = node.text if node.tag == name else node.get(name)
+                if value is not None and value.strip():
+                    value = value.strip()
+                    return convert(value) if convert is not None else value
+        return default
+    return lookup
+
+
+def _percent(value: str) -> int:
+    try:
+        return int(float(value))
+    except ValueError:
+        return 0
+
+
+class SoftwareUpdateStatus(_XmlModel):
+    """The state of a software update (swUpdateQuery and swUpdateStatusUpdated).
+
+    The state and progress are read from `<state>`/`<percentComplete>`
+    elements as well as from `state`/`percentComplete` attributes anywhere
+    below the root, so the query response and the WebSocket event can be
+    decoded with this class.
+    """
+
+    __slots__ = ('_state', '_percent_complete', '_can_abort')
+
+    _fields = (
+        _field('_state', None, _ELEMENT, convert=_lookup('state', intern)),
+        _field('_percent_complete', None, _ELEMENT, convert=_lookup('percentComplete', _percent, 0)),
+        _field('_can_abort', None, _ELEMENT, convert=_lookup('canAbort', _bool)),
+    )
+
+    def __init__(self, root: Element = None, state: str = None,
+                 percent_complete: int = 0, can_abort: bool = None) -> None:
+        if root is not None:
+            self._decode(root)
+        else:
+            self._state = state
+            self._percent_complete = percent_complete
+            self._can_abort = can_abort
+
+    @property
+    def state(self) -> str:
+        """The update state reported by the device (e.g. 'IDLE'), or None."""
+        return self._state
+
+    @property
+    def percent_complete(self) -> int:
+        """The progress of the running update in percent."""
+        return self._percent_complete
+
+    @property
+    def can_abort(self) -> bool:
+        """Whether the running update can be aborted, None if not reported."""
+        return self._can_abort
+
+    def __repr__(self) -> str:
+        return '<SoftwareUpdateStatus state="%s", percent=%d>' % (self.state, self.percent_complete)
+
+
+class Preset(_XmlModel):
+    __slots__ = (
+        '_name', '_id', '_source', '_type', '_location', '_source_account',
+        '_is_presetable', '_container_art', '_xml'
+    )
+
+    _fields = (
+        _field('_name', 'ContentItem/itemName'),
+        _field('_id', attr='id', public='itemid'),
+        _field('_source', 'ContentItem', attr='source', convert=intern),
+        _field('_type', 'ContentItem', attr='type', convert=intern, public='itemtype'),
+        _field('_location', 'ContentItem', attr='location'),
+        _field('_source_account', 'ContentItem', attr='sourceAccount'),
+        _field('_is_presetable', 'ContentItem', attr='isPresetable', convert=_bool, default='false'),
+        _field('_container_art', 'ContentItem/containerArt'),
+    )
+
     def __init__(self, root: Element) -> None:
-        self._name = _xmlfind(root, "itemName")
-        self._id = root.get("id")
-        self._source = _xmlfind_attr(root, "ContentItem","source")
-        self._type = _xmlfind_attr(root, "ContentItem","type")
-        self._location = _xmlfind_attr(root, "ContentItem","location")
-        self._source_account = _xmlfind_attr(root,"ContentItem","sourceAccount")
-        self._is_presetable = _xmlfind_attr(root,"ContentItem","isPresetable") == "true"
-        self._xml = tostring(root.find('ContentItem'))
+        self._decode(root)
 
     @property
     def name(self):
@@ -1069,9 +1854,26 @@ class Preset:
     def is_presetable(self):
         return self._is_presetable
 
+    @property
+    def container_art(self) -> str:
+        """The URL of the ContentItem's artwork (if present)."""
+        return self._container_art
+
+    @property
+    def xml_bytes(self) -> bytes:
+        """The preset's ContentItem as encoded XML, including isPresetable and containerArt."""
+        xml = getattr(self, '_xml', None)
+        if xml is None:
+            xml = self._xml = _content_item_xml(
+                self._source, self._source_account, self._location, self._type, self._name,
+                self._is_presetable, self._container_art
+            )
+        return xml
+
     @property
     def xml_str(self) -> str:
-        return str(self._xml, 'utf-8')
+        """The preset's ContentItem as an XML string (see ContentItem.xml_str)."""
+        return self.xml_bytes.decode('utf-8')
 
     def __repr__(self) -> str:
         return '<Preset name="%s", type="%s", source="%s">' % (
@@ -1079,15 +1881,35 @@ class Preset:
         )
 
 
-class PresetList:
+class PresetList(_ModelList):
+    __slots__ = ('_presets', '_index')
+
+    _item_type = Preset
+
+    _indexed = {'itemid': attrgetter('itemid'), 'location': attrgetter('location')}
+
+    @staticmethod
+    def _key(item: 'Preset') -> str:
+        return item.itemid
+
     def __init__(self, root: Element = None) -> None:
         self._presets = []
-        if root:
+        self._index = self._new_index()
+        if root is not None:
             for preset in root.findall('preset'):
                 self.append(Preset(preset))
 
     def append(self, value: Preset):
         self._presets.append(value)
+        self._add_to_index(value)
+
+    def by_id(self, preset_id) -> Preset:
+        """Returns the preset with the given id, e.g. 1 or '1' (or None)."""
+        return self._index['itemid'].get(str(preset_id))
+
+    def by_location(self, location: str) -> Preset:
+        """Returns the first preset with the given ContentItem location (or None)."""
+        return self._index['location'].get(location)
 
     def __getitem__(self, key) -> Preset:
         return self._presets[key]
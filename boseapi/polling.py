@@ -0,0 +1,329 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Devices without WebSocket support (`Capabilities.wsapiproxy == False`) have to
+be polled for changes. The PollScheduler polls a set of nodes on many devices
+with adaptive intervals: a node is polled at its minimum interval while the
+device is playing, at its base interval after a change and gets slower while
+nothing changes or the device is in standby. All requests are spread over time
+and limited by a global rate.
+"""
+import heapq
+import random
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread
+
+from boseapi import model
+from boseapi.client import SoundTouchClient
+from boseapi.common import nodes, xmlparser
+from boseapi.common.message import SoundTouchUri, Source
+from boseapi.common.ratelimit import TokenBucket
+
+__all__ = ['PollJob', 'PollScheduler', 'needs_polling']
+
+PLAYING_STATES = ('PLAY_STATE', 'BUFFERING_STATE')
+"""Play states in which polled nodes are narrowed to their minimum interval."""
+
+NODE_TYPES = {
+    'nowPlaying': model.Status,
+    'volume': model.Volume,
+    'getZone': model.Zone,
+    'presets': model.PresetList,
+    'sources': model.SourceItemList,
+    'bass': model.Bass,
+    'name': model.SimpleConfig,
+}
+"""Model classes of commonly polled nodes (path mapped to class)."""
+
+
+def needs_polling(client: SoundTouchClient) -> bool:
+    """Returns whether the client's device has to be polled for changes.
+
+    :param client: the client of the device
+    :type client: SoundTouchClient
+    :return: True, if the device does not support WebSocket notifications
+    :rtype: bool
+    """
+    capabilities = client.capabilities(refresh=False)
+    return capabilities is None or not capabilities.wsapiproxy
+
+
+class PollJob:
+    """The state of a single polled node on a single device.
+
+    Attributes:
+        client: SoundTouchClient
+            The client used to poll the node.
+        uri: SoundTouchUri
+            The polled node.
+        class_type: type
+            The model class the response is converted to.
+        interval: float
+            The base interval in seconds, used after a change.
+        min_interval: float
+            The interval used while the device is playing.
+        max_interval: float
+            The upper bound for the interval while nothing changes.
+        current: float
+            The currently used interval.
+        value: object
+            The last polled model object.
+        errors: int
+            The number of consecutive failed polls.
+    """
+
+    def __init__(self, client: SoundTouchClient, uri: SoundTouchUri, class_type,
+                 interval: float, min_interval: float, max_interval: float,
+                 listener=None) -> None:
+        self.client = client
+        self.uri = uri
+        self.class_type = class_type
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.current = interval
+        self.listener = listener
+        self.value = None
+        self.errors = 0
+        self.cancelled = False
+        self._raw = None
+
+    @property
+    def host(self) -> str:
+        """The polled device's host address."""
+        return self.client.device.host
+
+    def poll(self) -> bool:
+        """Fetches the node once and returns whether its value changed."""
+        msg = self.client.get(self.uri)
+        if msg.response is None:
+            raise ConnectionError('No response for "%s"' % self.uri)
+
+        raw = xmlparser.tostring(msg.response)
+        changed = raw != self._raw
+        if changed:
+            self._raw = raw
+            self.value = self.class_type(root=msg.response)
+            self.client[self.uri] = self.value
+        return changed
+
+    def __repr__(self) -> str:
+        return '<PollJob host="%s", node="%s", interval=%.1f>' % (self.host, self.uri, self.current)
+
+
+class PollScheduler:
+    """A central scheduler polling nodes of many devices.
+
+    Each job is rescheduled after its poll finished. The next interval is:
+        - `min_interval` if the device is playing (see PLAYING_STATES),
+        - the base interval if the value changed,
+        - the previous interval multiplied by `backoff` (up to `max_interval`)
+          if nothing changed, or
+        - `max_interval` if the device is in standby (`Source.STANDBY`).
+
+    Each interval is randomized by +-`jitter` and new jobs start at a random
+    offset within their interval, so devices added at the same time do not
+    fire together. `max_rate` limits the requests per second of all jobs.
+
+    Listeners are called with (job, changed) after each successful poll.
+
+    :param max_rate: the global request limit per second, defaults to 10
+    :type max_rate: float, optional
+    :param workers: the number of concurrent polls, defaults to 4
+    :type workers: int, optional
+    :param backoff: the factor to widen unchanged nodes, defaults to 1.5
+    :type backoff: float, optional
+    :param jitter: the relative randomization of each interval, defaults to 0.1
+    :type jitter: float, optional
+
+    Example:
+    `scheduler.add(client, nodes.nowPlaying, interval=5, listener=on_change)`
+    """
+
+    def __init__(self, max_rate: float = 10.0, workers: int = 4,
+                 backoff: float = 1.5, jitter: float = 0.1) -> None:
+        self.bucket = TokenBucket(max_rate)
+        self.workers = max(1, workers)
+        self.backoff = max(1.0, backoff)
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self.jobs = []
+        self._queue = []
+        self._sequence = 0
+        self._condition = Condition()
+        self._standby = {}
+        self._thread = None
+        self._executor = None
+        self._running = False
+
+    def add(self, client: SoundTouchClient, uri: SoundTouchUri = nodes.nowPlaying,
+            interval: float = 5.0, min_interval: float = None, max_interval: float = None,
+            class_type=None, listener=None) -> PollJob:
+        """Adds a new node to poll.
+
+        :param client: the client of the target device
+        :type client: SoundTouchClient
+        :param uri: the node to poll, defaults to nodes.nowPlaying
+        :type uri: SoundTouchUri, optional
+        :param interval: the base interval in seconds, defaults to 5.0
+        :type interval: float, optional
+        :param min_interval: the interval during playback, defaults to interval / 2
+        :type min_interval: float, optional
+        :param max_interval: the upper bound of the interval, defaults to interval * 12
+        :type max_interval: float, optional
+        :param class_type: the model class, defaults to the one in NODE_TYPES
+        :type class_type: type, optional
+        :param listener: called with (job, changed) after each poll
+        :type listener: Callable[[PollJob, bool], None], optional
+        :return: the created job
+        :rtype: PollJob
+        """
+        class_type = class_type or NODE_TYPES.get(str(uri), model.SimpleConfig)
+        job = PollJob(
+            client, uri, class_type, interval,
+            min_interval if min_interval is not None else interval / 2,
+            max_interval if max_interval is not None else interval * 12,
+            listener
+        )
+        with self._condition:
+            self.jobs.append(job)
+            self._push(job, time.monotonic() + random.uniform(0, interval))
+        return job
+
+    def add_device(self, client: SoundTouchClient, intervals: dict = None,
+                   listener=None) -> list:
+        """Polls the status and volume (or the given nodes) of a device.
+
+        :param client: the client of the target device
+        :type client: SoundTouchClient
+        :param intervals: the nodes to poll mapped to their base interval,
+                          defaults to {nowPlaying: 5, volume: 10}
+        :type intervals: dict, optional
+        :param listener: called with (job, changed) after each poll
+        :type listener: Callable[[PollJob, bool], None], optional
+        :return: the created jobs
+        :rtype: list[PollJob]
+        """
+        intervals = intervals or {nodes.nowPlaying: 5.0, nodes.volume: 10.0}
+        return [self.add(client, uri, interval, listener=listener)
+                for uri, interval in intervals.items()]
+
+    def remove(self, job: PollJob):
+        """Stops polling the given job."""
+        with self._condition:
+            job.cancelled = True
+            if job in self.jobs:
+                self.jobs.remove(job)
+
+    def remove_device(self, client: SoundTouchClient):
+        """Stops polling all nodes of the given client."""
+        for job in [x for x in self.jobs if x.client is client]:
+            self.remove(job)
+
+    def is_standby(self, host: str) -> bool:
+        """Returns whether the given device was in standby at its last poll."""
+        return self._standby.get(host, False)
+
+    def next_interval(self, job: PollJob, changed: bool) -> float:
+        """Computes the next (unrandomized) interval of the given job."""
+        if self.is_standby(job.host):
+            return job.max_interval
+
+        status = job.client[nodes.nowPlaying]
+        if isinstance(status, model.Status) and status.play_status in PLAYING_STATES:
+            return job.min_interval
+
+        if changed:
+            return job.interval
+        return min(job.current * self.backoff, job.max_interval)
+
+    def _push(self, job: PollJob, due: float):
+        self._sequence += 1
+        heapq.heappush(self._queue, (due, self._sequence, job))
+        self._condition.notify()
+
+    def _run_job(self, job: PollJob):
+        try:
+            changed = job.poll()
+            job.errors = 0
+            if isinstance(job.value, model.Status):
+                self._standby[job.host] = (job.value.source or '').lower() == Source.STANDBY.value
+            job.current = self.next_interval(job, changed)
+            if job.listener:
+                job.listener(job, changed)
+        except Exception:
+            job.errors += 1
+            job.current = min(job.interval * (2 ** job.errors), job.max_interval)
+
+        delay = job.current * random.uniform(1 - self.jitter, 1 + self.jitter)
+        with self._condition:
+            if not job.cancelled:
+                self._push(job, time.monotonic() + delay)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    now = time.monotonic()
+                    if self._queue and self._queue[0][0] <= now:
+                        job = heapq.heappop(self._queue)[2]
+                        break
+                    self._condition.wait(self._queue[0][0] - now if self._queue else None)
+                else:
+                    return
+
+            if job.cancelled:
+                continue
+            self.bucket.acquire()
+            self._executor.submit(self._run_job, job)
+
+    def start(self):
+        """Starts polling in a background thread."""
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._thread = Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops polling and waits for running polls to finish."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> 'PollScheduler':
+        self.start()
+        return self
+
+    def __exit__(self, etype, value, traceback) -> None:
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self.jobs)
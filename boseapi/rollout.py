@@ -0,0 +1,369 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Staged software updates of many devices.
+
+An UpdateRollout updates the devices in waves. Within a wave at most
+`max_concurrent` updates run at the same time. The progress of each device
+is tracked through its swUpdateStatusUpdated WebSocket events. If the share
+of failed devices in a wave exceeds `failure_threshold`, no further update is
+started and all remaining devices are skipped:
+
+    rollout = UpdateRollout(devices, waves=(1, 5, 25), max_concurrent=5,
+                            failure_threshold=0.2)
+    rollout.run()
+    print(rollout.summary())     # {'succeeded': 30, 'failed': 1, 'skipped': 269, ...}
+
+Updates are started once the device's WebSocket is open. Devices restart
+after installing an update and close (or lose) their WebSocket. While
+a device is restarting its state is queried with swUpdateQuery every
+`reboot_interval` seconds until it answers or the update times out.
+
+The installed software version is read from /info before the update is
+started. A device that returns to IDLE has only been updated if it reports
+another version afterwards.
+"""
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+from boseapi import model
+from boseapi.client import SoundTouchClient
+from boseapi.common.device import BoseDevice, load_info
+from boseapi.compliance import installed_version
+from boseapi.ws.bosews import BoseWebSocket
+
+__all__ = [
+    'UpdateRollout', 'DeviceUpdate', 'SW_UPDATE', 'PENDING', 'RUNNING', 'SUCCEEDED',
+    'FAILED', 'SKIPPED', 'SUCCESS_STATES', 'FAILURE_STATES'
+]
+
+SW_UPDATE = 'swUpdateStatusUpdated'
+"""The WebSocket event reporting the update state."""
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+SUCCESS_STATES = frozenset(('COMPLETE', 'COMPLETED', 'UPDATE_COMPLETE', 'DONE', 'INSTALLED'))
+"""Update states that finish an update successfully."""
+
+FAILURE_STATES = frozenset(('FAILED', 'ERROR', 'ABORTED', 'UPDATE_FAILED', 'DOWNLOAD_FAILED'))
+"""Update states that finish an update with a failure.
+
+States containing 'FAIL' or 'ERROR' are treated as failures as well. An
+'IDLE' state after the update started counts as success only if /info
+reports another software version than before the update, and as failure
+otherwise.
+"""
+
+IDLE = 'IDLE'
+
+
+class DeviceUpdate:
+    """The update of a single device.
+
+    Attributes:
+        device: BoseDevice
+            The updated device.
+        wave: int
+            The index of the device's wave.
+        state: str
+            PENDING, RUNNING, SUCCEEDED, FAILED or SKIPPED.
+        status: SoftwareUpdateStatus
+            The last update status reported by the device, or None.
+        events: int
+            The number of received swUpdateStatusUpdated events.
+        error: str
+            The reason of a failure, or None.
+        version: str
+            The software version installed before the update, or None.
+        started: float
+            The time.time() the update was started, or None.
+        finished: float
+            The time.time() the update finished, or None.
+    """
+
+    def __init__(self, device: BoseDevice, wave: int) -> None:
+        self.device = device
+        self.wave = wave
+        self.state = PENDING
+        self.status = None
+        self.events = 0
+        self.error = None
+        self.version = None
+        self.started = None
+        self.finished = None
+        self.disconnected = False
+        self._changed = Event()
+
+    @property
+    def done(self) -> bool:
+        """Whether the update succeeded, failed or was skipped."""
+        return self.state in (SUCCEEDED, FAILED, SKIPPED)
+
+    @property
+    def duration(self) -> float:
+        """The seconds between start and end of the update, or None."""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def __repr__(self) -> str:
+        return '<DeviceUpdate host="%s", state=%s, percent=%d>' % (
+            self.device.host, self.state, self.status.percent_complete if self.status else 0
+        )
+
+
+class UpdateRollout:
+    """Runs the software update of many devices in waves.
+
+    :param devices: the devices to update, in rollout order
+    :type devices: list[BoseDevice]
+    :param waves: the size of each wave; the last size is repeated for the
+                  remaining devices, defaults to 10
+    :type waves: int | tuple[int]
+    :param max_concurrent: the maximum number of updates running at once
+    :type max_concurrent: int
+    :param failure_threshold: the share of failed devices in a wave (0-1)
+                              that halts the rollout
+    :type failure_threshold: float
+    :param timeout: the seconds a single update may take
+    :type timeout: float
+    :param reboot_interval: the seconds between two queries while a device restarts
+    :type reboot_interval: float
+    :param connect_timeout: the seconds to wait for the WebSocket before the
+                            update is started
+    :type connect_timeout: float
+    :param check: whether swUpdateCheck is sent before swUpdateStart
+    :type check: bool
+    :param listener: called with the DeviceUpdate on every change, defaults to None
+    :param client_factory: creates the client of a device
+    :param socket_factory: creates the WebSocket of a device
+    """
+
+    def __init__(self, devices: list, waves=10, max_concurrent: int = 4,
+                 failure_threshold: float = 0.2, timeout: float = 1800.0,
+                 reboot_interval: float = 30.0, connect_timeout: float = 10.0,
+                 check: bool = True,
+                 success_states: frozenset = SUCCESS_STATES,
+                 failure_states: frozenset = FAILURE_STATES, listener=None,
+                 client_factory=SoundTouchClient, socket_factory=BoseWebSocket) -> None:
+        sizes = [waves] if isinstance(waves, int) else list(waves)
+        if not sizes or any(size < 1 for size in sizes):
+            raise ValueError('Invalid wave sizes: %s' % (waves,))
+        self.max_concurrent = max(1, max_concurrent)
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self.reboot_interval = reboot_interval
+        self.connect_timeout = connect_timeout
+        self.check = check
+        self.success_states = frozenset(success_states)
+        self.failure_states = frozenset(failure_states)
+        self.listener = listener
+        self.client_factory = client_factory
+        self.socket_factory = socket_factory
+        self.halted = False
+        self.halted_wave = None
+        self._stopped = False
+        self._lock = Lock()
+
+        self.updates = []
+        self.waves = []
+        devices = list(devices)
+        start, index = 0, 0
+        while start < len(devices):
+            size = sizes[min(index, len(sizes) - 1)]
+            wave = [DeviceUpdate(device, index) for device in devices[start:start + size]]
+            self.waves.append(wave)
+            self.updates.extend(wave)
+            start += size
+            index += 1
+
+    def run(self) -> list:
+        """Updates all devices and returns their DeviceUpdate objects.
+
+        Waves run one after another; the rollout halts after the wave whose
+        failure rate exceeded the threshold, running updates are not aborted.
+        """
+        for index, wave in enumerate(self.waves):
+            if self.halted or self._stopped:
+                self._skip(wave)
+                continue
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(wave))) as executor:
+                for update in wave:
+                    executor.submit(self._run_update, update, wave)
+            if not self.halted and self._failure_rate(wave) > self.failure_threshold:
+                self.halted = True
+                self.halted_wave = index
+        return self.updates
+
+    def stop(self):
+        """Stops starting further updates, running updates continue."""
+        self._stopped = True
+
+    def summary(self) -> dict:
+        """Returns the number of devices per state (and the halted flag)."""
+        counts = dict.fromkeys((PENDING, RUNNING, SUCCEEDED, FAILED, SKIPPED), 0)
+        for update in self.updates:
+            counts[update.state] += 1
+        counts['halted'] = self.halted
+        return counts
+
+    def _failure_rate(self, wave: list) -> float:
+        return sum(1 for update in wave if update.state == FAILED) / len(wave)
+
+    def _skip(self, wave: list):
+        for update in wave:
+            if update.state == PENDING:
+                self._set(update, SKIPPED)
+
+    def _set(self, update: DeviceUpdate, state: str, error: str = None):
+        with self._lock:
+            if update.done:
+                return
+            update.state = state
+            if error is not None:
+                update.error = error
+            if update.done:
+                update.finished = time.time()
+        update._changed.set()
+        if self.listener is not None:
+            self.listener(update)
+
+    def _run_update(self, update: DeviceUpdate, wave: list):
+        # the threshold is checked before each start, so a failing wave
+        # does not start its remaining devices
+        if not (self.halted or self._stopped) and self._failure_rate(wave) > self.failure_threshold:
+            self.halted = True
+            self.halted_wave = update.wave
+        if self.halted or self._stopped:
+            self._set(update, SKIPPED)
+            return
+        try:
+            self._update(update)
+        except Exception as err:
+            self._set(update, FAILED, str(err) or type(err).__name__)
+
+    def _update(self, update: DeviceUpdate):
+        ready = Event()
+        opened = []
+
+        def on_open(socket):
+            opened.append(socket)
+            ready.set()
+
+        def on_disconnect(event):
+            # devices close the connection cleanly when they restart
+            ready.set()
+            self._on_disconnect(update, event)
+
+        socket = self.socket_factory(update.device)
+        socket.add_listener('open', on_open)
+        socket.add_listener(SW_UPDATE, lambda event: self._on_event(update, event))
+        socket.add_listener('error', on_disconnect)
+        socket.add_listener('close', on_disconnect)
+        socket.start_notification()
+        try:
+            # events of an update started before the connection is open would be lost
+            if not ready.wait(self.connect_timeout) or not opened:
+                raise ConnectionError('Could not open the WebSocket of %s' % update.device.host)
+            update.version = self._installed_version(update)
+            client = self.client_factory(update.device)
+            if self.check:
+                client.sw_update_check()
+            update.started = time.time()
+            self._set(update, RUNNING)
+            # swUpdateStart is never retried by the request policy (see
+            # RequestPolicy.non_idempotent_nodes)
+            client.sw_update_start()
+            self._wait(update, client)
+        finally:
+            socket.stop_notification()
+
+    def _wait(self, update: DeviceUpdate, client):
+        deadline = update.started + self.timeout
+        while not update.done:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self._set(update, FAILED, 'Update timed out')
+                return
+            if not update.disconnected:
+                update._changed.wait(remaining)
+                update._changed.clear()
+                continue
+
+            # the device restarts: ask for its state until it answers
+            time.sleep(min(self.reboot_interval, remaining))
+            try:
+                self._on_status(update, client.sw_update_query())
+            except (ConnectionError, InterruptedError):
+                pass
+
+    def _on_event(self, update: DeviceUpdate, event):
+        update.events += 1
+        self._on_status(update, model.SoftwareUpdateStatus(event))
+
+    def _on_disconnect(self, update: DeviceUpdate, error):
+        if update.state == RUNNING:
+            update.disconnected = True
+            update._changed.set()
+
+    def _on_status(self, update: DeviceUpdate, status: model.SoftwareUpdateStatus):
+        if update.state != RUNNING:
+            return
+        previous, update.status = update.status, status
+        state = (status.state or '').upper()
+        if state in self.success_states:
+            self._set(update, SUCCEEDED)
+        elif state in self.failure_states or 'FAIL' in state or 'ERROR' in state:
+            self._set(update, FAILED, 'Update state %s' % status.state)
+        elif state == IDLE and (update.disconnected or (
+                previous is not None and (previous.state or '').upper() != IDLE)):
+            # back to idle after a reported update or a restart
+            self._on_idle(update)
+        elif self.listener is not None:
+            self.listener(update)
+
+    def _on_idle(self, update: DeviceUpdate):
+        try:
+            version = self._installed_version(update)
+        except (ValueError, InterruptedError):
+            # not reachable yet: query the state again while the device restarts
+            update.disconnected = True
+            update._changed.set()
+            return
+        if version != update.version:
+            self._set(update, SUCCEEDED)
+        else:
+            self._set(update, FAILED, 'Update returned to IDLE without a new version (%s)' % version)
+
+    def _installed_version(self, update: DeviceUpdate) -> str:
+        return installed_version(load_info(update.device.host))
+
+    def __repr__(self) -> str:
+        return '<UpdateRollout devices=%d, waves=%d, halted=%s>' % (
+            len(self.updates), len(self.waves), self.halted
+        )
@@ -0,0 +1,459 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Loads and caches the UPnP descriptions of SoundTouch devices.
+
+Each device describes itself at `BoseDevice.get_upnp_url()` (port 8091).
+The description lists the device's services; the actions of a service are
+described by a separate SCPD document. Both documents only change with the
+software version, so the DescriptionCache stores them by device id and
+version, and SCPD documents are shared by all devices with the same version:
+
+    cache = DescriptionCache('~/.cache/boseapi/upnp')
+    descriptions = cache.load_all(devices, max_workers=16)
+    service = descriptions[device.device_id].service('AVTransport')
+    print(service.control_url, list(service.actions))
+"""
+import hashlib
+import json
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from urllib.parse import urljoin
+
+from urllib3.util import Retry, Timeout
+
+from boseapi.common import xmlparser
+from boseapi.common.device import BoseDevice
+from boseapi.common.pool import shared_manager
+from boseapi.compliance import installed_version
+
+__all__ = ['UPnPAction', 'UPnPService', 'UPnPDescription', 'DescriptionCache', 'parse_description',
+           'parse_scpd']
+
+_CACHE_VERSION = 1
+
+
+def _strip_namespaces(root):
+    # UPnP documents use a default namespace, find() works on local names afterwards
+    for element in root.iter():
+        if isinstance(element.tag, str):
+            element.tag = element.tag.rpartition('}')[2]
+    return root
+
+
+def _text(element, path: str) -> str:
+    value = element.findtext(path) if element is not None else None
+    return value.strip() if value else None
+
+
+class UPnPAction:
+    """An action of a UPnP service.
+
+    Attributes:
+        name: str
+            The action name, e.g. 'Play'.
+        arguments: list[tuple[str, str, str]]
+            The name, direction ('in' or 'out') and related state variable
+            of each argument.
+    """
+
+    def __init__(self, name: str, arguments: list = None) -> None:
+        self.name = name
+        self.arguments = arguments if arguments else []
+
+    @property
+    def inputs(self) -> list:
+        """The names of the 'in' arguments."""
+        return [name for name, direction, _ in self.arguments if direction == 'in']
+
+    @property
+    def outputs(self) -> list:
+        """The names of the 'out' arguments."""
+        return [name for name, direction, _ in self.arguments if direction == 'out']
+
+    def __repr__(self) -> str:
+        return '<UPnPAction %s(%s)>' % (self.name, ', '.join(self.inputs))
+
+
+class UPnPService:
+    """A service listed in a device description.
+
+    Attributes:
+        service_type: str
+            e.g. 'urn:schemas-upnp-org:service:AVTransport:1'.
+        service_id: str
+            e.g. 'urn:upnp-org:serviceId:AVTransport'.
+        scpd_url: str
+            The absolute URL of the service description.
+        control_url: str
+            The absolute URL SOAP requests are sent to.
+        event_url: str
+            The absolute URL of event subscriptions.
+        actions: dict[str, UPnPAction]
+            The actions of the service (empty if the SCPD was not loaded).
+    """
+
+    def __init__(self, service_type: str = None, service_id: str = None,
+                 scpd_url: str = None, control_url: str = None, event_url: str = None,
+                 actions: dict = None) -> None:
+        self.service_type = service_type
+        self.service_id = service_id
+        self.scpd_url = scpd_url
+        self.control_url = control_url
+        self.event_url = event_url
+        self.actions = actions if actions else {}
+
+    @property
+    def name(self) -> str:
+        """The short name of the service type, e.g. 'AVTransport'."""
+        parts = (self.service_type or '').split(':')
+        return parts[-2] if len(parts) >= 2 else self.service_type
+
+    def __repr__(self) -> str:
+        return '<UPnPService %s, actions=%d>' % (self.name, len(self.actions))
+
+
+class UPnPDescription:
+    """The description of a device and all of its (embedded) services.
+
+    Attributes:
+        device_id: str
+            The device id of the described device.
+        version: str
+            The software version the description was loaded with.
+        url: str
+            The URL of the description.
+        device_type: str
+            The UPnP device type.
+        friendly_name: str
+            The name of the device.
+        manufacturer: str
+        model_name: str
+        model_number: str
+        serial_number: str
+        udn: str
+            The unique device name ('uuid:...').
+        services: list[UPnPService]
+            The services of the device and its embedded devices.
+    """
+
+    _attributes = (
+        'device_id', 'version', 'url', 'device_type', 'friendly_name', 'manufacturer',
+        'model_name', 'model_number', 'serial_number', 'udn'
+    )
+
+    def __init__(self, device_id: str = None, version: str = None, url: str = None,
+                 services: list = None, **properties) -> None:
+        self.device_id = device_id
+        self.version = version
+        self.url = url
+        for name in self._attributes[3:]:
+            setattr(self, name, properties.get(name))
+        self.services = services if services else []
+
+    def service(self, name: str) -> UPnPService:
+        """Returns the service with the given short name, type or id, or None."""
+        for service in self.services:
+            if name in (service.name, service.service_type, service.service_id):
+                return service
+        return None
+
+    def actions(self) -> dict:
+        """Returns the action names of all services, by short service name."""
+        return {service.name: list(service.actions) for service in self.services}
+
+    def to_dict(self) -> dict:
+        """Returns the description as a JSON compatible dict."""
+        values = {name: getattr(self, name) for name in self._attributes}
+        values['services'] = [
+            dict(vars(service), actions=[
+                [action.name, [list(argument) for argument in action.arguments]]
+                for action in service.actions.values()
+            ])
+            for service in self.services
+        ]
+        return values
+
+    @staticmethod
+    def from_dict(values: dict) -> 'UPnPDescription':
+        """Creates a description from the result of to_dict()."""
+        values = dict(values)
+        services = []
+        for service in values.pop('services', ()):
+            service = dict(service)
+            actions = service.pop('actions', ())
+            services.append(UPnPService(actions={
+                name: UPnPAction(name, [tuple(argument) for argument in arguments])
+                for name, arguments in actions
+            }, **service))
+        return UPnPDescription(services=services, **values)
+
+    def __repr__(self) -> str:
+        return '<UPnPDescription device_id="%s", version="%s", services=%d>' % (
+            self.device_id, self.version, len(self.services)
+        )
+
+
+def parse_description(data: bytes, url: str) -> UPnPDescription:
+    """Parses a device description document.
+
+    :param data: the document
+    :type data: bytes
+    :param url: the URL of the document, used to resolve relative URLs
+    :type url: str
+    :raises ValueError: if the document contains no device
+    :return: the description without actions (see parse_scpd())
+    :rtype: UPnPDescription
+    """
+    root = _strip_namespaces(xmlparser.fromstring(data))
+    device = root.find('device')
+    if device is None:
+        raise ValueError('No device in UPnP description "%s"' % url)
+    base = _text(root, 'URLBase') or url
+
+    services = []
+    pending = [device]
+    while pending:
+        element = pending.pop(0)
+        for service in element.iterfind('serviceList/service'):
+            services.append(UPnPService(
+                _text(service, 'serviceType'), _text(service, 'serviceId'),
+                *(urljoin(base, _text(service, tag) or '')
+                  for tag in ('SCPDURL', 'controlURL', 'eventSubURL'))
+            ))
+        pending.extend(element.iterfind('deviceList/device'))
+
+    return UPnPDescription(
+        url=url, services=services,
+        device_type=_text(device, 'deviceType'),
+        friendly_name=_text(device, 'friendlyName'),
+        manufacturer=_text(device, 'manufacturer'),
+        model_name=_text(device, 'modelName'),
+        model_number=_text(device, 'modelNumber'),
+        serial_number=_text(device, 'serialNumber'),
+        udn=_text(device, 'UDN'),
+    )
+
+
+def parse_scpd(data: bytes) -> dict:
+    """Parses the actions of a service description (SCPD) document.
+
+    :return: the action names mapped to their UPnPAction
+    :rtype: dict[str, UPnPAction]
+    """
+    root = _strip_namespaces(xmlparser.fromstring(data))
+    actions = {}
+    for action in root.iterfind('actionList/action'):
+        name = _text(action, 'name')
+        if name:
+            actions[name] = UPnPAction(name, [
+                (_text(argument, 'name'), _text(argument, 'direction'),
+                 _text(argument, 'relatedStateVariable'))
+                for argument in action.iterfind('argumentList/argument')
+            ])
+    return actions
+
+
+class DescriptionCache:
+    """Fetches UPnP descriptions and caches them by device id and software version.
+
+    A description is fetched again when the device reports another software
+    version. SCPD documents are cached by their path and version, so a
+    fleet with one version downloads each SCPD once. If a directory is
+    given, the descriptions are stored there as JSON files and survive
+    restarts.
+
+    Statistics (see `stats`):
+        hits: int
+            Descriptions returned from the cache.
+        fetched: int
+            Description documents downloaded.
+        scpd_fetched: int
+            SCPD documents downloaded.
+        scpd_hits: int
+            SCPD documents reused from another device.
+
+    :param directory: the directory of the stored descriptions, defaults to None
+    :type directory: str, optional
+    :param manager: the urllib3 PoolManager, defaults to the shared manager
+    :param with_actions: whether the SCPD documents are loaded, defaults to True
+    :type with_actions: bool, optional
+    """
+
+    def __init__(self, directory: str = None, manager=None, timeout: Timeout = None,
+                 retries: int = 2, with_actions: bool = True) -> None:
+        self.directory = os.path.abspath(os.path.expanduser(directory)) if directory else None
+        self.manager = manager if manager is not None else shared_manager()
+        self.timeout = timeout if timeout is not None else Timeout(connect=2.0, read=6.0)
+        self.retries = Retry(total=retries, backoff_factor=0.25,
+                             status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+        self.with_actions = with_actions
+        self.stats = {'hits': 0, 'fetched': 0, 'scpd_fetched': 0, 'scpd_hits': 0}
+        self.errors = {}
+        self._descriptions = {}
+        self._versions = {}
+        self._scpd = {}
+        self._scpd_locks = {}
+        self._lock = Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _fetch(self, url: str) -> bytes:
+        try:
+            response = self.manager.request('GET', url, timeout=self.timeout, retries=self.retries)
+        except Exception as err:
+            raise ConnectionError('Could not fetch "%s": %s' % (url, err)) from err
+        if response.status != 200:
+            raise ConnectionError('Could not fetch "%s": HTTP %d' % (url, response.status))
+        return response.data
+
+    def path_of(self, device_id: str, version: str) -> str:
+        """Returns the file of a stored description (None without a directory)."""
+        if self.directory is None:
+            return None
+        key = hashlib.sha1(('%s\n%s' % (device_id, version)).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, 'upnp-%s.json' % key)
+
+    def cached(self, device_id: str, version: str) -> UPnPDescription:
+        """Returns the cached (or stored) description, or None."""
+        key = (device_id, version)
+        description = self._descriptions.get(key)
+        if description is None and self.directory is not None:
+            try:
+                with open(self.path_of(device_id, version), 'r', encoding='utf-8') as fp:
+                    stored = json.load(fp)
+                if stored.get('cache_version') == _CACHE_VERSION:
+                    description = UPnPDescription.from_dict(stored['description'])
+                    with self._lock:
+                        self._versions.setdefault(device_id, version)
+                        self._descriptions[key] = description
+            except (OSError, ValueError, KeyError, TypeError):
+                description = None
+        return description
+
+    def get(self, device: BoseDevice, refresh: bool = False) -> UPnPDescription:
+        """Returns the description of a device, fetching it if necessary.
+
+        :param device: a device with id and components (see load_info())
+        :type device: BoseDevice
+        :param refresh: whether the cache is bypassed, defaults to False
+        :type refresh: bool, optional
+        :raises ConnectionError: if a document can not be fetched
+        :raises ValueError: if the description is invalid
+        :return: the description
+        :rtype: UPnPDescription
+        """
+        version = installed_version(device)
+        if not refresh:
+            description = self.cached(device.device_id, version)
+            if description is not None:
+                self._count('hits')
+                return description
+
+        url = device.get_upnp_url()
+        description = parse_description(self._fetch(url), url)
+        self._count('fetched')
+        description.device_id = device.device_id
+        description.version = version
+        if self.with_actions:
+            for service in description.services:
+                service.actions = self._actions(service, version)
+
+        with self._lock:
+            # drop the description of the previous version
+            previous = self._versions.get(device.device_id, version)
+            self._versions[device.device_id] = version
+            self._descriptions.pop((device.device_id, previous), None)
+            self._descriptions[device.device_id, version] = description
+        if self.directory is not None:
+            if previous != version:
+                try:
+                    os.remove(self.path_of(device.device_id, previous))
+                except OSError:
+                    pass
+            self._store(description)
+        return description
+
+    def _actions(self, service: UPnPService, version: str) -> dict:
+        if not service.scpd_url:
+            return {}
+        # the host differs between devices, the path and version do not
+        key = (service.scpd_url.split('/', 3)[-1], version)
+        # devices loaded concurrently wait for the first download
+        with self._scpd_locks.setdefault(key, Lock()):
+            actions = self._scpd.get(key)
+            if actions is not None:
+                self._count('scpd_hits')
+                return actions
+            actions = parse_scpd(self._fetch(service.scpd_url))
+            self._count('scpd_fetched')
+            self._scpd[key] = actions
+        return actions
+
+    def _store(self, description: UPnPDescription):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_of(description.device_id, description.version)
+        data = json.dumps({'cache_version': _CACHE_VERSION, 'description': description.to_dict()})
+        temp = '%s.%d.tmp' % (path, os.getpid())
+        with open(temp, 'w', encoding='utf-8') as fp:
+            fp.write(data)
+        os.replace(temp, path)
+
+    def load_all(self, devices: list, max_workers: int = 16, refresh: bool = False) -> dict:
+        """Returns the descriptions of all devices, fetching missing ones concurrently.
+
+        Failed devices are left out and stored in `errors` (device id mapped
+        to the exception).
+
+        :return: the device ids mapped to their description
+        :rtype: dict[str, UPnPDescription]
+        """
+        devices = list(devices)
+        self.errors = {}
+        if not devices:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max(1, max_workers), len(devices))) as executor:
+            futures = [(device, executor.submit(self.get, device, refresh)) for device in devices]
+        descriptions = {}
+        for device, future in futures:
+            try:
+                descriptions[device.device_id] = future.result()
+            except (ConnectionError, ValueError) + xmlparser.PARSE_ERRORS as err:
+                self.errors[device.device_id] = err
+        return descriptions
+
+    def clear(self):
+        """Removes all descriptions from memory (stored files are kept)."""
+        self._descriptions.clear()
+        self._versions.clear()
+        self._scpd.clear()
+        self._scpd_locks.clear()
+
+    def __len__(self) -> int:
+        return len(self._descriptions)
+
+    def __repr__(self) -> str:
+        return '<DescriptionCache descriptions=%d, scpd=%d>' % (len(self._descriptions), len(self._scpd))
@@ -4,3 +4,4 @@ can be accessed using an `BoseWebSocket` object.
 '''
 
 from boseapi.ws.bosews import BoseWebSocket
+from boseapi.ws.aiows import AsyncBoseWebSocket
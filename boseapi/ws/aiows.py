@@ -0,0 +1,373 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+An asyncio-native client for the WebSocket notifications of a device.
+
+The AsyncBoseWebSocket implements the client side of RFC 6455 on top of
+asyncio streams (no extra dependency), connects to `ws://<host>:8080/` with
+the `gabbo` subprotocol and hands out the update elements through an async
+iterator and async (or plain) listeners:
+
+    async with AsyncBoseWebSocket(device) as socket:
+        async for update in socket:
+            print(update.tag)           # e.g. 'volumeUpdated'
+
+Listen to many devices in one event loop by running one task per socket.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+
+from boseapi.common import xmlparser
+from boseapi.common.device import BoseDevice
+
+__all__ = ['AsyncBoseWebSocket', 'WebSocketError', 'SUBPROTOCOL', 'DEFAULT_PORT']
+
+SUBPROTOCOL = 'gabbo'
+"""The subprotocol requested by the client."""
+
+DEFAULT_PORT = 8080
+"""The port of the notification server on the device."""
+
+_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_CLOSED = object()
+"""Queued when the connection is closed, ends all iterators."""
+
+# asyncio.Task.current_task() was replaced in Python 3.7
+_current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+
+
+class WebSocketError(ConnectionError):
+    """Raised when the handshake fails or the server violates the protocol."""
+
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    # XOR the payload with the repeated 4-byte key in a single big integer operation
+    if not payload:
+        return payload
+    length = len(payload)
+    keys = (key * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(keys, 'big')).to_bytes(length, 'big')
+
+
+def _frame(opcode: int, payload: bytes = b'') -> bytes:
+    # a single masked frame (clients must mask all frames)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, 0x80 | length)
+    elif length < 0x10000:
+        header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+    key = os.urandom(4)
+    return header + key + _mask(payload, key)
+
+
+class AsyncBoseWebSocket:
+    """A WebSocket connection to a device's notification server on asyncio.
+
+    Each received `updates` message is split into its update elements (for
+    instance `volumeUpdated`), which are passed to the listeners of their tag
+    and queued for the async iterator. If nobody consumes the iterator, the
+    oldest updates are dropped once `queue_size` updates are queued.
+
+    Attributes:
+        device: BoseDevice
+            The device to connect to.
+        port: int
+            The port of the notification server.
+        cached_listeners: dict[str, list]
+            The registered listeners per category (update tag or 'error').
+        dropped: int
+            The number of updates dropped because the queue was full.
+
+    :param device: the device to connect to
+    :type device: BoseDevice
+    :param port: the server port, defaults to 8080
+    :type port: int, optional
+    :param queue_size: the number of updates kept for the iterator
+    :type queue_size: int, optional
+    :param ping_interval: seconds between keep-alive pings, None to disable
+    :type ping_interval: float, optional
+    :param connect_timeout: the timeout of the TCP connect and the handshake
+    :type connect_timeout: float, optional
+    :param max_size: the maximum size of a message in bytes
+    :type max_size: int, optional
+    """
+
+    def __init__(self, device: BoseDevice, port: int = DEFAULT_PORT, queue_size: int = 256,
+                 ping_interval: float = 30.0, connect_timeout: float = 5.0,
+                 max_size: int = 1 << 20) -> None:
+        self.device = device
+        self.port = port
+        self.ping_interval = ping_interval
+        self.connect_timeout = connect_timeout
+        self.max_size = max_size
+        self.queue_size = max(1, queue_size)
+        self.cached_listeners = {}
+        self.dropped = 0
+        self._queue = None
+        self._reader = None
+        self._writer = None
+        self._tasks = []
+        self._closing = False
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connection is open."""
+        return self._writer is not None and not self._closing
+
+    async def connect(self):
+        """Opens the connection and starts receiving updates.
+
+        :raises WebSocketError: if the handshake fails
+        :raises OSError: if the device can not be reached
+        """
+        if self._writer is not None:
+            return
+        host = self.device.host
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, self.port), self.connect_timeout
+        )
+        try:
+            await asyncio.wait_for(self._handshake(reader, writer), self.connect_timeout)
+        except BaseException:
+            writer.close()
+            raise
+
+        self._reader, self._writer = reader, writer
+        self._closing = False
+        # created here, queues are bound to the running loop in Python < 3.10
+        self._queue = asyncio.Queue(self.queue_size)
+        loop = asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._receive())]
+        if self.ping_interval:
+            self._tasks.append(loop.create_task(self._keep_alive()))
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        key = base64.b64encode(os.urandom(16))
+        writer.write(b'\r\n'.join([
+            b'GET / HTTP/1.1',
+            b'Host: %s:%d' % (self.device.host.encode('ascii'), self.port),
+            b'Upgrade: websocket',
+            b'Connection: Upgrade',
+            b'Sec-WebSocket-Key: ' + key,
+            b'Sec-WebSocket-Version: 13',
+            b'Sec-WebSocket-Protocol: ' + SUBPROTOCOL.encode('ascii'),
+            b'', b''
+        ]))
+        await writer.drain()
+
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = lines[0].split(' ', 2)
+        if len(status) < 2 or status[1] != '101':
+            raise WebSocketError('Handshake rejected: "%s"' % lines[0])
+
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(key + _GUID).digest()).decode('ascii')
+        if headers.get('sec-websocket-accept') != accept:
+            raise WebSocketError('Invalid Sec-WebSocket-Accept header')
+        if headers.get('sec-websocket-protocol', '').lower() != SUBPROTOCOL:
+            raise WebSocketError('Server did not accept the %s subprotocol' % SUBPROTOCOL)
+
+    async def _read_frame(self) -> tuple:
+        reader = self._reader
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack('!H', await reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack('!Q', await reader.readexactly(8))
+        if length > self.max_size:
+            raise WebSocketError('Frame of %d bytes exceeds max_size' % length)
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key is not None:
+            payload = _mask(payload, key)
+        return bool(first & 0x80), first & 0x0F, payload
+
+    async def _receive(self):
+        fragments = []
+        try:
+            while True:
+                fin, opcode, payload = await self._read_frame()
+                if opcode == OP_PING:
+                    await self._send(OP_PONG, payload)
+                elif opcode == OP_CLOSE:
+                    if not self._closing:
+                        self._closing = True
+                        await self._send(OP_CLOSE, payload[:2])
+                    break
+                elif opcode in (OP_TEXT, OP_BINARY, OP_CONTINUATION):
+                    fragments.append(payload)
+                    if sum(len(x) for x in fragments) > self.max_size:
+                        raise WebSocketError('Message exceeds max_size')
+                    if fin:
+                        message = b''.join(fragments)
+                        fragments = []
+                        await self._on_packet(message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as err:
+            if not self._closing:
+                await self._notify('error', err)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            await self._notify('error', err)
+        finally:
+            self._finish()
+
+    async def _keep_alive(self):
+        while not self._closing:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self._send(OP_PING)
+            except (ConnectionError, OSError):
+                return
+
+    async def _send(self, opcode: int, payload: bytes = b''):
+        writer = self._writer
+        if writer is not None:
+            writer.write(_frame(opcode, payload))
+            await writer.drain()
+
+    async def _on_packet(self, message: bytes):
+        try:
+            root = xmlparser.fromstring(message)
+        except xmlparser.PARSE_ERRORS as err:
+            await self._notify('error', err)
+            return
+        if root.tag != 'updates':
+            return
+        for update in root:
+            await self._notify(update.tag, update)
+            self._enqueue(update)
+
+    def _enqueue(self, item):
+        queue = self._queue
+        if queue.full():
+            queue.get_nowait()
+            if item is not _CLOSED:
+                self.dropped += 1
+        queue.put_nowait(item)
+
+    def _finish(self):
+        writer = self._writer
+        if writer is not None:
+            self._writer = self._reader = None
+            self._closing = True
+            writer.close()
+            current = _current_task()
+            for task in self._tasks:
+                if task is not current:
+                    task.cancel()
+            self._tasks = []
+            self._enqueue(_CLOSED)
+
+    async def close(self, timeout: float = 2.0):
+        """Sends a close frame and waits (at most `timeout` seconds) for the server's reply."""
+        if self._writer is None:
+            return
+        tasks = list(self._tasks)
+        if not self._closing:
+            self._closing = True
+            try:
+                await self._send(OP_CLOSE, struct.pack('!H', 1000))
+            except (ConnectionError, OSError):
+                pass
+        if tasks:
+            done, _ = await asyncio.wait(tasks[:1], timeout=timeout)
+            if not done:
+                self._finish()
+
+    async def __aenter__(self) -> 'AsyncBoseWebSocket':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, etype, value, traceback) -> None:
+        await self.close()
+
+    def __aiter__(self) -> 'AsyncBoseWebSocket':
+        return self
+
+    async def __anext__(self):
+        if self._queue is None or (self._writer is None and self._queue.empty()):
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        return item
+
+    def add_listener(self, category: str, listener) -> bool:
+        """Adds a listener to the given category (see BoseWebSocket.add_listener()).
+
+        The listener is called with the update element, or with the exception
+        for the 'error' category. Coroutine functions are awaited before the
+        next update is processed.
+
+        :return: True if the listener was added successfully, false otherwise.
+        :rtype: bool
+        """
+        if not category or not listener:
+            return False
+        self.cached_listeners.setdefault(str(category), []).append(listener)
+        return True
+
+    def remove_listener(self, category: str, listener) -> bool:
+        """Removes a listener from the given category.
+
+        :return: True if the listener was removed successfully, false otherwise.
+        :rtype: bool
+        """
+        listeners = self.cached_listeners.get(str(category))
+        if not listeners or listener not in listeners:
+            return False
+        listeners.remove(listener)
+        return True
+
+    async def _notify(self, category: str, event):
+        for listener in list(self.cached_listeners.get(category, ())):
+            try:
+                result = listener(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                if category != 'error':
+                    await self._notify('error', err)
+
+    def __repr__(self) -> str:
+        return '<AsyncBoseWebSocket host="%s", connected=%s>' % (self.device.host, self.connected)
@@ -1,8 +1,8 @@
 from threading import Thread
-from xml.etree import ElementTree as xmltree
 
 import websocket
 
+from boseapi.common import xmlparser
 from boseapi.common.device import BoseDevice
 
 VOLUME_UPDATE = 'volumeUpdated'
@@ -63,8 +63,10 @@ class BoseWebSocket:
         if not self.ws_client:
             self.ws_client = websocket.WebSocketApp(
                     'ws://%s:8080/' % self.device.host,
+                    on_open=self._on_open,
                     on_message=self._on_packet,
                     on_error=self._on_error,
+                    on_close=self._on_close,
                     subprotocols=['gabbo']
             )
             self.thread = WebSocketThread(self.ws_client)
@@ -94,6 +96,10 @@ class BoseWebSocket:
         to add a listener to a specific notification category. The listener must take
         only one argument: xml.etree.ElementTree.Element.
 
+        The connection itself is reported in the categories 'open' (called with
+        this object), 'close' (called with the close status code or None) and
+        'error' (called with the exception).
+
         :param category: The category this listener should be added to.
         :type category: str
         :param listener: A simple listener method which takes the XML-Element as a passed
@@ -105,7 +111,7 @@ class BoseWebSocket:
         if not category or not listener:
             return False
 
-        category = repr(category)
+        category = str(category)
         if category in self.cached_listeners:
             self.cached_listeners[category].append(listener)
         else:
@@ -124,7 +130,7 @@ class BoseWebSocket:
         :rtype: bool
         """
         if not category or not listener: return False
-        category = repr(category)
+        category = str(category)
         if category not in self.cached_listeners: return False
 
         listeners: list = self.cached_listeners[category]
@@ -144,10 +150,8 @@ class BoseWebSocket:
         :param event: The event represents an XML-Element with event.tag == category.
         :type event: object
         """
-        category = repr(category)
-        if category in self.cached_listeners:
-            for listener in self.get_listener_group(category):
-                listener(event)
+        for listener in self.get_listener_group(category):
+            listener(event)
 
     def get_listener_group(self, category: str) -> list: # list[function]
         """Searches for a specific category in the registered ones.
@@ -164,16 +168,23 @@ class BoseWebSocket:
         """
         if not category:
             return []
-        category = repr(category)
+        category = str(category)
         if category not in self.cached_listeners:
             return []
         return self.cached_listeners[category]
 
     def _on_packet(self, ws_client, message: bytes):
-        root = xmltree.fromstring(message)
+        root = xmlparser.fromstring(message)
         if root.tag == 'updates':
-            for update in root[0]:
+            for update in root:
                 self.notify_listeners(update.tag, update)
 
     def _on_error(self, ws_client, error):
         self.notify_listeners('error', error)
+
+    def _on_open(self, ws_client):
+        self.notify_listeners('open', self)
+
+    def _on_close(self, ws_client, *args):
+        # websocket-client >= 1.0 passes the close status code and message
+        self.notify_listeners('close', args[0] if args else None)
@@ -0,0 +1,74 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Helpers to build the XML bodies of POST requests.
+
+All text and attribute values are escaped, so names like `Tom & Jerry` or
+locations containing quotes produce well-formed requests. Bodies with many
+elements (e.g. zones) collect their parts in a list that is joined once.
+
+Example:
+>>> element('member', 'C2D3', (('ipaddress', '10.0.0.3'),))
+'<member ipaddress="10.0.0.3">C2D3</member>'
+>>> element('name', 'Tom & Jerry')
+'<name>Tom &amp; Jerry</name>'
+"""
+
+__all__ = ['element', 'attributes', 'escape_text', 'escape_attr']
+
+
+def escape_text(value) -> str:
+    """Escapes a value used as element text."""
+    value = str(value)
+    # most values contain none of the characters, `in` is faster than replace()
+    if '&' in value or '<' in value or '>' in value:
+        value = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return value
+
+
+def escape_attr(value) -> str:
+    """Escapes a value used inside a double-quoted attribute."""
+    value = str(value)
+    if '&' in value or '<' in value or '>' in value or '"' in value or '\n' in value:
+        value = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;') \
+                     .replace('"', '&quot;').replace('\n', '&#10;')
+    return value
+
+
+def attributes(pairs) -> str:
+    """Formats (name, value) pairs as attributes, e.g. ' name="value"'.
+
+    Pairs with a value of None or an empty string are left out.
+    """
+    result = ''
+    for name, value in pairs:
+        if value is not None and value != '':
+            result += ' %s="%s"' % (name, escape_attr(value))
+    return result
+
+
+def element(tag: str, text=None, attrs=()) -> str:
+    """Formats a complete element with optional text and attributes (see attributes())."""
+    return '<%s%s>%s</%s>' % (
+        tag, attributes(attrs) if attrs else '',
+        '' if text is None else escape_text(text), tag
+    )
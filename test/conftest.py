@@ -0,0 +1,310 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+__doc__ = """
+Shared fixtures of the test suite. The fake device is a small HTTP server
+that answers like a SoundTouch 30. Each server is bound to its own loopback
+address (127.0.x.y), because the client always talks to port 8090.
+"""
+import itertools
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+DEVICE_ID = 'A0B1C2D3E4F5'
+
+NODES = (
+    'info', 'volume', 'nowPlaying', 'key', 'presets', 'sources', 'netStats',
+    'networkInfo', 'getZone', 'capabilities', 'bass', 'name', 'swUpdateQuery',
+    'swUpdateStart', 'swUpdateCheck', 'swUpdateAbort', 'select', 'setZone'
+)
+
+DEVICE_PAGES = {
+    '/info': (
+        b'<?xml version="1.0" encoding="UTF-8" ?><info deviceID="A0B1C2D3E4F5">'
+        b'<name>Kitchen</name><type>SoundTouch 30</type>'
+        b'<margeAccountUUID>1</margeAccountUUID><components><component>'
+        b'<componentCategory>SCM</componentCategory>'
+        b'<softwareVersion>27.0.6.46330.5043500 epdbuild.trunk.hepdswbld04.2022-08-04T11:20:29</softwareVersion>'
+        b'<serialNumber>F1</serialNumber></component><component>'
+        b'<componentCategory>PackagedProduct</componentCategory>'
+        b'<softwareVersion>27.0.6.46330.5043500</softwareVersion>'
+        b'<serialNumber>069</serialNumber></component></components>'
+        b'<margeURL>https://streaming.bose.com</margeURL><networkInfo type="SCM">'
+        b'<macAddress>A0B1C2D3E4F5</macAddress><ipAddress>127.0.0.1</ipAddress>'
+        b'</networkInfo><moduleType>sm2</moduleType><variant>spotty</variant>'
+        b'<variantMode>normal</variantMode><countryCode>GB</countryCode>'
+        b'<regionCode>GB</regionCode></info>'
+    ),
+    '/supportedURLs': (
+        b'<supportedURLs deviceID="A0B1C2D3E4F5">'
+        + b''.join(b'<URL location="/%s" />' % name.encode() for name in NODES)
+        + b'</supportedURLs>'
+    ),
+    '/volume': (
+        b'<volume deviceID="A0B1C2D3E4F5"><targetvolume>32</targetvolume>'
+        b'<actualvolume>32</actualvolume><muteenabled>false</muteenabled></volume>'
+    ),
+    '/nowPlaying': (
+        b'<nowPlaying deviceID="A0B1C2D3E4F5" source="INTERNET_RADIO" sourceAccount="">'
+        b'<ContentItem source="INTERNET_RADIO" location="4712" sourceAccount="" isPresetable="true">'
+        b'<itemName>Radio X</itemName><containerArt>http://x/y.png</containerArt></ContentItem>'
+        b'<track>Song</track><artist>Artist</artist><album>Album</album>'
+        b'<stationName>Radio X</stationName><art artImageStatus="IMAGE_PRESENT">http://x/art.png</art>'
+        b'<time total="240">31</time><playStatus>PLAY_STATE</playStatus>'
+        b'<shuffleSetting>SHUFFLE_OFF</shuffleSetting><repeatSetting>REPEAT_OFF</repeatSetting>'
+        b'<streamType>RADIO_STREAMING</streamType><trackID>t1</trackID>'
+        b'<description>desc</description><stationLocation>London</stationLocation></nowPlaying>'
+    ),
+    '/getZone': (
+        b'<zone master="A0B1C2D3E4F5" senderIPAddress="127.0.0.1">'
+        b'<member ipaddress="127.0.0.2">B0</member><member ipaddress="127.0.0.3">C0</member></zone>'
+    ),
+    '/capabilities': (
+        b'<capabilities deviceID="A0B1C2D3E4F5"><networkConfig><dualMode>true</dualMode>'
+        b'<wsapiproxy>true</wsapiproxy><allInterfacesSupported /><wlanInterfaces />'
+        b'<security /></networkConfig><lightswitch>false</lightswitch>'
+        b'<clockDisplay>false</clockDisplay>'
+        b'<capability name="systemtimeout" url="/systemtimeout" />'
+        b'<capability name="rebroadcastlatencymode" url="/rebroadcastlatencymode" />'
+        b'<lrStereoCapable>true</lrStereoCapable><bcoresetCapable>false</bcoresetCapable>'
+        b'<disablePowerSaving>true</disablePowerSaving></capabilities>'
+    ),
+    '/netStats': (
+        b'<network-data><devices><device deviceID="A0B1C2D3E4F5">'
+        b'<deviceSerialNumber>F1</deviceSerialNumber><interfaces>'
+        b'<interface><name>eth0</name><mac>A0B1C2D3E4F6</mac><running>false</running>'
+        b'<kind>Ethernet</kind></interface>'
+        b'<interface><name>wlan0</name><mac>A0B1C2D3E4F5</mac>'
+        b'<bindings><ipv4address>127.0.0.1</ipv4address></bindings><running>true</running>'
+        b'<kind>Wireless</kind><ssid>net</ssid><rssi>-62</rssi>'
+        b'<frequencyKHz>2437000</frequencyKHz></interface>'
+        b'</interfaces></device></devices></network-data>'
+    ),
+    '/networkInfo': (
+        b'<networkInfo wifiProfileCount="1"><interfaces><interface type="WIFI_INTERFACE" '
+        b'name="wlan0" macAddress="A0B1C2D3E4F5" ipAddress="127.0.0.1" ssid="net" '
+        b'frequencyKHz="2437000" state="NETWORK_WIFI_CONNECTED" signal="GOOD_SIGNAL" '
+        b'mode="STATION" /></interfaces></networkInfo>'
+    ),
+    '/presets': (
+        b'<presets>' + b''.join(
+            b'<preset id="%d" createdOn="1" updatedOn="2"><ContentItem source="INTERNET_RADIO" '
+            b'type="stationurl" location="/v1/s/%d" sourceAccount="" isPresetable="true">'
+            b'<itemName>P%d</itemName><containerArt>http://x/%d.png</containerArt>'
+            b'</ContentItem></preset>' % (i, i, i, i) for i in range(1, 7)
+        ) + b'</presets>'
+    ),
+    '/sources': (
+        b'<sources deviceID="A0B1C2D3E4F5">'
+        b'<sourceItem source="AUX" sourceAccount="AUX" status="READY" isLocal="true" '
+        b'multiroomallowed="true">AUX IN</sourceItem>'
+        b'<sourceItem source="SPOTIFY" sourceAccount="user1" status="READY" isLocal="false" '
+        b'multiroomallowed="true">user1</sourceItem>'
+        b'<sourceItem source="QPLAY" sourceAccount="QPlay1UserName" status="UNAVAILABLE" '
+        b'isLocal="true" multiroomallowed="true">QPlay1UserName</sourceItem></sources>'
+    ),
+    '/bass': b'<bass deviceID="A0B1C2D3E4F5"><targetbass>0</targetbass><actualbass>0</actualbass></bass>',
+    '/name': b'<name>Kitchen</name>',
+    '/swUpdateQuery': (
+        b'<swUpdateQueryResponse><state>IDLE</state>'
+        b'<percentComplete>0</percentComplete></swUpdateQueryResponse>'
+    ),
+}
+"""The responses of the fake device, mapped to their request path."""
+
+NOT_FOUND = (
+    b'<errors deviceID="A0B1C2D3E4F5"><error value="404" name="HTTP_STATUS_NOT_FOUND" '
+    b'severity="Unknown">not found</error></errors>'
+)
+
+
+def firmware_index(*entries) -> bytes:
+    """Returns an index.xml with a DEVICE per (device id, product name, revision) entry."""
+    return b''.join([b'<INDEX REVISION="1">'] + [
+        b'<DEVICE ID="%x" PRODUCTNAME="%s"><HARDWARE REVISION="1">'
+        b'<RELEASE REVISION="%s" HTTPHOST="downloads.bose.com" URLPATH="/fw/%x/Update.stu" '
+        b'USBPATH="/usb/%x/Update.stu"><IMAGE FILENAME="Update.stu" CHECKSUM="%s" SIZE="1024"/>'
+        b'<NOTES URL="https://downloads.bose.com/notes/%x.html"/>'
+        b'<FEATURE NAME="spotify" VALUE="true"/></RELEASE></HARDWARE></DEVICE>' % (
+            device_id, name.encode(), revision.encode(), device_id, device_id,
+            b'%032x' % device_id, device_id
+        )
+        for device_id, name, revision in entries
+    ] + [b'</INDEX>'])
+
+
+_addresses = ('127.0.%d.%d' % (i // 250, i % 250 + 2) for i in itertools.count(250))
+
+
+def next_address() -> str:
+    """Returns a loopback address that has not been used by this test run."""
+    return next(_addresses)
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Answers requests with the pages of the server.
+
+    A page is either the response body, a (status, body) or
+    (status, body, headers) tuple or a callable that takes the handler
+    and returns one of the former.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: bytes = b'', headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Allow', 'GET, POST, OPTIONS')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def handle_request(self, body: bytes = None):
+        server = self.server
+        server.requests.append((self.command, self.path, body))
+        if server.delay:
+            time.sleep(server.delay)
+        if server.fail > 0:
+            server.fail -= 1
+            self.reply(503)
+            return
+
+        page = server.pages.get(self.path)
+        if callable(page):
+            page = page(self)
+            if page is None:
+                return
+        if page is None:
+            if self.command == 'POST':
+                page = b'<status>%s</status>' % self.path.encode()
+            else:
+                page = (404, NOT_FOUND)
+        if isinstance(page, bytes):
+            page = (200, page)
+        self.reply(*page)
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_OPTIONS(self):
+        self.server.requests.append(('OPTIONS', self.path, None))
+        self.reply(200)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.handle_request(self.rfile.read(length))
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """A threaded HTTP server with configurable pages.
+
+    Attributes:
+        pages: dict
+            The responses mapped to their request path (see FakeHandler).
+        requests: list
+            All received requests as (method, path, body) tuples.
+        delay: float
+            Seconds to wait before each response.
+        fail: int
+            The number of following requests answered with 503.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple, pages: dict = None, handler=FakeHandler) -> None:
+        super().__init__(address, handler)
+        self.pages = dict(pages or {})
+        self.requests = []
+        self.delay = 0.0
+        self.fail = 0
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def handle_error(self, request, client_address):
+        # clients closing the connection early (e.g. an aborted download) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def url(self, path: str = '/') -> str:
+        return 'http://%s:%d%s' % (self.host, self.port, path)
+
+    def paths(self, method: str = 'GET') -> list:
+        """Returns the requested paths of the given method."""
+        return [request[1] for request in self.requests if request[0] == method]
+
+    def start(self) -> 'FakeServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+@pytest.fixture
+def serve():
+    """Returns a factory that starts a FakeServer.
+
+    `serve(pages, host=None, port=0)` binds to a new loopback address if no
+    host is given; all servers are stopped after the test.
+    """
+    servers = []
+
+    def factory(pages: dict = None, host: str = None, port: int = 0, handler=FakeHandler):
+        server = FakeServer((host or next_address(), port), pages, handler).start()
+        servers.append(server)
+        return server
+
+    yield factory
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def fake_device(serve):
+    """A fake SoundTouch device on port 8090 of its own loopback address."""
+    return serve(DEVICE_PAGES, port=8090)
+
+
+@pytest.fixture
+def device(fake_device):
+    """The BoseDevice of the fake_device fixture."""
+    from boseapi.common.device import new_device
+    return new_device(fake_device.host)
@@ -0,0 +1,211 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import asyncio
+import base64
+import hashlib
+import struct
+
+import pytest
+
+from boseapi.common.device import BoseDevice
+from boseapi.ws.aiows import AsyncBoseWebSocket, WebSocketError
+
+GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+UPDATES = (
+    b'<updates deviceID="A0B1C2D3E4F5"><volumeUpdated><volume><targetvolume>5</targetvolume>'
+    b'<actualvolume>5</actualvolume><muteenabled>false</muteenabled></volume></volumeUpdated>'
+    b'<nowPlayingUpdated><nowPlaying source="AUX"><description>%s</description>'
+    b'</nowPlaying></nowPlayingUpdated></updates>' % (b'x' * 70000)
+)
+
+
+def frame(opcode: int, payload: bytes = b'', fin: bool = True) -> bytes:
+    # an unmasked server frame
+    first = (0x80 if fin else 0) | opcode
+    if len(payload) < 126:
+        return struct.pack('!BB', first, len(payload)) + payload
+    if len(payload) < 0x10000:
+        return struct.pack('!BBH', first, 126, len(payload)) + payload
+    return struct.pack('!BBQ', first, 127, len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple:
+    # a masked client frame
+    first, second = await reader.readexactly(2)
+    assert second & 0x80, 'client frames must be masked'
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    key = await reader.readexactly(4)
+    payload = bytes(x ^ key[i % 4] for i, x in enumerate(await reader.readexactly(length)))
+    return first & 0x0F, payload
+
+
+class LoopbackServer:
+    """A notification server on 127.0.0.1 that runs `script` per connection."""
+
+    def __init__(self, script, protocol: bytes = b'gabbo', accept: bool = True):
+        self.script = script
+        self.protocol = protocol
+        self.accept = accept
+        self.requests = []
+        self.frames = []
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.split(b'\r\n')
+        headers = dict(
+            (name.strip().lower(), value.strip())
+            for name, _, value in (line.partition(b':') for line in lines[1:] if line)
+        )
+        self.requests.append(headers)
+        key = headers[b'sec-websocket-key'] if self.accept else b'wrong'
+        reply = [
+            b'HTTP/1.1 101 Switching Protocols', b'Upgrade: websocket', b'Connection: Upgrade',
+            b'Sec-WebSocket-Accept: ' + base64.b64encode(hashlib.sha1(key + GUID).digest()),
+        ]
+        if self.protocol:
+            reply.append(b'Sec-WebSocket-Protocol: ' + self.protocol)
+        writer.write(b'\r\n'.join(reply + [b'', b'']))
+        try:
+            await self.script(self, reader, writer)
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    async def run(self, client):
+        server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.wait_for(client(port), 10)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+def socket_for(port: int, **kwargs) -> AsyncBoseWebSocket:
+    return AsyncBoseWebSocket(BoseDevice('127.0.0.1'), port=port, connect_timeout=2, **kwargs)
+
+
+async def updates_ping_and_client_close(server, reader, writer):
+    writer.write(frame(1, b'<SoundTouchSdkInfo serverVersion="4"/>'))
+    writer.write(frame(9, b'ping'))
+    writer.write(frame(1, UPDATES[:100], fin=False))
+    writer.write(frame(0, UPDATES[100:]))
+    await writer.drain()
+    while True:
+        opcode, payload = await read_frame(reader)
+        server.frames.append((opcode, payload))
+        if opcode == 8:
+            writer.write(frame(8, payload))
+            await writer.drain()
+            return
+
+
+def test_updates_ping_and_close():
+    server = LoopbackServer(updates_ping_and_client_close)
+    volumes, errors = [], []
+
+    async def client(port):
+        socket = socket_for(port, ping_interval=None)
+        socket.add_listener('volumeUpdated', volumes.append)
+        socket.add_listener('error', errors.append)
+
+        async def on_now_playing(update):
+            await asyncio.sleep(0)
+            volumes.append(update.tag)
+        socket.add_listener('nowPlayingUpdated', on_now_playing)
+
+        async with socket:
+            assert socket.connected
+            tags = []
+            async for update in socket:
+                tags.append(update.tag)
+                if len(tags) == 2:
+                    break
+        assert not socket.connected
+        assert [x async for x in socket] == []
+        return tags
+
+    tags = asyncio.run(server.run(client))
+    assert tags == ['volumeUpdated', 'nowPlayingUpdated']
+    assert volumes[0].find('volume/actualvolume').text == '5' and volumes[1] == 'nowPlayingUpdated'
+    assert errors == []
+    assert server.requests[0][b'sec-websocket-protocol'] == b'gabbo'
+    assert server.frames == [(0xA, b'ping'), (8, struct.pack('!H', 1000))]
+
+
+async def server_closes(server, reader, writer):
+    writer.write(frame(1, b'<updates><zoneUpdated/></updates>'))
+    writer.write(frame(8, struct.pack('!H', 1001)))
+    await writer.drain()
+    server.frames.append(await read_frame(reader))
+
+
+def test_server_initiated_close_ends_iteration():
+    server = LoopbackServer(server_closes)
+    errors = []
+
+    async def client(port):
+        socket = socket_for(port)
+        socket.add_listener('error', errors.append)
+        await socket.connect()
+        return [update.tag async for update in socket]
+
+    assert asyncio.run(server.run(client)) == ['zoneUpdated']
+    assert server.frames == [(8, struct.pack('!H', 1001))]
+    assert errors == []
+
+
+async def drop_connection(server, reader, writer):
+    writer.write(frame(1, b'<updates><bad'))
+    await writer.drain()
+
+
+def test_connection_loss_and_bad_xml_are_reported():
+    server = LoopbackServer(drop_connection)
+    errors = []
+
+    async def client(port):
+        socket = socket_for(port)
+        socket.add_listener('error', errors.append)
+        await socket.connect()
+        return [update async for update in socket]
+
+    assert asyncio.run(server.run(client)) == []
+    assert len(errors) == 2 and isinstance(errors[1], (ConnectionError, EOFError))
+
+
+async def idle(server, reader, writer):
+    await reader.read()
+
+
+@pytest.mark.parametrize('protocol, accept', [(None, True), (b'chat', True), (b'gabbo', False)])
+def test_handshake_is_validated(protocol, accept):
+    server = LoopbackServer(idle, protocol=protocol, accept=accept)
+
+    async def client(port):
+        with pytest.raises(WebSocketError):
+            await socket_for(port).connect()
+
+    asyncio.run(server.run(client))
@@ -0,0 +1,94 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+
+from sys import intern
+from xml.etree.ElementTree import fromstring
+
+import pytest
+
+from boseapi import codec, model
+
+from conftest import DEVICE_PAGES
+
+SAMPLES = [
+    ('/nowPlaying', model.Status),
+    ('/volume', model.Volume),
+    ('/getZone', model.Zone),
+    ('/capabilities', model.Capabilities),
+    ('/netStats', model.NetworkStats),
+    ('/networkInfo', model.NetworkInfo),
+    ('/presets', model.PresetList),
+    ('/sources', model.SourceItemList),
+    ('/bass', model.Bass),
+    ('/name', model.SimpleConfig),
+]
+
+FORMATS = [codec.JSON] + ([codec.MSGPACK] if codec.msgpack is not None else [])
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('path, cls', SAMPLES)
+def test_round_trip(path, cls, fmt):
+    value = cls(fromstring(DEVICE_PAGES[path]))
+    restored = codec.decode(codec.encode(value, fmt))
+    assert type(restored) is cls
+    assert restored == value
+
+
+@pytest.mark.parametrize('path, cls', SAMPLES)
+def test_dict_round_trip(path, cls):
+    value = cls(fromstring(DEVICE_PAGES[path]))
+    data = json.loads(json.dumps(value.to_dict()))
+    assert cls.from_dict(data) == value
+
+
+def test_lazy_objects_and_interned_values():
+    status = model.Status.lazy(fromstring(DEVICE_PAGES['/nowPlaying']))
+    restored = codec.decode(codec.encode(status, codec.JSON))
+    assert type(restored) is model.Status and restored == status
+    assert restored.source is intern('INTERNET_RADIO')
+
+
+def test_json_is_compact():
+    data = codec.encode(model.Volume(actual_vol=3, target_vol=4), codec.JSON)
+    assert data == b'["Volume",[3,4,false]]'
+
+
+def test_errors():
+    with pytest.raises(codec.CodecError):
+        codec.encode(object())
+    with pytest.raises(codec.CodecError):
+        codec.encode(model.Volume(), 'xml')
+    with pytest.raises(codec.CodecError):
+        codec.decode(b'["Unknown",[]]')
+    with pytest.raises(codec.CodecError):
+        codec.decode(b'["Volume",[1]]')
+    with pytest.raises(codec.CodecError):
+        codec.decode(b'[1')
+
+
+@pytest.mark.skipif(codec.msgpack is not None, reason='msgpack is installed')
+def test_msgpack_missing():
+    assert codec.DEFAULT_FORMAT == codec.JSON
+    with pytest.raises(codec.CodecError):
+        codec.encode(model.Volume(), codec.MSGPACK)
@@ -0,0 +1,109 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pytest
+
+from boseapi import compliance
+from boseapi.common.device import BoseDevice, BoseDeviceComponent
+from boseapi.compliance import CURRENT, OUTDATED, UNKNOWN
+from boseapi.firmware import FirmwareCatalogue
+
+from conftest import DEVICE_PAGES, firmware_index
+
+CATALOGUE = FirmwareCatalogue()
+CATALOGUE.load_index(firmware_index(
+    (0x4020, 'SoundTouch 20', '27.0.6.46330.5043500'),
+    (0x4030, 'SoundTouch 30', '27.0.6.46330.5043500'),
+    (0x4010, 'SoundTouch 10', '26.1.0'),
+))
+
+
+def device(host: str, device_type: str, *versions) -> BoseDevice:
+    # versions are (category, software version) pairs
+    return BoseDevice(host, device_type=device_type, components=[
+        BoseDeviceComponent(category, version) for category, version in versions
+    ])
+
+
+DEVICES = [
+    device('10.0.0.1', 'SoundTouch 30', ('SCM', '27.0.6.46330.5043500 epdbuild')),
+    device('10.0.0.2', 'SoundTouch 30', ('SCM', '27.0.5.1'), ('PackagedProduct', '26.0.0')),
+    device('10.0.0.3', 'SoundTouch 20', ('SCM', '28.0.0')),
+    device('10.0.0.4', 'SoundTouch 20'),
+    device('10.0.0.5', 'Wave SoundTouch', ('SCM', '1.0')),
+    device('10.0.0.6', 'SoundTouch 10', ('SCM', '26.1.0.99')),
+]
+
+
+def test_parse_version():
+    assert compliance.parse_version('27.0.6.46330.5043500 epdbuild.trunk') == (27, 0, 6, 46330, 5043500)
+    assert compliance.parse_version(' 1.2 ') == (1, 2)
+    assert compliance.parse_version('unknown') == compliance.parse_version(None) == ()
+
+
+def test_installed_version_prefers_packaged_product():
+    assert compliance.installed_version(DEVICES[1]) == '26.0.0'
+    assert compliance.installed_version(DEVICES[1], ('SCM',)) == '27.0.5.1'
+    assert compliance.installed_version(DEVICES[3]) is None
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_check_compliance(use_numpy):
+    report = compliance.check_compliance(DEVICES, CATALOGUE, use_numpy=use_numpy)
+    assert list(report.states) == [CURRENT, OUTDATED, CURRENT, UNKNOWN, UNKNOWN, CURRENT]
+    assert report.models == ['SoundTouch 30', 'SoundTouch 20', 'Wave SoundTouch', 'SoundTouch 10']
+    assert report.targets == ['27.0.6.46330.5043500', '27.0.6.46330.5043500', None, '26.1.0']
+    assert report.counts() == {
+        'SoundTouch 30': {'current': 1, 'outdated': 1, 'unknown': 0},
+        'SoundTouch 20': {'current': 1, 'outdated': 0, 'unknown': 1},
+        'Wave SoundTouch': {'current': 0, 'outdated': 0, 'unknown': 1},
+        'SoundTouch 10': {'current': 1, 'outdated': 0, 'unknown': 0},
+    }
+    assert report.totals() == {'current': 3, 'outdated': 1, 'unknown': 2}
+    assert report.outdated() == ['10.0.0.2']
+    assert report.unknown() == ['10.0.0.4', '10.0.0.5']
+    assert len(report) == 6
+
+
+def test_product_ids_override_product_names():
+    # 'Wave SoundTouch' joined to the SoundTouch 10 release, SoundTouch 30 to an unknown id
+    report = compliance.check_compliance(DEVICES, CATALOGUE, product_ids={
+        'Wave SoundTouch': '4010', 'SoundTouch 30': 0xffff
+    })
+    assert report.targets[2] == '26.1.0'
+    assert report.hosts_in(OUTDATED) == ['10.0.0.5']
+    assert report.unknown() == ['10.0.0.1', '10.0.0.2', '10.0.0.4']
+
+
+def test_empty_fleet():
+    report = compliance.check_compliance([], CATALOGUE)
+    assert len(report) == 0 and report.counts() == {} and report.outdated() == []
+
+
+def test_scan_loads_devices_concurrently(serve):
+    hosts = [serve(DEVICE_PAGES, port=8090).host for _ in range(3)]
+    broken = serve({}, port=8090).host
+    report = compliance.scan(hosts + [broken], CATALOGUE, max_workers=4)
+    assert report.hosts == hosts
+    assert report.counts() == {'SoundTouch 30': {'current': 3, 'outdated': 0, 'unknown': 0}}
+    assert list(report.errors) == [broken]
+    assert isinstance(report.errors[broken], InterruptedError)
+    assert 'errors=1' in repr(report)
@@ -0,0 +1,147 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import socket
+import threading
+import time
+
+import pytest
+
+from boseapi import discovery
+
+from conftest import DEVICE_PAGES
+
+
+@pytest.fixture
+def ssdp_responder():
+    """Answers each M-SEARCH on 127.0.0.1 with the LOCATION of every host in `hosts`."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    responder = {'address': sock.getsockname(), 'hosts': [], 'searches': []}
+
+    def answer():
+        while True:
+            try:
+                data, sender = sock.recvfrom(4096)
+            except OSError:
+                return
+            responder['searches'].append(data)
+            sock.sendto(b'NOTIFY * HTTP/1.1\r\n\r\n', sender)
+            for host in responder['hosts']:
+                sock.sendto(
+                    b'HTTP/1.1 200 OK\r\nCACHE-CONTROL: max-age=1800\r\n'
+                    b'LOCATION: http://%s:8091/XD/BO5EBO5E-F00D-FEED-A0B1C2D3E4F5.xml\r\n'
+                    b'ST: upnp:rootdevice\r\nUSN: uuid:x\r\n\r\n' % host.encode(), sender
+                )
+
+    threading.Thread(target=answer, daemon=True).start()
+    yield responder
+    sock.close()
+
+
+def test_ssdp_search(ssdp_responder):
+    ssdp_responder['hosts'] = ['127.0.200.1', '127.0.200.2', '127.0.200.1']
+    found = list(discovery.ssdp_search(0.5, address=ssdp_responder['address']))
+    assert [host for host, _ in found] == ['127.0.200.1', '127.0.200.2']
+    assert found[0][1]['ST'] == 'upnp:rootdevice'
+    searches = ssdp_responder['searches']
+    assert len(searches) == len(discovery.SEARCH_TARGETS)
+    assert all(search.startswith(b'M-SEARCH * HTTP/1.1\r\n') for search in searches)
+
+
+def test_sweep_finds_open_ports(serve):
+    for host in ('127.0.201.3', '127.0.201.9'):
+        serve({}, host=host, port=8090)
+    assert sorted(discovery.sweep('127.0.201.0/28', max_workers=4, timeout=0.2)) == \
+        ['127.0.201.3', '127.0.201.9']
+    assert list(discovery.sweep('127.0.201.5/32')) == []
+
+
+@pytest.mark.parametrize('network', ['::1/128', 'fe80::/120', '10.0.0.0/15', 'no network'])
+def test_sweep_rejects_networks(network):
+    with pytest.raises(ValueError):
+        next(discovery.sweep(network))
+    with pytest.raises(ValueError):
+        list(discovery.discover(network, ssdp=False))
+
+
+def test_sweep_generates_addresses_lazily(monkeypatch):
+    probed = []
+
+    def probe(host, port, timeout):
+        probed.append(host)
+        return True
+
+    monkeypatch.setattr(discovery, 'probe', probe)
+    found = discovery.sweep('10.0.0.0/16', max_workers=2)
+    first = next(found)
+    assert first.startswith('10.0.0.') and len(probed) <= 4
+    found.close()
+    assert len(probed) <= 4
+
+
+def test_discovery_verifies_candidates(serve, ssdp_responder):
+    devices = ['127.0.202.2', '127.0.202.20', '127.0.202.7']
+    for host in devices:
+        serve(DEVICE_PAGES, host=host, port=8090)
+    serve({}, host='127.0.202.4', port=8090)            # no SoundTouch device
+    ssdp_responder['hosts'] = ['127.0.202.2', '127.0.202.20', '127.0.202.30']
+
+    discovery_run = discovery.DeviceDiscovery(
+        '127.0.202.0/28', ssdp_address=ssdp_responder['address'], ssdp_timeout=0.5,
+        sweep_timeout=0.2
+    )
+    found = list(discovery_run)
+    assert sorted(device.host for device in found) == devices
+    assert found[0].device_name == 'Kitchen'
+    stats = discovery_run.stats
+    assert (stats['ssdp'], stats['swept'], stats['verified'], stats['rejected']) == (3, 3, 3, 2)
+    assert sorted(discovery_run.devices) == devices
+
+
+def test_stopping_early_ends_search_and_sweep(serve, ssdp_responder, monkeypatch):
+    serve(DEVICE_PAGES, host='127.0.203.2', port=8090)
+    ssdp_responder['hosts'] = ['127.0.203.2']
+    probed = []
+
+    def probe(host, port, timeout):
+        probed.append(host)
+        time.sleep(0.01)
+        return False
+
+    monkeypatch.setattr(discovery, 'probe', probe)
+    discovery_run = discovery.DeviceDiscovery(
+        '127.0.0.0/16', ssdp_address=ssdp_responder['address'], ssdp_timeout=30.0,
+        max_workers=4
+    )
+    found = iter(discovery_run)
+    assert next(found).host == '127.0.203.2'
+    started = time.monotonic()
+    found.close()
+    assert time.monotonic() - started < 1.0
+    count = len(probed)
+    time.sleep(0.1)
+    assert len(probed) == count < 65534
+    assert discovery_run.stats['verified'] == 1
+
+
+def test_discover_without_sources():
+    assert list(discovery.discover(ssdp=False)) == []
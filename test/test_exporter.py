@@ -0,0 +1,73 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import urllib3
+
+from boseapi.exporter import FleetExporter, CONTENT_TYPE
+
+from conftest import NOT_FOUND
+
+
+def test_collect_renders_device_values(device, fake_device):
+    exporter = FleetExporter([device])
+    text = exporter.collect()
+    labels = 'host="%s",device_id="A0B1C2D3E4F5",name="Kitchen"' % device.host
+
+    assert 'boseapi_device_up{%s} 1' % labels in text
+    assert 'boseapi_volume_actual{%s} 32' % labels in text
+    assert 'boseapi_zone_members{%s} 2' % labels in text
+    assert 'boseapi_zone_master{%s} 1' % labels in text
+    assert 'boseapi_wifi_rssi_dbm{%s,interface="wlan0"} -62' % labels in text
+    assert 'status="PLAY_STATE",source="INTERNET_RADIO"} 1' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_collect_uses_cached_groups(device, fake_device):
+    exporter = FleetExporter([device])
+    exporter.collect()
+    count = len(fake_device.requests)
+
+    exporter.collect()
+    assert len(fake_device.requests) == count
+    assert exporter.refresh(force=True) == 1
+    assert len(fake_device.requests) == count + 4
+
+
+def test_error_response_marks_device_down(device, fake_device):
+    fake_device.pages['/volume'] = NOT_FOUND
+    exporter = FleetExporter([device])
+    exporter.refresh()
+
+    state = exporter.states[0]
+    assert not state.up
+    assert state.volume is None
+    assert 'boseapi_volume_actual' not in exporter.collect()
+
+
+def test_serve_metrics(device, fake_device):
+    with FleetExporter([device]) as exporter:
+        server = exporter.serve(port=0)
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        response = urllib3.request('GET', url + '/metrics')
+        assert response.status == 200
+        assert response.headers['Content-Type'] == CONTENT_TYPE
+        assert b'boseapi_device_up' in response.data
+        assert urllib3.request('GET', url + '/other').status == 404
@@ -0,0 +1,79 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import io
+import xml.etree.ElementTree as xmltree
+
+from boseapi import firmware
+from boseapi.firmware import FirmwareCatalogue
+
+from conftest import firmware_index
+
+INDEX = firmware_index(
+    (0x4020, 'SoundTouch 20', '27.0.6.46330.5043500'),
+    (0x4030, 'SoundTouch 30', '27.0.6.46330.5043500'),
+    (0x4010, 'SoundTouch 10', '26.1.0.1'),
+    (0x4020, 'SoundTouch 20 (old)', '20.0.0.1'),
+)
+
+LOOKUP = (
+    b'<PRODUCTS><PRODUCT PID="4020" URL="https://x/20/index.xml"/>'
+    b'<PRODUCT PID="4030" URL="https://x/30/index.xml" DEVICE_CLASS="wsa"/>'
+    b'<PRA-PRODUCT PID="9999" URL="https://x/pra/index.xml"/></PRODUCTS>'
+)
+
+
+def test_streaming_matches_load_index():
+    streamed = list(firmware.iter_index(INDEX))
+    loaded = firmware.load_index(xmltree.fromstring(INDEX))
+    assert [(f.device_id, f.product_name, f.release.revision) for f in streamed] == \
+        [(f.device_id, f.product_name, f.release.revision) for f in loaded]
+    first = streamed[0]
+    assert first.release.image['CHECKSUM'] == '%032x' % 0x4020
+    assert first.release.notes_url.endswith('/4020.html')
+    assert first.release.features == [{'NAME': 'spotify', 'VALUE': 'true'}]
+
+    products = list(firmware.iter_lookup(io.BytesIO(LOOKUP)))
+    assert [p.product_id for p in products] == [0x4020, 0x4030, 0x9999]
+    assert products[1].has_device_class() and not products[0].has_device_class()
+
+
+def test_streaming_reads_files(tmp_path):
+    path = tmp_path / 'index.xml'
+    path.write_bytes(INDEX)
+    assert len(list(firmware.iter_index(str(path)))) == 4
+
+
+def test_catalogue_indexes():
+    catalogue = FirmwareCatalogue()
+    assert catalogue.load_index(INDEX) == 4
+    assert catalogue.load_lookup(LOOKUP) == 3
+
+    assert len(catalogue) == 3 and 0x4020 in catalogue and '4030' in catalogue
+    # the first entry of a device id wins
+    assert catalogue.get_firmware('4020').product_name == 'SoundTouch 20'
+    assert catalogue.release_for(0x4010).revision == '26.1.0.1'
+    assert catalogue.release_for('ffff') is None
+    assert [f.device_id for f in catalogue.by_revision('27.0.6.46330.5043500')] == [0x4020, 0x4030]
+    assert catalogue.by_revision('20.0.0.1') == []
+    assert sorted(catalogue.revisions()) == ['26.1.0.1', '27.0.6.46330.5043500']
+    assert catalogue.get_product('9999').index_url == 'https://x/pra/index.xml'
+    assert {f.device_id for f in catalogue} == {0x4010, 0x4020, 0x4030}
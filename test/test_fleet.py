@@ -0,0 +1,104 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from xml.etree.ElementTree import fromstring
+
+import pytest
+
+from boseapi import model
+from boseapi.fleet import FleetSnapshot, numpy
+
+from conftest import DEVICE_PAGES
+
+WIRED = b'<network-data><devices><device deviceID="B"><interfaces><interface><name>eth0</name><running>true</running><kind>Ethernet</kind></interface></interfaces></device></devices></network-data>'
+
+
+@pytest.fixture(params=[False] + ([True] if numpy is not None else []))
+def fleet(request):
+    return FleetSnapshot(capacity=1, use_numpy=request.param)
+
+
+def event(tag: str, body: bytes):
+    return fromstring(b'<%s>%s</%s>' % (tag.encode(), body, tag.encode()))
+
+
+def test_update_and_query(fleet):
+    fleet.update_volume('A', model.Volume(fromstring(DEVICE_PAGES['/volume'])))
+    fleet.update_status('A', model.Status(fromstring(DEVICE_PAGES['/nowPlaying'])))
+    fleet.update_network('A', model.NetworkStats(fromstring(DEVICE_PAGES['/netStats'])))
+    fleet.set('B', actual_vol=10, target_vol=10, muted=True, play_status='PAUSE_STATE', source='AUX')
+    fleet.update_network('B', model.NetworkStats(fromstring(WIRED)))
+
+    assert len(fleet) == 2 and 'B' in fleet
+    assert fleet.where('muted') == ['B']
+    assert fleet.where('actual_vol', '>=', 20) == ['A']
+    assert fleet.where('source', '==', 'INTERNET_RADIO') == ['A']
+    assert fleet.counts('play_status') == {'PLAY_STATE': 1, 'PAUSE_STATE': 1}
+    assert fleet.get('A') == {
+        'actual_vol': 32, 'target_vol': 32, 'muted': False, 'rssi': -62,
+        'frequencyKHz': 2437000, 'play_status': 'PLAY_STATE', 'source': 'INTERNET_RADIO'
+    }
+
+
+def test_missing_values_never_match(fleet):
+    fleet.update_network('A', model.NetworkStats(fromstring(DEVICE_PAGES['/netStats'])))
+    fleet.update_network('B', model.NetworkStats(fromstring(WIRED)))
+    fleet.row('C')
+
+    assert fleet.where('rssi', '>', -50) == []
+    assert fleet.where('rssi', '<', 0) == ['A']
+    assert fleet.where('rssi', '!=', -62) == []
+    assert fleet.where('rssi', '==', None) == ['B', 'C']
+    assert fleet.where('actual_vol', '<', 10) == []
+    assert fleet.where('muted', '==', False) == []
+    assert fleet.get('B')['rssi'] is None and fleet.get('C')['muted'] is None
+    with pytest.raises(ValueError):
+        fleet.where('rssi', '<', None)
+
+
+def test_volume_events(fleet):
+    assert fleet.apply('A', event('volumeUpdated', DEVICE_PAGES['/volume']))
+    assert fleet.get('A')['target_vol'] == 32
+
+    partial = b'<volume><actualvolume>12</actualvolume></volume>'
+    assert fleet.apply('A', event('volumeUpdated', partial))
+    values = fleet.get('A')
+    assert (values['actual_vol'], values['target_vol'], values['muted']) == (12, None, None)
+    assert fleet.column('target_vol')[0] == -1
+
+    assert fleet.apply('A', event('nowPlayingUpdated', DEVICE_PAGES['/nowPlaying']))
+    assert fleet.get('A')['play_status'] == 'PLAY_STATE'
+    assert not fleet.apply('A', event('zoneUpdated', DEVICE_PAGES['/getZone']))
+
+
+def test_rows_grow(fleet):
+    for index in range(100):
+        fleet.set('D%d' % index, actual_vol=index)
+    assert len(fleet.column('actual_vol')) == 100
+    assert fleet.where('actual_vol', '>=', 98) == ['D98', 'D99']
+    assert fleet.labels('source')[0] is None
+
+
+def test_update_client(device):
+    from boseapi.client import SoundTouchClient
+    fleet = FleetSnapshot()
+    fleet.update_client(SoundTouchClient(device), refresh=True)
+    assert fleet.get('A0B1C2D3E4F5')['rssi'] == -62
@@ -0,0 +1,164 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import os
+import re
+
+import pytest
+
+from boseapi.firmware import Firmware, Release
+from boseapi.images import ChecksumError, ImageDownloader, image_url
+
+IMAGE = bytes(range(256)) * 64
+
+
+class ImagePage:
+    """Serves an image and answers Range requests; `shift` moves the returned range."""
+
+    def __init__(self, data: bytes = IMAGE, shift: int = 0, ranges: bool = True):
+        self.data = data
+        self.shift = shift
+        self.ranges = ranges
+        self.requested = []
+
+    def __call__(self, handler):
+        requested = handler.headers.get('Range')
+        self.requested.append(requested)
+        match = re.match(r'bytes=(\d+)-', requested or '')
+        if not match or not self.ranges:
+            return 200, self.data
+        start = max(0, int(match.group(1)) + self.shift)
+        if start >= len(self.data):
+            return 416, b''
+        return 206, self.data[start:], {
+            'Content-Range': 'bytes %d-%d/%d' % (start, len(self.data) - 1, len(self.data))
+        }
+
+
+def release(url: str, data: bytes = IMAGE, name: str = 'Update.stu') -> Release:
+    return Release('27.0.6', uri=url, image={
+        'FILENAME': name, 'SIZE': str(len(data)), 'CHECKSUM': hashlib.md5(data).hexdigest()
+    })
+
+
+def resume(server, tmp_path, page: ImagePage, received: int) -> tuple:
+    downloader = ImageDownloader(str(tmp_path), retries=0, chunk_size=1024)
+    item = release(server.url('/image.stu'))
+    part = downloader.path_of(item) + '.part'
+    os.makedirs(str(tmp_path), exist_ok=True)
+    with open(part, 'wb') as fp:
+        fp.write(IMAGE[:received])
+    paths = downloader.download([item])
+    return downloader, paths[item]
+
+
+def test_image_url():
+    assert image_url(Release(host='downloads.bose.com', uri='/a/Update.stu')) == \
+        'https://downloads.bose.com/a/Update.stu'
+    assert image_url(Release(host='x', uri='http://y/Update.stu')) == 'http://y/Update.stu'
+    assert image_url(Release(host='x')) is None
+
+
+def test_downloads_shared_images_once(serve, tmp_path):
+    other = IMAGE[::-1]
+    server = serve({'/a.stu': ImagePage(), '/b.stu': ImagePage(other)})
+    releases = [release(server.url('/a.stu')), release(server.url('/a.stu')),
+                release(server.url('/b.stu'), other, name='../b.stu')]
+    firmware = Firmware(0x4020, 'SoundTouch 20', release=releases[2])
+
+    downloader = ImageDownloader(str(tmp_path), max_workers=2, retries=0)
+    paths = downloader.download(releases[:2] + [firmware, Release('1')])
+    assert len(set(paths.values())) == 2 and len(paths) == 3
+    with open(paths[releases[0]], 'rb') as fp:
+        assert fp.read() == IMAGE
+    assert os.path.dirname(paths[releases[2]]) == str(tmp_path)
+    assert os.path.basename(paths[releases[2]]) == hashlib.md5(other).hexdigest()
+    assert downloader.stats == {'images': 2, 'deduplicated': 1, 'skipped': 0, 'downloaded': 2,
+                                'resumed': 0, 'bytes': 2 * len(IMAGE), 'errors': 0}
+
+    # complete images are not downloaded again
+    assert downloader.download(releases) == paths
+    assert downloader.stats['skipped'] == 2
+    assert sorted(server.paths()) == ['/a.stu', '/b.stu']
+
+
+def test_same_checksum_under_other_names_is_stored_once(serve, tmp_path):
+    server = serve({'/a.stu': ImagePage(), '/b.stu': ImagePage()})
+    releases = [release(server.url('/a.stu'), name='Update.stu'),
+                release(server.url('/b.stu'), name='SoundTouch_27.0.6.stu')]
+
+    downloader = ImageDownloader(str(tmp_path), retries=0)
+    paths = downloader.download(releases)
+    assert paths[releases[0]] == paths[releases[1]]
+    assert os.listdir(str(tmp_path)) == [hashlib.md5(IMAGE).hexdigest()]
+    assert downloader.stats['deduplicated'] == 1 and downloader.stats['downloaded'] == 1
+    assert server.paths() == ['/a.stu']
+
+
+def test_resumes_partial_download(serve, tmp_path):
+    page = ImagePage()
+    downloader, path = resume(serve({'/image.stu': page}), tmp_path, page, 1000)
+    assert page.requested == ['bytes=1000-']
+    assert downloader.stats['resumed'] == 1 and downloader.stats['bytes'] == len(IMAGE) - 1000
+    with open(path, 'rb') as fp:
+        assert fp.read() == IMAGE
+    assert not os.path.exists(path + '.part')
+
+
+@pytest.mark.parametrize('shift', [-10, 10])
+def test_restarts_on_unexpected_range(serve, tmp_path, shift):
+    page = ImagePage(shift=shift)
+    downloader, path = resume(serve({'/image.stu': page}), tmp_path, page, 1000)
+    assert page.requested == ['bytes=1000-', None]
+    assert downloader.stats['resumed'] == 0 and downloader.stats['downloaded'] == 1
+    with open(path, 'rb') as fp:
+        assert fp.read() == IMAGE
+
+
+def test_range_from_first_byte_replaces_partial_file(serve, tmp_path):
+    page = ImagePage(shift=-1000)
+    downloader, path = resume(serve({'/image.stu': page}), tmp_path, page, 1000)
+    assert page.requested == ['bytes=1000-']
+    with open(path, 'rb') as fp:
+        assert fp.read() == IMAGE
+
+
+def test_server_without_ranges(serve, tmp_path):
+    page = ImagePage(ranges=False)
+    downloader, path = resume(serve({'/image.stu': page}), tmp_path, page, 1000)
+    assert downloader.stats['bytes'] == len(IMAGE)
+    with open(path, 'rb') as fp:
+        assert fp.read() == IMAGE
+
+
+def test_invalid_images_are_removed(serve, tmp_path):
+    server = serve({'/image.stu': ImagePage(IMAGE[:-1] + b'x')})
+    item = release(server.url('/image.stu'))
+    downloader = ImageDownloader(str(tmp_path), retries=0)
+    assert downloader.download([item]) == {}
+    error = downloader.errors[server.url('/image.stu')]
+    assert isinstance(error, ChecksumError) and 'checksum' in str(error)
+    assert 'Update.stu' in str(error)
+    assert os.listdir(str(tmp_path)) == []
+
+    assert downloader.download([release(server.url('/missing.stu'))]) == {}
+    assert downloader.stats['errors'] == 1
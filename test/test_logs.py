@@ -0,0 +1,193 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import gzip
+import os
+import re
+
+import pytest
+
+from boseapi.common.device import BoseDevice
+from boseapi.common.pool import SharedPoolManager
+from boseapi.logs import LOGREAD, PTS, LogCollector
+
+LOG = b''.join(b'line %06d of the log\n' % i for i in range(5000))
+
+
+class LogFile:
+    """Serves a log file and answers Range requests like the device's web server;
+    `shift` moves the returned range."""
+
+    def __init__(self, data: bytes = LOG, ranges: bool = True, shift: int = 0):
+        self.data = data
+        self.ranges = ranges
+        self.shift = shift
+        self.requested = []
+
+    def __call__(self, handler):
+        requested = handler.headers.get('Range')
+        self.requested.append(requested)
+        match = re.match(r'bytes=(\d+)-', requested or '')
+        if not match or not self.ranges:
+            return 200, self.data
+        start = max(0, int(match.group(1)) + self.shift)
+        if start >= len(self.data):
+            return 416, b'', {'Content-Range': 'bytes */%d' % len(self.data)}
+        return 206, self.data[start:], {
+            'Content-Range': 'bytes %d-%d/%d' % (start, len(self.data) - 1, len(self.data))
+        }
+
+
+class Collector(LogCollector):
+    """Reads the logs from the port of the fake server instead of port 80."""
+
+    ports = {}
+
+    def url_of(self, device: BoseDevice, name: str) -> str:
+        url = LogCollector.url_of(device, name)
+        return url.replace(device.host, '%s:%d' % (device.host, self.ports[device.host]))
+
+
+@pytest.fixture
+def log_device(serve):
+    def factory(device_id: str = 'A0B1C2D3E4F5', **files):
+        server = serve({'/%s.dat' % name: page for name, page in files.items()})
+        Collector.ports[server.host] = server.port
+        device = BoseDevice(server.host, device_id=device_id)
+        device.server = server
+        return device
+    return factory
+
+
+def read(collector: LogCollector, device: BoseDevice, name: str = LOGREAD) -> bytes:
+    with gzip.open(collector.path_of(device, name)) as fp:
+        return fp.read()
+
+
+def test_collect_and_tail(log_device, tmp_path):
+    logread, pts = LogFile(), LogFile(b'pts\n')
+    device = log_device(logread=logread, pts=pts)
+    collector = Collector(str(tmp_path), chunk_size=1024)
+
+    assert collector.collect([device]) == {device.host: {LOGREAD: len(LOG), PTS: 4}}
+    assert read(collector, device) == LOG and read(collector, device, PTS) == b'pts\n'
+
+    logread.data += b'new 1\nnew 2\n'
+    assert collector.collect([device]) == {device.host: {LOGREAD: 12, PTS: 0}}
+    assert logread.requested == [None, 'bytes=%d-' % len(LOG)]
+    assert collector.stats == {'requests': 2, 'bytes': 12, 'unchanged': 1, 'rotated': 0, 'errors': 0}
+    assert read(collector, device) == logread.data
+
+    # the offsets are stored, a new collector continues where the last one stopped
+    assert Collector(str(tmp_path)).offset(device, LOGREAD) == len(logread.data)
+
+
+def test_rotated_log_is_read_again(log_device, tmp_path):
+    logread = LogFile()
+    device = log_device(logread=logread)
+    collector = Collector(str(tmp_path), names=(LOGREAD,))
+    collector.collect([device])
+
+    logread.data = b'rotated\n'
+    assert collector.collect([device]) == {device.host: {LOGREAD: 8}}
+    assert collector.stats['rotated'] == 1
+    assert read(collector, device) == LOG + b'rotated\n'
+
+
+def test_server_ignoring_ranges(log_device, tmp_path):
+    logread = LogFile(ranges=False)
+    device = log_device(logread=logread)
+    collector = Collector(str(tmp_path), names=(LOGREAD,))
+    collector.collect([device])
+
+    logread.data += b'new\n'
+    assert collector.pull(device, LOGREAD) == 4
+    assert read(collector, device) == logread.data
+
+
+@pytest.mark.parametrize('shift', [-len(LOG), -10, 10])
+def test_unexpected_ranges_are_not_appended(log_device, tmp_path, shift):
+    logread = LogFile()
+    device = log_device(logread=logread)
+    # with a single connection, a response that is not released blocks the next request
+    manager = SharedPoolManager(maxsize=1, pool_timeout=1.0)
+    collector = Collector(str(tmp_path), names=(LOGREAD,), chunk_size=1024, manager=manager)
+    collector.collect([device])
+
+    logread.data += b'new 1\nnew 2\n'
+    logread.shift = shift
+    assert collector.pull(device, LOGREAD) == 12
+    assert read(collector, device) == logread.data
+    assert collector.offset(device, LOGREAD) == len(logread.data)
+    if shift == -len(LOG):
+        # a range from the first byte is read like the complete log
+        assert logread.requested == [None, 'bytes=%d-' % len(LOG)]
+    else:
+        assert logread.requested == [None, 'bytes=%d-' % len(LOG), None]
+
+
+def test_lines_keep_incomplete_lines(log_device):
+    logread = LogFile(b'a\r\nb\npart')
+    device = log_device(logread=logread)
+    collector = Collector()
+    assert list(collector.lines(device)) == ['a', 'b']
+
+    logread.data += b'ial\nc\n'
+    lines = collector.lines(device)
+    assert next(lines) == 'partial'
+    lines.close()
+    assert list(collector.lines(device)) == ['c']
+    assert collector.offset(device, LOGREAD) == len(logread.data)
+
+
+def test_pull_without_directory_sends_no_request(log_device):
+    logread = LogFile()
+    device = log_device(logread=logread)
+    collector = Collector(names=(LOGREAD,))
+    with pytest.raises(ValueError):
+        collector.pull(device, LOGREAD)
+    assert collector.collect([device]) == {}
+    assert isinstance(collector.errors['%s/%s' % (device.host, LOGREAD)], ValueError)
+    assert logread.requested == []
+
+
+def test_failed_pulls_release_the_connection(log_device, tmp_path):
+    # with a single connection, a leaked response blocks the next request
+    manager = SharedPoolManager(maxsize=1, pool_timeout=1.0)
+    device = log_device(logread=LogFile())
+    collector = Collector(str(tmp_path), names=(LOGREAD,), manager=manager)
+    open(os.path.dirname(collector.path_of(device, LOGREAD)), 'w').close()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            collector.pull(device, LOGREAD)
+    lines = collector.lines(device)
+    next(lines)
+    lines.close()
+    assert len(list(collector.lines(device))) == 4999
+
+
+def test_missing_files_are_errors(log_device, tmp_path):
+    device = log_device(logread=LogFile())
+    collector = Collector(str(tmp_path), retries=0)
+    assert collector.collect([device]) == {device.host: {LOGREAD: len(LOG)}}
+    assert collector.stats['errors'] == 1
+    assert list(collector.errors) == ['%s/%s' % (device.host, PTS)]
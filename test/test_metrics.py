@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import urllib3
+
+from boseapi.client import SoundTouchClient
+from boseapi.common import nodes
+from boseapi.metrics import (
+    Histogram,
+    RequestMetrics,
+    PHASE_ACQUIRE,
+    PHASE_NETWORK,
+    PHASE_PARSE,
+    PHASE_MODEL,
+    format_sample
+)
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert histogram.total == 2.65
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_format_sample_escapes_labels():
+    line = format_sample('x_total', {'node': 'a"b\\c'}, 2)
+    assert line == 'x_total{node="a\\"b\\\\c"} 2'
+
+
+def test_client_records_phases(device):
+    metrics = RequestMetrics()
+    calls = []
+    metrics.add_hook(lambda *args: calls.append(args))
+    client = SoundTouchClient(device, metrics=metrics)
+
+    assert client.volume().actual_vol == 32
+    host = device.host
+    for phase in (PHASE_ACQUIRE, PHASE_NETWORK, PHASE_PARSE):
+        assert metrics.histogram(host, 'volume', 'GET', phase).count == 1
+    assert metrics.histogram(host, 'volume', 'GET', PHASE_MODEL).count == 1
+    assert metrics.snapshot()['requests'] == {(host, 'volume', 'GET', '200'): 1}
+    assert [call[3] for call in calls] == [PHASE_ACQUIRE, PHASE_NETWORK, PHASE_PARSE, PHASE_MODEL]
+
+    text = metrics.to_openmetrics()
+    assert 'boseapi_requests_total{host="%s",node="volume",method="GET",status="200"} 1' % host in text
+    assert text.endswith('# EOF\n')
+    assert metrics.slowest(group_by='node')[0][0] == 'volume'
+
+    metrics.reset()
+    assert metrics.snapshot() == {'requests': {}, 'latency': {}}
+
+
+def test_client_counts_status(device, fake_device):
+    metrics = RequestMetrics()
+    client = SoundTouchClient(device, metrics=metrics)
+    fake_device.pages['/bass'] = (404, b'')
+
+    client.get(nodes.bass)
+    assert metrics.snapshot()['requests'] == {(device.host, 'bass', 'GET', '404'): 1}
+
+
+def test_requests_use_proxy_manager(device, serve):
+    # A ProxyManager sends the absolute URL to the proxy, so the stand-in proxy
+    # answers based on the full request target.
+    target = 'http://%s:8090/volume' % device.host
+    proxy = serve({target: b'<volume><targetvolume>7</targetvolume>'
+                           b'<actualvolume>7</actualvolume><muteenabled>true</muteenabled></volume>'})
+    client = SoundTouchClient(device, metrics=RequestMetrics())
+    client.manage_traffic(urllib3.ProxyManager(proxy.url()))
+
+    volume = client.volume()
+    assert volume.actual_vol == 7 and volume.muted
+    assert proxy.paths() == [target]
@@ -0,0 +1,131 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import os
+
+import pytest
+
+from boseapi.mirror import FirmwareMirror
+
+from conftest import firmware_index
+
+
+class Files(dict):
+    """Firmware files served with an ETag, answering If-None-Match with 304."""
+
+    def page(self, path: str):
+        def respond(handler):
+            body = self[path]
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if handler.headers.get('If-None-Match') == etag:
+                return 304, b'', {'ETag': etag}
+            return 200, body, {'ETag': etag, 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+        return respond
+
+    def pages(self) -> dict:
+        return {path: self.page(path) for path in self}
+
+
+@pytest.fixture
+def firmware_server(serve):
+    files = Files({
+        '/lookup.xml': (
+            b'<PRODUCTS><PRODUCT PID="4020" URL="/20/index.xml"/>'
+            b'<PRODUCT PID="4030" URL="/30/index.xml"/></PRODUCTS>'
+        ),
+        '/20/index.xml': firmware_index((0x4020, 'SoundTouch 20', '27.0.6')),
+        '/30/index.xml': firmware_index((0x4030, 'SoundTouch 30', '27.0.6')),
+    })
+    server = serve(files.pages())
+    server.files = files
+    return server
+
+
+def mirror_of(server, directory) -> FirmwareMirror:
+    return FirmwareMirror(str(directory), lookup_url=server.url('/lookup.xml'), retries=0)
+
+
+def test_first_sync_downloads_everything(firmware_server, tmp_path):
+    mirror = mirror_of(firmware_server, tmp_path)
+    catalogue = mirror.sync()
+    assert sorted(catalogue.firmware) == [0x4020, 0x4030]
+    assert catalogue.release_for('4030').revision == '27.0.6'
+    assert mirror.stats == {'requests': 3, 'not_modified': 0, 'downloaded': 3,
+                            'errors': 0, 'parsed': True}
+    names = sorted(os.listdir(str(tmp_path)))
+    assert len(names) == 5 and names[0] == 'catalogue.json' and names[-2:] == ['lookup.xml', 'state.json']
+    assert os.path.basename(mirror.path_of(firmware_server.url('/20/index.xml'))) in names
+    assert mirror.state[firmware_server.url('/20/index.xml')]['etag']
+
+
+def test_unchanged_files_reuse_the_stored_catalogue(firmware_server, tmp_path):
+    built = mirror_of(firmware_server, tmp_path).sync()
+
+    mirror = mirror_of(firmware_server, tmp_path)
+    catalogue = mirror.sync()
+    assert mirror.stats == {'requests': 3, 'not_modified': 3, 'downloaded': 0,
+                            'errors': 0, 'parsed': False}
+    assert sorted(catalogue.firmware) == [0x4020, 0x4030]
+    release = catalogue.release_for('4030')
+    assert release.revision == '27.0.6' and release.image == built.release_for('4030').image
+    assert [x.product_name for x in catalogue.by_revision('27.0.6')] == ['SoundTouch 20', 'SoundTouch 30']
+    assert sorted(catalogue.products) == sorted(built.products)
+
+    # a damaged catalogue is rebuilt from the mirrored files
+    (tmp_path / 'catalogue.json').write_bytes(b'garbage')
+    assert len(mirror.sync()) == 2 and mirror.stats['parsed']
+
+
+def test_changed_files_rebuild_the_catalogue(firmware_server, tmp_path):
+    mirror = mirror_of(firmware_server, tmp_path)
+    mirror.sync()
+
+    firmware_server.files['/30/index.xml'] = firmware_index((0x4030, 'SoundTouch 30', '28.0.1'))
+    catalogue = mirror.sync()
+    assert mirror.stats['downloaded'] == 1 and mirror.stats['not_modified'] == 2
+    assert mirror.stats['parsed']
+    assert catalogue.release_for(0x4030).revision == '28.0.1'
+
+    # products removed from lookup.xml are dropped from the state and catalogue
+    firmware_server.files['/lookup.xml'] = b'<PRODUCTS><PRODUCT PID="4020" URL="/20/index.xml"/></PRODUCTS>'
+    removed = mirror.path_of(firmware_server.url('/30/index.xml'))
+    assert os.path.exists(removed)
+    catalogue = mirror.sync()
+    assert sorted(catalogue.firmware) == [0x4020]
+    assert firmware_server.url('/30/index.xml') not in mirror.state
+    assert not os.path.exists(removed)
+
+
+def test_unreachable_files_keep_the_mirrored_copy(firmware_server, tmp_path):
+    mirror = mirror_of(firmware_server, tmp_path)
+    mirror.sync()
+
+    firmware_server.fail = 3
+    catalogue = mirror.sync()
+    assert mirror.stats['errors'] == 3 and not mirror.stats['parsed']
+    assert sorted(catalogue.firmware) == [0x4020, 0x4030]
+
+
+def test_missing_lookup_raises(serve, tmp_path):
+    mirror = mirror_of(serve(), tmp_path)
+    with pytest.raises(ConnectionError):
+        mirror.sync()
@@ -0,0 +1,246 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import sys
+
+from xml.etree.ElementTree import fromstring
+
+import pytest
+
+from boseapi import model
+
+from conftest import DEVICE_PAGES
+
+SNAPSHOT = {
+    '/nowPlaying': model.Status,
+    '/volume': model.Volume,
+    '/getZone': model.Zone,
+    '/capabilities': model.Capabilities,
+    '/netStats': model.NetworkStats,
+    '/networkInfo': model.NetworkInfo,
+    '/presets': model.PresetList,
+    '/sources': model.SourceItemList,
+    '/bass': model.Bass,
+}
+
+
+def parse(path: str):
+    return SNAPSHOT[path](fromstring(DEVICE_PAGES[path]))
+
+
+@pytest.mark.parametrize('path', sorted(SNAPSHOT))
+def test_instances_have_no_dict(path):
+    value = parse(path)
+    assert not hasattr(value, '__dict__')
+    for item in value if path in ('/presets', '/sources') else ():
+        assert not hasattr(item, '__dict__')
+
+
+def test_preset_xml_keeps_content_item():
+    preset = parse('/presets').by_id(3)
+    assert preset.name == 'P3'
+    assert preset.is_presetable
+    assert preset.container_art == 'http://x/3.png'
+
+    item = fromstring(preset.xml_bytes)
+    assert item.tag == 'ContentItem'
+    assert item.attrib == {
+        'source': 'INTERNET_RADIO', 'type': 'stationurl', 'location': '/v1/s/3',
+        'isPresetable': 'true'
+    }
+    assert item.findtext('itemName') == 'P3'
+    assert item.findtext('containerArt') == 'http://x/3.png'
+    assert preset.xml_str == preset.xml_bytes.decode('utf-8')
+
+
+def test_content_item_xml():
+    item = model.ContentItem('INTERNET_RADIO', location='4712', name='Tom & "Jerry"')
+    assert item.xml_str == (
+        '<ContentItem source="INTERNET_RADIO" location="4712">'
+        '<itemName>Tom &amp; "Jerry"</itemName></ContentItem>'
+    )
+    assert model.ContentItem('AUX').xml_str == '<ContentItem source="AUX"/>'
+
+
+def test_decoder_resolves_paths_and_defaults():
+    decode = model._xmldecoder((
+        model._field('a', 'x', attr='id', convert=int, default='7'),
+        model._field('b', 'x/y'),
+        model._field('c', 'x/y/z', convert=int),
+        model._field('d', attr='name'),
+        model._field('e', 'missing/child', default='none'),
+        model._field('f', 'x', attr=model._ELEMENT, convert=lambda x: x is not None),
+    ))
+
+    class Target:
+        pass
+
+    target = Target()
+    decode(target, fromstring(b'<r name="n"><x id="3"><y>text<z>5</z></y></x><x id="4"/></r>'))
+    assert vars(target) == {'a': 3, 'b': 'text', 'c': 5, 'd': 'n', 'e': 'none', 'f': True}
+
+    decode(target, fromstring(b'<r/>'))
+    assert vars(target) == {'a': 7, 'b': None, 'c': None, 'd': None, 'e': 'none', 'f': False}
+
+    single = model._xmldecoder((model._field('g', 'x/y'),), indexed=False)
+    assert single(target, fromstring(b'<r><x><y>v</y></x></r>')) == 'v'
+
+
+def test_net_interface_bindings():
+    stats = parse('/netStats')
+    wired, wireless = list(stats)
+    assert wired.to_dict()['bindings'] == {}
+    assert wireless.to_dict()['bindings'] == {'ipv4address': '127.0.0.1'}
+    assert wireless.rssi == '-62' and wireless.kind == 'Wireless'
+
+
+def test_lazy_objects_decode_on_access():
+    root = fromstring(DEVICE_PAGES['/nowPlaying'])
+    status = model.Status.lazy(root)
+    assert isinstance(status, model.Status)
+    assert status._root is root
+
+    # nothing is stored before the first access
+    with pytest.raises(AttributeError):
+        object.__getattribute__(status, '_track')
+    assert status.track == 'Song'
+    assert object.__getattribute__(status, '_track') == 'Song'
+
+    assert status == model.Status(root)
+    assert status.to_dict() == model.Status(root).to_dict()
+
+
+def test_lazy_objects_pickle():
+    import pickle
+    volume = model.Volume.lazy(fromstring(DEVICE_PAGES['/volume']))
+    restored = pickle.loads(pickle.dumps(volume))
+    assert restored == volume and restored.actual_vol == 32
+
+
+def test_client_returns_lazy_objects(device):
+    from boseapi.client import SoundTouchClient
+    client = SoundTouchClient(device, lazy=True)
+    status = client.status()
+    assert type(status) is not model.Status and isinstance(status, model.Status)
+    assert status.source == 'INTERNET_RADIO'
+    # classes without lazy support are decoded immediately
+    assert client.name().value == 'Kitchen'
+
+
+def test_equality_and_diff():
+    old = parse('/nowPlaying')
+    new = model.Status(fromstring(DEVICE_PAGES['/nowPlaying'].replace(b'>31<', b'>32<')))
+    assert old == parse('/nowPlaying') and old != new
+    assert old.diff(new) == {'position': (31, 32)}
+    with pytest.raises(TypeError):
+        old.diff(parse('/volume'))
+
+    assert hash(old) == hash(parse('/nowPlaying'))
+    assert len({old, parse('/nowPlaying'), new}) == 2
+
+
+@pytest.mark.parametrize('path', [
+    '/volume', '/getZone', '/capabilities', '/netStats', '/networkInfo', '/presets', '/sources'
+])
+def test_mutable_objects_are_not_hashable(path):
+    value = parse(path)
+    assert value == parse(path)
+    with pytest.raises(TypeError):
+        hash(value)
+
+
+def test_list_diff_matches_items_by_key():
+    old = parse('/presets')
+    new = model.PresetList(fromstring(DEVICE_PAGES['/presets'].replace(b'P2<', b'Other<')))
+    changes = old.diff(new)
+    assert list(changes) == ['2']
+    assert changes['2'][0].name == 'P2' and changes['2'][1].name == 'Other'
+
+
+def test_source_list_lookups():
+    sources = model.SourceItemList(fromstring(DEVICE_PAGES['/sources']))
+    assert sources.get('SPOTIFY').sourceAccount == 'user1'
+    assert sources.get('SPOTIFY', 'user1') is sources['SPOTIFY']
+    assert sources.get('SPOTIFY', 'other') is None
+    assert sources.by_account('QPlay1UserName').source == 'QPLAY'
+    assert sources.lookup('key', ('AUX', 'AUX')) is sources[0]
+    assert sources['BLUETOOTH'] is None
+    with pytest.raises(KeyError):
+        sources.lookup('status', 'READY')
+
+    # items appended later are indexed too, the first one wins on duplicates
+    second = model.SourceItem(root=fromstring(
+        b'<sourceItem source="SPOTIFY" sourceAccount="user2" status="READY"/>'
+    ))
+    sources.append(second)
+    assert sources.get('SPOTIFY').sourceAccount == 'user1'
+    assert sources.get('SPOTIFY', 'user2') is second
+
+
+def test_preset_list_lookups():
+    presets = model.PresetList(fromstring(DEVICE_PAGES['/presets']))
+    assert presets.by_id(3) is presets.by_id('3') is presets[2]
+    assert presets.by_location('/v1/s/6').itemid == '6'
+    assert presets.by_id(7) is None and presets.by_location('/nowhere') is None
+
+
+def test_media_server_list_lookups():
+    servers = model.MediaServerList(fromstring(
+        b'<ListMediaServersResponse>'
+        b'<media_server id="s1" mac="m1" ip="192.168.1.10" manufacturer="x" '
+        b'model_name="y" friendly_name="NAS" model_description="" location=""/>'
+        b'<media_server id="s2" mac="m2" ip="192.168.1.11" manufacturer="x" '
+        b'model_name="y" friendly_name="PC" model_description="" location=""/>'
+        b'</ListMediaServersResponse>'
+    ))
+    assert servers.by_id('s2').ip == '192.168.1.11'
+    assert servers.by_ip('192.168.1.10').serverid == 's1'
+    assert servers.lookup('ip', '10.0.0.1') is None
+
+
+def test_vocabulary_strings_are_interned():
+    first = model.Status(fromstring(DEVICE_PAGES['/nowPlaying']))
+    second = model.Status.lazy(fromstring(DEVICE_PAGES['/nowPlaying']))
+    assert first.source is second.source is sys.intern('INTERNET_RADIO')
+    assert first.play_status is second.play_status
+
+    sources = model.SourceItemList(fromstring(DEVICE_PAGES['/sources']))
+    assert sources[0].status is sources[1].status is sys.intern('READY')
+
+    restored = model.Status.from_dict(first.to_dict())
+    assert restored.source is first.source and restored.play_status is first.play_status
+
+    # unknown values are interned as well
+    item = model.ContentItem(root=fromstring(b'<ContentItem source="NEW_SOURCE_%d"/>' % 7))
+    assert item.source is sys.intern('NEW_SOURCE_7')
+
+
+def test_public_names_are_declared_in_the_field_table():
+    assert model._field('_station_name', 'stationName', public='station')[5] == 'station'
+    assert model._field('_track')[5] == 'track'
+
+    status = model.Status(fromstring(DEVICE_PAGES['/nowPlaying']))
+    values = status.to_dict()
+    assert {'source', 'station', 'streamtype', 'contentitem'} <= set(values)
+    assert values['contentitem']['itemtype'] == status.contentitem.itemtype
+    volume = model.Volume(fromstring(DEVICE_PAGES['/volume']))
+    assert volume.to_dict()['actualvolume'] == 32
+    assert model.Status.from_dict(values) == status
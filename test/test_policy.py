@@ -0,0 +1,143 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+import pytest
+
+from urllib3.util import Timeout
+
+from boseapi.client import SoundTouchClient
+from boseapi.common import nodes
+from boseapi.common.policy import (
+    RequestPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    BreakerRegistry,
+    host_breakers
+)
+
+
+def test_retries_for():
+    policy = RequestPolicy(retries=3)
+    assert policy.retries_for('GET', 'volume').status_forcelist == (500, 502, 503, 504)
+    assert policy.retries_for('POST', 'volume').read is None
+
+    for method, node in (('POST', 'key'), ('GET', 'swUpdateStart'), ('GET', 'resetDefaults')):
+        retry = policy.retries_for(method, node)
+        assert (retry.connect, retry.read, retry.status) == (3, 0, 0), node
+
+    policy = RequestPolicy(non_idempotent_nodes={'bass'})
+    assert not policy.is_idempotent('GET', nodes.bass)
+    assert policy.is_idempotent('GET', nodes.swUpdateStart)
+
+
+def test_timeout_for():
+    policy = RequestPolicy(node_timeouts={nodes.volume: Timeout(read=1.0)})
+    assert policy.timeout_for(nodes.volume).read_timeout == 1.0
+    assert policy.timeout_for('swUpdateCheck').read_timeout == 30.0
+    assert policy.timeout_for('bass') is policy.timeout
+
+
+def test_breaker_states():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_registry():
+    registry = BreakerRegistry(failure_threshold=1)
+    breaker = registry.get('10.0.0.1')
+    assert registry.get('10.0.0.1') is breaker
+    breaker.record_failure()
+    assert registry.open_hosts() == ['10.0.0.1']
+
+
+def test_get_retries_reading_nodes(device, fake_device):
+    client = SoundTouchClient(device)
+    fake_device.fail = 1
+    assert client.volume().actual_vol == 32
+    assert fake_device.paths()[-2:] == ['/volume', '/volume']
+
+
+def test_action_nodes_are_sent_once(device, fake_device):
+    client = SoundTouchClient(device, breaker=None)
+    fake_device.fail = 1
+    client.sw_update_start()
+    assert fake_device.paths().count('/swUpdateStart') == 1
+
+
+def test_read_timeout(device, fake_device):
+    policy = RequestPolicy(node_timeouts={'bass': Timeout(connect=1.0, read=0.05)}, retries=0)
+    client = SoundTouchClient(device, policy=policy, breaker=None)
+    fake_device.delay = 0.2
+    with pytest.raises(InterruptedError):
+        client.bass()
+
+
+def test_breaker_rejects_requests(device, fake_device):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = SoundTouchClient(device, breaker=breaker, policy=RequestPolicy(retries=0))
+    fake_device.fail = 2
+    client.get(nodes.volume)
+    client.get(nodes.volume)
+
+    requests = len(fake_device.requests)
+    with pytest.raises(CircuitOpenError):
+        client.volume()
+    assert len(fake_device.requests) == requests
+
+
+def test_unsent_trial_is_released(device, fake_device):
+    class BrokenLimiter:
+        def acquire(self):
+            raise RuntimeError('limiter failed')
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    client = SoundTouchClient(device, breaker=breaker, limiter=BrokenLimiter())
+    with pytest.raises(InterruptedError):
+        client.volume()
+
+    client.limiter = None
+    assert client.volume().actual_vol == 32
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_breaker_default_and_disabled(device):
+    assert SoundTouchClient(device).breaker is host_breakers.get(device.host)
+    assert SoundTouchClient(device, breaker=None).breaker is None
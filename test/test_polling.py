@@ -0,0 +1,115 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+
+from boseapi import model
+from boseapi.client import SoundTouchClient
+from boseapi.common import nodes
+from boseapi.polling import PollJob, PollScheduler, needs_polling
+
+STANDBY = b'<nowPlaying deviceID="A0B1C2D3E4F5" source="STANDBY"><ContentItem source="STANDBY" isPresetable="false" /></nowPlaying>'
+
+PAUSED = b'<nowPlaying deviceID="A0B1C2D3E4F5" source="AUX"><playStatus>PAUSE_STATE</playStatus></nowPlaying>'
+
+
+def test_poll_detects_changes(device, fake_device):
+    client = SoundTouchClient(device)
+    job = PollJob(client, nodes.volume, model.Volume, 5.0, 1.0, 60.0)
+
+    assert job.poll()
+    assert job.value.actual_vol == 32
+    assert client[nodes.volume] is job.value
+    assert not job.poll()
+
+    fake_device.pages['/volume'] = b'<volume><targetvolume>40</targetvolume><actualvolume>40</actualvolume></volume>'
+    assert job.poll()
+    assert job.value.actual_vol == 40
+
+
+def test_next_interval(device, fake_device):
+    client = SoundTouchClient(device)
+    scheduler = PollScheduler(backoff=2.0)
+    job = scheduler.add(client, nodes.volume, interval=4.0)
+    assert (job.min_interval, job.max_interval) == (2.0, 48.0)
+
+    # nothing is known about the play status yet
+    assert scheduler.next_interval(job, changed=True) == 4.0
+    job.current = 30.0
+    assert scheduler.next_interval(job, changed=False) == 48.0
+
+    fake_device.pages['/nowPlaying'] = PAUSED
+    client.status()
+    job.current = 4.0
+    assert scheduler.next_interval(job, changed=False) == 8.0
+
+    fake_device.pages['/nowPlaying'] = PAUSED.replace(b'PAUSE_STATE', b'PLAY_STATE')
+    client.status()
+    assert scheduler.next_interval(job, changed=False) == 2.0
+
+    status_job = scheduler.add(client, nodes.nowPlaying, interval=4.0)
+    fake_device.pages['/nowPlaying'] = STANDBY
+    scheduler._run_job(status_job)
+    assert scheduler.is_standby(device.host)
+    assert status_job.current == status_job.max_interval
+
+
+def test_failed_polls_back_off(device, fake_device):
+    client = SoundTouchClient(device, breaker=None)
+    scheduler = PollScheduler()
+    job = scheduler.add(client, nodes.bass, interval=1.0, max_interval=6.0)
+    fake_device.pages['/bass'] = (500, b'')
+
+    for expected in (2.0, 4.0, 6.0):
+        scheduler._run_job(job)
+        assert job.current == expected
+    assert job.errors == 3
+
+
+def test_scheduler_polls_in_background(device, fake_device):
+    client = SoundTouchClient(device)
+    calls = []
+    done = threading.Event()
+
+    def listener(job, changed):
+        calls.append((job.uri, changed))
+        if len(calls) >= 3:
+            done.set()
+
+    with PollScheduler(max_rate=100) as scheduler:
+        job = scheduler.add(client, nodes.volume, interval=0.05, min_interval=0.05,
+                            max_interval=0.05, listener=listener)
+        assert done.wait(5)
+        scheduler.remove_device(client)
+        assert len(scheduler) == 0 and job.cancelled
+
+    assert calls[0] == (nodes.volume, True)
+    assert calls[1] == (nodes.volume, False)
+
+
+def test_needs_polling(device, fake_device):
+    client = SoundTouchClient(device)
+    assert not needs_polling(client)
+
+    fake_device.pages['/capabilities'] = fake_device.pages['/capabilities'].replace(
+        b'<wsapiproxy>true', b'<wsapiproxy>false')
+    client.capabilities()
+    assert needs_polling(client)
@@ -0,0 +1,94 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+import pytest
+
+from urllib3.exceptions import EmptyPoolError
+
+from boseapi.client import SoundTouchClient
+from boseapi.common.pool import SharedPoolManager, shared_manager, reset_shared_manager
+
+
+def test_pools_are_reused(serve):
+    server = serve({'/a': b'<a/>'})
+    manager = SharedPoolManager()
+    for _ in range(3):
+        assert manager.request('GET', server.url('/a')).data == b'<a/>'
+
+    stats = manager.stats()
+    assert (stats['pools'], stats['hits'], stats['misses']) == (1, 2, 1)
+    assert stats['new_connections'] == 1 and stats['requests'] == 3
+
+
+def test_least_recently_used_pool_is_closed(serve):
+    servers = [serve({'/': b'ok'}) for _ in range(3)]
+    manager = SharedPoolManager(num_pools=2)
+    for server in servers:
+        manager.request('GET', server.url())
+
+    assert len(manager.pools) == 2
+    assert manager.evictions == 1
+    # the connections of the closed pool are still counted
+    assert manager.stats()['new_connections'] == 3
+
+
+def test_pool_timeout(serve):
+    server = serve({'/': b'ok'})
+    manager = SharedPoolManager(maxsize=1, pool_timeout=0.1)
+    response = manager.request('GET', server.url(), preload_content=False)
+
+    started = time.monotonic()
+    with pytest.raises(EmptyPoolError):
+        manager.request('GET', server.url(), retries=False)
+    assert time.monotonic() - started < 2
+
+    response.release_conn()
+    assert manager.request('GET', server.url()).data == b'ok'
+
+
+def test_evict_idle_skips_pools_in_use(serve):
+    busy, idle = serve({'/': b'ok'}), serve({'/': b'ok'})
+    manager = SharedPoolManager(idle_timeout=60)
+    response = manager.request('GET', busy.url(), preload_content=False)
+    manager.request('GET', idle.url())
+
+    later = time.monotonic() + 120
+    assert manager.evict_idle(later) == 1
+    assert len(manager.pools) == 1
+
+    response.release_conn()
+    assert manager.evict_idle(later) == 1
+    assert len(manager.pools) == 0 and manager.evictions == 2
+
+
+def test_shared_manager(device):
+    manager = shared_manager()
+    assert shared_manager() is manager
+    assert SoundTouchClient(device).manager is manager
+
+    replaced = reset_shared_manager(num_pools=4)
+    try:
+        assert replaced is not manager and shared_manager() is replaced
+        assert SoundTouchClient(device).manager is replaced
+    finally:
+        reset_shared_manager()
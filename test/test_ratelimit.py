@@ -0,0 +1,114 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+import time
+
+from boseapi.client import SoundTouchClient
+from boseapi.common.ratelimit import TokenBucket, HostLimiter, LimiterRegistry, host_limiters
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0.05 < bucket.reserve() <= 0.1
+    bucket.refund()
+    assert 0.05 < bucket.reserve() <= 0.1
+
+    unlimited = TokenBucket()
+    assert unlimited.unlimited
+    assert all(unlimited.try_acquire() for _ in range(100))
+
+
+def test_limiter_bounds_concurrency():
+    limiter = HostLimiter(max_in_flight=2)
+    assert limiter.acquire() and limiter.acquire()
+    assert limiter.in_flight == 2
+    assert not limiter.acquire(timeout=0.05)
+    assert limiter.waiting == 0
+
+    limiter.release()
+    assert limiter.acquire(timeout=0.05)
+
+
+def test_limiter_serves_callers_in_order():
+    limiter = HostLimiter(max_in_flight=1)
+    order = []
+    limiter.acquire()
+
+    def worker(index):
+        limiter.acquire()
+        order.append(index)
+        limiter.release()
+
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=worker, args=(index,))
+        thread.start()
+        threads.append(thread)
+        while limiter.waiting <= index:
+            time.sleep(0.001)
+
+    limiter.release()
+    for thread in threads:
+        thread.join()
+    assert order == list(range(5))
+
+
+def test_rate_wait_does_not_hold_a_slot():
+    limiter = HostLimiter(rate=5, burst=1, max_in_flight=2)
+    assert limiter.acquire()
+
+    # the second caller waits ~0.2s for its token without taking a slot
+    thread = threading.Thread(target=limiter.acquire)
+    thread.start()
+    time.sleep(0.05)
+    assert limiter.in_flight == 1
+    thread.join()
+    assert limiter.in_flight == 2
+
+
+def test_token_timeout_refunds():
+    limiter = HostLimiter(rate=1, burst=1)
+    assert limiter.acquire()
+    started = time.monotonic()
+    assert not limiter.acquire(timeout=0.1)
+    assert time.monotonic() - started < 0.1
+    assert 0.5 < limiter.bucket.reserve() <= 1.0
+
+
+def test_registry_shares_limiters():
+    registry = LimiterRegistry(rate=2)
+    limiter = registry.get('10.0.0.1')
+    assert registry.get('10.0.0.1') is limiter
+    assert '10.0.0.1' in registry and len(registry) == 1
+
+    registry.configure('10.0.0.1', rate=4, max_in_flight=1)
+    assert limiter.bucket.rate == 4 and limiter.max_in_flight == 1
+
+
+def test_client_limiter_default_and_disabled(device, fake_device):
+    assert SoundTouchClient(device).limiter is host_limiters.get(device.host)
+
+    client = SoundTouchClient(device, limiter=None)
+    assert client.limiter is None
+    assert client.volume().actual_vol == 32
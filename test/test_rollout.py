@@ -0,0 +1,165 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+
+from xml.etree.ElementTree import fromstring
+
+import pytest
+
+from boseapi.common.device import BoseDevice
+from boseapi.rollout import FAILED, SKIPPED, SUCCEEDED, SW_UPDATE, UpdateRollout
+from boseapi.ws.bosews import BoseWebSocket
+
+from conftest import DEVICE_PAGES
+
+
+def status(state: str, percent: int = 0) -> bytes:
+    return (b'<swUpdateQueryResponse><state>%s</state><percentComplete>%d</percentComplete>'
+            b'</swUpdateQueryResponse>' % (state.encode(), percent))
+
+
+class ScriptedSocket(BoseWebSocket):
+    """A BoseWebSocket that does not connect; the fake device sends its events."""
+
+    sockets = {}
+
+    def __init__(self, device: BoseDevice, opens: bool = True) -> None:
+        super().__init__(device)
+        self.opens = opens
+        ScriptedSocket.sockets[device.host] = self
+
+    def start_notification(self):
+        if self.opens:
+            self.notify_listeners('open', self)
+        else:
+            self.notify_listeners('error', ConnectionRefusedError())
+            self.notify_listeners('close', None)
+
+    def stop_notification(self):
+        pass
+
+    def send(self, state: str, percent: int = 0):
+        event = fromstring(b'<%s>%s</%s>' % (SW_UPDATE.encode(), status(state, percent), SW_UPDATE.encode()))
+        self.notify_listeners(SW_UPDATE, event)
+
+
+class UpdatingDevice:
+    """Serves a device whose update runs through `states` and then restarts.
+
+    The device closes its WebSocket cleanly when it restarts and answers
+    swUpdateQuery with IDLE afterwards; /info reports `version` from then on.
+    """
+
+    def __init__(self, serve, states=('DOWNLOADING', 'INSTALLING'), reboot: bool = True,
+                 version: str = '28.0.1.46330.5043500'):
+        self.states = states
+        self.reboot = reboot
+        self.version = version
+        pages = dict(DEVICE_PAGES)
+        pages['/swUpdateCheck'] = b'<status>/swUpdateCheck</status>'
+        pages['/swUpdateStart'] = self.start
+        pages['/swUpdateQuery'] = status('INSTALLING', 90)
+        self.server = serve(pages, port=8090)
+        self.device = BoseDevice(self.server.host)
+
+    def start(self, handler):
+        handler.reply(200, b'<status>/swUpdateStart</status>')
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        socket = ScriptedSocket.sockets[self.server.host]
+        for percent, state in enumerate(self.states):
+            socket.send(state, percent * 10)
+        if self.reboot:
+            self.server.pages['/info'] = DEVICE_PAGES['/info'].replace(
+                b'27.0.6.46330.5043500', self.version.encode())
+            self.server.pages['/swUpdateQuery'] = status('IDLE')
+            socket.notify_listeners('close', 1000)
+
+
+def rollout(devices, **kwargs) -> UpdateRollout:
+    kwargs.setdefault('socket_factory', ScriptedSocket)
+    kwargs.setdefault('timeout', 5.0)
+    return UpdateRollout([x.device for x in devices], reboot_interval=0.05, **kwargs)
+
+
+def test_clean_close_during_reboot_is_polled(serve):
+    devices = [UpdatingDevice(serve) for _ in range(3)]
+    events = []
+    updates = rollout(devices, waves=(1, 2), listener=events.append).run()
+
+    assert [update.state for update in updates] == [SUCCEEDED] * 3
+    assert all(update.disconnected and update.events == 2 for update in updates)
+    assert all(update.version == '27.0.6.46330.5043500' for update in updates)
+    assert updates[0].status.state == 'IDLE' and updates[0].duration < 5
+    for device in devices:
+        paths = device.server.paths()
+        assert paths[:3] == ['/info', '/swUpdateCheck', '/swUpdateStart']
+        assert paths[-2:] == ['/swUpdateQuery', '/info']
+    assert events
+
+
+def test_idle_without_a_new_version_fails(serve):
+    device = UpdatingDevice(serve, version='27.0.6.46330.5043500')
+    update, = rollout([device]).run()
+    assert update.state == FAILED and update.disconnected
+    assert update.error == 'Update returned to IDLE without a new version (27.0.6.46330.5043500)'
+
+
+def test_reported_completion_needs_no_restart(serve):
+    devices = [UpdatingDevice(serve, states=('INSTALLING', 'COMPLETE'), reboot=False)]
+    update, = rollout(devices, check=False).run()
+    assert update.state == SUCCEEDED and not update.disconnected
+    assert devices[0].server.paths() == ['/info', '/swUpdateStart']
+
+
+def test_unopened_socket_does_not_start_the_update(serve):
+    device = UpdatingDevice(serve)
+    update, = rollout([device], socket_factory=lambda d: ScriptedSocket(d, opens=False),
+                      connect_timeout=1.0).run()
+    assert update.state == FAILED and 'WebSocket' in update.error
+    assert device.server.paths() == []
+
+
+def test_update_start_is_not_retried(serve):
+    device = UpdatingDevice(serve)
+    device.server.pages['/swUpdateStart'] = (503, b'')
+    update, = rollout([device], check=False, timeout=0.3).run()
+    assert update.state == FAILED and update.error == 'Update timed out'
+    assert device.server.paths() == ['/info', '/swUpdateStart']
+
+
+def test_failed_wave_halts_the_rollout(serve):
+    devices = [UpdatingDevice(serve, states=('UPDATE_FAILED',), reboot=False)] + \
+              [UpdatingDevice(serve) for _ in range(2)]
+    job = rollout(devices, waves=1, failure_threshold=0.0)
+    updates = job.run()
+    assert [update.state for update in updates] == [FAILED, SKIPPED, SKIPPED]
+    assert updates[0].error == 'Update state UPDATE_FAILED'
+    assert job.summary() == {'pending': 0, 'running': 0, 'succeeded': 0, 'failed': 1,
+                             'skipped': 2, 'halted': True}
+    assert job.halted_wave == 0 and devices[1].server.paths() == []
+
+
+def test_invalid_waves():
+    with pytest.raises(ValueError):
+        UpdateRollout([], waves=(2, 0))
@@ -0,0 +1,156 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import os
+
+import pytest
+
+from boseapi import upnp
+from boseapi.common.device import BoseDevice, BoseDeviceComponent
+from boseapi.upnp import DescriptionCache
+
+DESCRIPTION = (
+    b'<?xml version="1.0"?><root xmlns="urn:schemas-upnp-org:device-1-0">'
+    b'<specVersion><major>1</major><minor>0</minor></specVersion>'
+    b'<device><deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>'
+    b'<friendlyName>Kitchen</friendlyName><manufacturer>Bose Corporation</manufacturer>'
+    b'<modelName>SoundTouch 30</modelName><modelNumber>1.0</modelNumber>'
+    b'<serialNumber>F1</serialNumber><UDN>uuid:BO5EBO5E-F00D-FEED-%s</UDN>'
+    b'<serviceList><service><serviceType>urn:schemas-upnp-org:service:AVTransport:1</serviceType>'
+    b'<serviceId>urn:upnp-org:serviceId:AVTransport</serviceId><SCPDURL>/XD/AVTransport.xml</SCPDURL>'
+    b'<controlURL>/AVTransport/Control</controlURL><eventSubURL>/AVTransport/Event</eventSubURL>'
+    b'</service></serviceList><deviceList><device>'
+    b'<deviceType>urn:schemas-upnp-org:device:Embedded:1</deviceType>'
+    b'<serviceList><service><serviceType>urn:schemas-upnp-org:service:RenderingControl:1</serviceType>'
+    b'<serviceId>urn:upnp-org:serviceId:RenderingControl</serviceId>'
+    b'<SCPDURL>RenderingControl.xml</SCPDURL><controlURL>/RC/Control</controlURL>'
+    b'<eventSubURL>/RC/Event</eventSubURL></service></serviceList></device></deviceList>'
+    b'</device></root>'
+)
+
+SCPD = (
+    b'<?xml version="1.0"?><scpd xmlns="urn:schemas-upnp-org:service-1-0"><actionList>'
+    b'<action><name>Play</name><argumentList>'
+    b'<argument><name>InstanceID</name><direction>in</direction>'
+    b'<relatedStateVariable>A_ARG_TYPE_InstanceID</relatedStateVariable></argument>'
+    b'<argument><name>Speed</name><direction>in</direction>'
+    b'<relatedStateVariable>TransportPlaySpeed</relatedStateVariable></argument>'
+    b'</argumentList></action>'
+    b'<action><name>GetVolume</name><argumentList>'
+    b'<argument><name>CurrentVolume</name><direction>out</direction>'
+    b'<relatedStateVariable>Volume</relatedStateVariable></argument>'
+    b'</argumentList></action></actionList></scpd>'
+)
+
+
+def upnp_device(serve, device_id: str, version: str = '27.0.6') -> BoseDevice:
+    server = serve({
+        '/XD/BO5EBO5E-F00D-FEED-%s.xml' % device_id: DESCRIPTION % device_id.encode(),
+        '/XD/AVTransport.xml': SCPD,
+        '/XD/RenderingControl.xml': SCPD,
+    }, port=8091)
+    device = BoseDevice(server.host, device_id=device_id,
+                        components=[BoseDeviceComponent('SCM', version)])
+    device.server = server
+    return device
+
+
+def test_parse_description_resolves_urls():
+    url = 'http://10.0.0.2:8091/XD/BO5EBO5E-F00D-FEED-A0B1.xml'
+    description = upnp.parse_description(DESCRIPTION % b'A0B1', url)
+    assert description.friendly_name == 'Kitchen' and description.model_name == 'SoundTouch 30'
+    assert description.udn == 'uuid:BO5EBO5E-F00D-FEED-A0B1'
+    assert [service.name for service in description.services] == ['AVTransport', 'RenderingControl']
+    transport, rendering = description.services
+    assert transport.scpd_url == 'http://10.0.0.2:8091/XD/AVTransport.xml'
+    assert transport.control_url == 'http://10.0.0.2:8091/AVTransport/Control'
+    assert rendering.scpd_url == 'http://10.0.0.2:8091/XD/RenderingControl.xml'
+    assert description.service('urn:upnp-org:serviceId:RenderingControl') is rendering
+    assert description.service('ContentDirectory') is None
+
+    with pytest.raises(ValueError):
+        upnp.parse_description(b'<root xmlns="urn:schemas-upnp-org:device-1-0"/>', url)
+
+
+def test_parse_scpd():
+    actions = upnp.parse_scpd(SCPD)
+    assert list(actions) == ['Play', 'GetVolume']
+    assert actions['Play'].inputs == ['InstanceID', 'Speed'] and actions['Play'].outputs == []
+    assert actions['GetVolume'].arguments == [('CurrentVolume', 'out', 'Volume')]
+
+
+def test_descriptions_and_scpd_are_shared(serve):
+    devices = [upnp_device(serve, 'A0B1C2D3E4F%d' % i) for i in range(3)]
+    cache = DescriptionCache(retries=0)
+    descriptions = cache.load_all(devices, max_workers=3)
+
+    assert sorted(descriptions) == sorted(device.device_id for device in devices)
+    description = descriptions[devices[0].device_id]
+    assert description.version == '27.0.6'
+    assert description.actions() == {'AVTransport': ['Play', 'GetVolume'],
+                                     'RenderingControl': ['Play', 'GetVolume']}
+    assert cache.stats == {'hits': 0, 'fetched': 3, 'scpd_fetched': 2, 'scpd_hits': 4}
+    scpd_requests = sum(len(d.server.paths()) - 1 for d in devices)
+    assert scpd_requests == 2
+
+    assert cache.get(devices[1]) is descriptions[devices[1].device_id]
+    assert cache.stats['hits'] == 1 and len(cache) == 3
+
+
+def test_stored_descriptions_survive_restarts(serve, tmp_path):
+    device = upnp_device(serve, 'A0B1C2D3E4F5')
+    first = DescriptionCache(str(tmp_path), retries=0).get(device)
+
+    cache = DescriptionCache(str(tmp_path), retries=0)
+    stored = cache.get(device)
+    assert cache.stats['hits'] == 1 and cache.stats['fetched'] == 0
+    assert stored.to_dict() == first.to_dict()
+    assert stored.service('AVTransport').actions['Play'].inputs == ['InstanceID', 'Speed']
+    assert len(device.server.paths()) == 3
+
+
+def test_new_version_replaces_the_description(serve, tmp_path):
+    device = upnp_device(serve, 'A0B1C2D3E4F5')
+    cache = DescriptionCache(str(tmp_path), retries=0)
+    cache.get(device)
+    old_path = cache.path_of(device.device_id, '27.0.6')
+    assert os.path.exists(old_path)
+
+    device.components[0].software_version = '28.0.1'
+    description = cache.get(device)
+    assert description.version == '28.0.1' and cache.stats['fetched'] == 2
+    assert not os.path.exists(old_path) and len(cache) == 1
+    assert cache.get(device, refresh=True) is not description
+
+
+def test_failed_devices_are_reported(serve):
+    good = upnp_device(serve, 'A0B1C2D3E4F5')
+    missing = BoseDevice(serve({}, port=8091).host, device_id='FFFF',
+                         components=[BoseDeviceComponent('SCM', '1')])
+    broken = upnp_device(serve, 'B0B1C2D3E4F5')
+    broken.server.pages['/XD/BO5EBO5E-F00D-FEED-B0B1C2D3E4F5.xml'] = b'<root><device>'
+
+    cache = DescriptionCache(retries=0, with_actions=False)
+    descriptions = cache.load_all([good, missing, broken])
+    assert list(descriptions) == ['A0B1C2D3E4F5']
+    assert descriptions['A0B1C2D3E4F5'].services[0].actions == {}
+    assert isinstance(cache.errors['FFFF'], ConnectionError)
+    assert 'B0B1C2D3E4F5' in cache.errors
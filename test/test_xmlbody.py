@@ -0,0 +1,71 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from xml.etree.ElementTree import fromstring
+
+from boseapi import model
+from boseapi.xmlbody import attributes, element, escape_attr, escape_text
+
+from conftest import DEVICE_PAGES
+
+
+def test_escaping():
+    assert escape_text('Tom & Jerry <3') == 'Tom &amp; Jerry &lt;3'
+    assert escape_text(42) == '42'
+    assert escape_attr('a "b"\n&') == 'a &quot;b&quot;&#10;&amp;'
+    plain = 'Kitchen'
+    assert escape_attr(plain) is plain
+
+
+def test_element_and_attributes():
+    assert attributes((('a', 1), ('b', None), ('c', ''), ('d', 'x<y'))) == ' a="1" d="x&lt;y"'
+    assert element('name', 'Tom & Jerry') == '<name>Tom &amp; Jerry</name>'
+    assert element('member', 'C2D3', (('ipaddress', '10.0.0.3'),)) == \
+        '<member ipaddress="10.0.0.3">C2D3</member>'
+    assert element('empty') == '<empty></empty>'
+
+
+def test_zone_to_xml_round_trips():
+    zone = model.Zone(device_id='A0B1', ip='10.0.0.1', slaves=[
+        model.ZoneSlave(ip_address='10.0.0.%d' % i, device_id='C2D3<%d>' % i) for i in range(3)
+    ])
+    root = fromstring(zone.to_xml())
+    assert root.attrib == {'master': 'A0B1', 'senderIPAddress': '10.0.0.1'}
+    assert [(m.text, m.get('ipaddress')) for m in root] == [
+        ('C2D3<0>', '10.0.0.0'), ('C2D3<1>', '10.0.0.1'), ('C2D3<2>', '10.0.0.2')
+    ]
+    decoded = model.Zone(fromstring(DEVICE_PAGES['/getZone']))
+    assert model.Zone(fromstring(decoded.to_xml())) == decoded
+
+
+def test_content_item_body_is_escaped_and_cached():
+    item = model.ContentItem(src='LOCAL_MUSIC', account='a"b', location='/x&y',
+                             media_type='track', name='Tom & Jerry')
+    body = item.xml_bytes
+    assert item.xml_bytes is body
+    root = fromstring(body)
+    assert root.get('sourceAccount') == 'a"b' and root.get('location') == '/x&y'
+    assert root.find('itemName').text == 'Tom & Jerry'
+
+    preset = model.PresetList(fromstring(DEVICE_PAGES['/presets']))[0]
+    root = fromstring(preset.xml_bytes)
+    assert root.tag == 'ContentItem' and root.get('isPresetable') == 'true'
+    assert root.find('containerArt').text == 'http://x/1.png'
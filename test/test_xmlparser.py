@@ -0,0 +1,61 @@
+# MIT License
+#
+# Copyright (c) 2023 MatrixEditor
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import pytest
+
+from boseapi import model
+from boseapi.common import xmlparser
+
+from conftest import DEVICE_PAGES
+
+
+@pytest.fixture(params=xmlparser.available_backends())
+def backend(request):
+    previous = xmlparser.backend
+    yield xmlparser.use_backend(request.param)
+    xmlparser.use_backend(previous)
+
+
+def test_parse_and_decode(backend):
+    root = xmlparser.fromstring(DEVICE_PAGES['/nowPlaying'])
+    assert xmlparser.iselement(root)
+    status = model.Status(root)
+    assert (status.source, status.track, status.play_status) == ('INTERNET_RADIO', 'Song', 'PLAY_STATE')
+    assert xmlparser.fromstring(xmlparser.tostring(root)).get('source') == 'INTERNET_RADIO'
+
+
+def test_str_input_with_declaration(backend):
+    root = xmlparser.fromstring(DEVICE_PAGES['/info'].decode('utf-8'))
+    assert root.findtext('name') == 'Kitchen'
+
+
+def test_parse_errors(backend):
+    with pytest.raises(xmlparser.PARSE_ERRORS):
+        xmlparser.fromstring(b'<volume><actualvolume>')
+    # the tuple can be combined with other exceptions
+    with pytest.raises((ValueError,) + xmlparser.PARSE_ERRORS):
+        xmlparser.fromstring(b'no xml')
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        xmlparser.use_backend('expat')
+    assert xmlparser.use_backend('stdlib') == 'stdlib'